@@ -1,14 +1,60 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from ingestion.document_loader import iter_policy_blocks, policy_encoding  # noqa: E402
+from ingestion.pdf_loader import DEFAULT_CACHE_DIR as PDF_TEXT_CACHE_DIR  # noqa: E402
+from ingestion.registry import sniff_format  # noqa: E402
+from nlp.frameworks import FrameworkRegistry  # noqa: E402
+from nlp.preprocessing import DocumentVocabulary, SectionOutline, segment_blocks  # noqa: E402
+from jobs import JobRegistry  # noqa: E402
+from pipeline import (  # noqa: E402
+    AnalysisPipeline, IngestionResult, SegmentationResult, analysis_version
+)
+from remediation.generation import GenerationCache, load_generation_backend  # noqa: E402
+from reporting.export import MIME_TYPES, available_formats, export_report  # noqa: E402
+from storage.history import HistoryStore  # noqa: E402
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DATA_DIR = os.path.join(BASE_DIR, "data")
+HISTORY_PATH = os.path.join(BASE_DIR, ".cache", "history.sqlite3")
+UPLOAD_DIR = os.path.join(BASE_DIR, ".cache", "uploads")
+HISTORY_PAGE_SIZE = 10
+
+JOB_WORKERS = 2
+# GGUF model for AI-generated recommendations; templates are used without one
+GENERATION_MODEL = os.environ.get("POLICY_GAP_MODEL")
+POLL_SECONDS = 1.0
+# Matching options of every analysis; part of the stored analysis key
+ANALYSIS_OPTIONS = {"method": "keyword", "evidence_k": 0, "hierarchical": False}
 
 
 # ---------------- Session State Initialization ----------------
-if "file_history" not in st.session_state:
-    st.session_state.file_history = {}
+# Documents are addressed by content hash; the uploads themselves are
+# kept on disk and in the history store, not in session memory
+if "selected_hash" not in st.session_state:
+    st.session_state.selected_hash = None
 
-if "selected_file_name" not in st.session_state:
-    st.session_state.selected_file_name = None
+# Uploader file id -> content hash, so an upload is stored only once
+if "uploads" not in st.session_state:
+    st.session_state.uploads = {}
+
+# Content hashes of the documents analyzed or re-selected in this session
+if "analyzed_hashes" not in st.session_state:
+    st.session_state.analyzed_hashes = []
+
+# (content hash, framework) -> background job id
+if "jobs" not in st.session_state:
+    st.session_state.jobs = {}
 
 # ---------------- Page Config ----------------
 st.set_page_config(
@@ -16,6 +62,216 @@ st.set_page_config(
     layout="wide"
 )
 
+# ---------------- Backend (cached) ----------------
+# Streamlit reruns this script on every widget change. The framework
+# registry (which maps each clause catalog once, on first use) and the
+# job registry are shared across sessions and reruns; segments are
+# cached by content hash, and finished analyses are stored by (content
+# hash, framework) in the history store, so only a new document or
+# framework reruns the analysis, in this session or any later one.
+# Arguments prefixed with "_" are not hashed by Streamlit.
+
+@st.cache_resource(show_spinner=False)
+def get_framework_registry():
+    return FrameworkRegistry(DATA_DIR)
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_registry():
+    return JobRegistry(max_workers=JOB_WORKERS)
+
+
+@st.cache_resource(show_spinner=False)
+def get_generator():
+    return load_generation_backend(GENERATION_MODEL)
+
+
+@st.cache_resource(show_spinner=False)
+def get_generation_cache():
+    return GenerationCache()
+
+
+@st.cache_resource(show_spinner=False)
+def get_history_store():
+    return HistoryStore(HISTORY_PATH)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def export_gap_report(file_hash, framework, key, export_format, document, _analysis_results):
+    """
+    Export file of a stored analysis, built once per analysis and format
+    instead of on every rerun. Rows go from the analysis straight through
+    the export engine, without an intermediate DataFrame or string.
+    """
+    export_file = io.BytesIO()
+    export_report(export_file, _analysis_results, export_format, document=document)
+    return export_file.getvalue()
+
+
+def analysis_key(framework):
+    """
+    (catalog hash, analysis version) a stored analysis must have been
+    made with to be reused: a changed clause catalog, matcher, matching
+    options, report format or suggestion model makes it stale.
+    """
+    generator = get_generator()
+    version = analysis_version(**ANALYSIS_OPTIONS)
+    if generator is not None:
+        version = f"{version}+{generator.model_id}"
+    return get_framework_registry().get(framework).source_hash, version
+
+
+def store_upload(uploaded_file):
+    """
+    Save an upload under its content hash, record it in the history
+    store and return the hash. Raises ValueError for unsupported files.
+    """
+    file_bytes = uploaded_file.getvalue()
+    file_hash = hashlib.sha256(file_bytes).hexdigest()
+    suffix = os.path.splitext(uploaded_file.name)[1].lower()
+    path = os.path.join(UPLOAD_DIR, f"{file_hash}{suffix}")
+
+    if not os.path.exists(path):
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(file_bytes)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    document_format = sniff_format(path)
+    get_history_store().add_document(
+        file_hash, uploaded_file.name, len(file_bytes), document_format,
+        source_path=path,
+        # PDF pages are cached by the same content hash once extracted
+        text_path=(
+            os.path.join(PDF_TEXT_CACHE_DIR, f"{file_hash}.jsonl")
+            if document_format == "pdf" else None
+        )
+    )
+    return file_hash
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def segment_policy_text(file_hash, path, _progress=None):
+    # Segmentation does not depend on the framework; the stored upload
+    # is streamed into the segmenter without building its full text
+    outline = SectionOutline()
+    vocabulary = DocumentVocabulary()
+    segments = segment_blocks(
+        iter_policy_blocks(path, progress=_progress), outline, policy_encoding(path),
+        vocabulary
+    )
+    return SegmentationResult(
+        segments=segments, sections=outline.sections, vocabulary=vocabulary
+    )
+
+
+def analyze_document(file_hash, framework, document, progress):
+    """
+    Background job: analyze one document, reporting stage progress, and
+    store the results in the history.
+    """
+    path = document["source_path"]
+    progress("segmentation")
+    segmentation = segment_policy_text(
+        file_hash, path,
+        _progress=lambda **counts: progress("segmentation", **counts)
+    )
+
+    pipeline = AnalysisPipeline(
+        get_framework_registry().get(framework), source=path, progress=progress,
+        generator=get_generator(), generation_cache=get_generation_cache(),
+        generation_context={"framework": framework, "policy": document["name"]},
+        **ANALYSIS_OPTIONS
+    )
+    pipeline.seed(
+        "ingestion",
+        IngestionResult(source=path, text=None, encoding=policy_encoding(path))
+    )
+    pipeline.seed("segmentation", segmentation)
+
+    final = pipeline.run("final_report")
+    get_history_store().save_analysis(
+        file_hash, framework, final.analysis_results, final.report,
+        *analysis_key(framework)
+    )
+    return {
+        "analysis_results": final.analysis_results,
+        "report": final.report
+    }
+
+
+def submit_analysis(file_hash, framework):
+    """
+    Queue a document for analysis and return at once.
+    """
+    document = get_history_store().get_document(file_hash)
+
+    job = get_job_registry().submit(
+        document["name"], analyze_document, file_hash, framework, document,
+        key=(file_hash, framework)
+    )
+    st.session_state.jobs[(file_hash, framework)] = job.id
+    return job
+
+
+def describe_progress(job):
+    """
+    One-line status of a job for the jobs panel.
+    """
+    snapshot = job.snapshot()
+    if snapshot["status"] == "failed":
+        return f"Failed: {snapshot['error']}"
+    if snapshot["status"] == "queued":
+        return "Queued"
+    if snapshot["status"] == "done":
+        return f"Done in {snapshot['elapsed']:.1f} s"
+
+    counts = snapshot["counts"]
+    details = []
+    if "pages" in counts:
+        details.append(f"{counts['pages']} pages extracted")
+    if "segments" in counts:
+        details.append(f"{counts['segments']} segments scanned")
+    if "clauses_matched" in counts:
+        details.append(f"{counts['clauses_matched']} clauses matched")
+    stage = (snapshot["stage"] or "starting").replace("_", " ")
+    return f"{stage.capitalize()}" + (f" ({', '.join(details)})" if details else "")
+
+
+def build_result(file_name, framework, analysis):
+    """
+    Shape pipeline output for the dashboard widgets.
+    """
+    analysis_results = analysis["analysis_results"]
+
+    def titles(coverage):
+        return [r["title"] for r in analysis_results if r["coverage"] == coverage]
+
+    return {
+        "summary": {
+            "policy_name": file_name,
+            "framework": framework,
+            "compliance_score": 0
+        },
+        "gaps": {
+            "missing": titles("Missing"),
+            "weak": titles("Partial"),
+            "covered": titles("Covered")
+        },
+        "suggestions": [
+            r["suggestion"] for r in analysis_results if r["coverage"] != "Covered"
+        ],
+        "analysis_results": analysis_results,
+        "report": analysis["report"]
+    }
+
+
 # ---------------- Header ----------------
 st.title("Cybersecurity Policy Gap Analyzer")
 st.caption("Offline AI-powered dashboard for cybersecurity policy gap analysis")
@@ -24,10 +280,10 @@ st.caption("Offline AI-powered dashboard for cybersecurity policy gap analysis")
 # ---------------- Sidebar ----------------
 st.sidebar.title("Analysis Settings")
 
-# Framework selection
+# Framework selection (one entry per catalog under data/)
 framework = st.sidebar.selectbox(
     "Security Framework",
-    ["NIST", "CIS Controls v8"]
+    get_framework_registry().names()
 )
 
 st.sidebar.markdown("---")
@@ -94,15 +350,6 @@ st.sidebar.markdown(
 
 st.sidebar.markdown("---")
 
-st.sidebar.markdown("### Uploaded Document History")
-if st.session_state.file_history:
-    for i, name in enumerate(st.session_state.file_history.keys(), start=1):
-        st.sidebar.write(f"{i}. {name}")
-else:
-    st.sidebar.write("No documents uploaded in this session.")
-
-
-
 # ---------------- File Upload ----------------
 uploaded_file = st.file_uploader(
     "Upload Policy Document",
@@ -110,100 +357,182 @@ uploaded_file = st.file_uploader(
 )
 
 if uploaded_file is not None:
-    st.session_state.file_history[uploaded_file.name] = uploaded_file
-    st.session_state.selected_file_name = uploaded_file.name
+    if uploaded_file.file_id not in st.session_state.uploads:
+        try:
+            st.session_state.uploads[uploaded_file.file_id] = store_upload(uploaded_file)
+        except ValueError as error:
+            st.error(str(error))
+            st.session_state.uploads[uploaded_file.file_id] = None
+    if st.session_state.uploads[uploaded_file.file_id] is not None:
+        st.session_state.selected_hash = st.session_state.uploads[uploaded_file.file_id]
+
+# ---------------- Document History ----------------
+# Only one page of document metadata is read per rerun; results are
+# loaded from the store when a document is shown
+store = get_history_store()
+
+st.sidebar.markdown("### Uploaded Document History")
+document_count = store.count_documents()
+page_count = max(1, -(-document_count // HISTORY_PAGE_SIZE))
+history_page_number = (
+    st.sidebar.number_input("History page", min_value=1, max_value=page_count, value=1)
+    if page_count > 1 else 1
+)
+history_offset = (history_page_number - 1) * HISTORY_PAGE_SIZE
+history_page = store.list_documents(HISTORY_PAGE_SIZE, history_offset)
+
+if history_page:
+    for i, document in enumerate(history_page, start=history_offset + 1):
+        analyzed = f" ({', '.join(document['frameworks'])})" if document["frameworks"] else ""
+        st.sidebar.write(f"{i}. {document['name']}{analyzed}")
+else:
+    st.sidebar.write("No documents uploaded yet.")
+
+document_names = {document["content_hash"]: document["name"] for document in history_page}
+
+
+def document_name(file_hash):
+    # Documents outside the history page on display are looked up one by one
+    if file_hash not in document_names:
+        document_names[file_hash] = store.get_document(file_hash)["name"]
+    return document_names[file_hash]
+
+
+if st.session_state.selected_hash is not None:
+    document_name(st.session_state.selected_hash)
 
 st.markdown("### Previously Uploaded Documents")
 
-if st.session_state.file_history:
-    st.session_state.selected_file_name = st.selectbox(
-        "Select a document to analyze",
-        options=list(st.session_state.file_history.keys()),
-        index=list(st.session_state.file_history.keys()).index(
-            st.session_state.selected_file_name
-        ) if st.session_state.selected_file_name else 0
+history = list(document_names)
+selected_files = []
+
+if history:
+    selected_files = st.multiselect(
+        "Select documents to analyze",
+        options=history,
+        default=[
+            st.session_state.selected_hash
+            if st.session_state.selected_hash in document_names else history[0]
+        ],
+        format_func=document_names.get
     )
 else:
-    st.info("No documents uploaded in this session.")
+    st.info("No documents uploaded yet.")
 
 
 # ---------------- History Selection (Main Screen) ----------------
-st.markdown("### Uploaded Documents (Session History)")
+st.markdown("### Uploaded Documents (History)")
 
 analyze = st.button("Analyze Policy")
 
-if analyze and not st.session_state.selected_file_name:
+if analyze and not selected_files:
     st.warning("Please upload or select a policy document to proceed.")
 
-# ---------------- Dummy Backend Output ----------------
-result = {
-    "summary": {
-        "policy_name": "Information Security Policy",
-        "framework": framework,
-        "compliance_score": 0
-    },
-    "gaps": {
-        "missing": [
-            "Multi-factor authentication not defined",
-            "Incident response testing not documented"
-        ],
-        "weak": [
-            "Access control policy lacks role definitions"
-        ],
-        "covered": [
-            "Password policy defined",
-            "User account lifecycle management"
-        ]
-    },
-    "suggestions": [
-        "Implement multi-factor authentication for privileged accounts",
-        "Conduct incident response simulations annually"
-    ]
+if analyze:
+    # Stored analyses are shown as they are; every other document becomes
+    # a background job and the script carries on at once
+    for file_hash in selected_files:
+        if not store.has_analysis(file_hash, framework, *analysis_key(framework)):
+            submit_analysis(file_hash, framework)
+    if selected_files:
+        st.session_state.analyzed_hash = selected_files[-1]
+        st.session_state.analyzed_hashes = list(dict.fromkeys(
+            st.session_state.analyzed_hashes + selected_files
+        ))
+
+# ---------------- Background Jobs ----------------
+registry = get_job_registry()
+session_jobs = {
+    key: registry.get(job_id)
+    for key, job_id in st.session_state.jobs.items()
+    if registry.get(job_id) is not None
 }
 
-# ---------------- Dynamic Compliance Calculation ----------------
+# A framework switch re-analyzes the document on display in the
+# background, unless the store already has it under that framework
+analyzed_hash = st.session_state.get("analyzed_hash")
+if (
+    analyzed_hash is not None
+    and (analyzed_hash, framework) not in session_jobs
+    and not store.has_analysis(analyzed_hash, framework, *analysis_key(framework))
+):
+    session_jobs[(analyzed_hash, framework)] = submit_analysis(analyzed_hash, framework)
+
+if session_jobs:
+    st.markdown("### Analysis Jobs")
+    for (file_hash, job_framework), job in session_jobs.items():
+        stages = AnalysisPipeline.STAGES
+        fraction = 1.0 if job.finished else (
+            stages.index(job.stage) / len(stages) if job.stage in stages else 0.0
+        )
+        st.progress(fraction, text=f"{job.name} [{job_framework}]: {describe_progress(job)}")
+
+done = [
+    file_hash for file_hash in st.session_state.analyzed_hashes
+    if store.has_analysis(file_hash, framework, *analysis_key(framework))
+]
+if done:
+    st.session_state.analyzed_hash = st.selectbox(
+        "Show results for",
+        options=done,
+        index=done.index(analyzed_hash) if analyzed_hash in done else len(done) - 1,
+        format_func=document_name
+    )
 
-# Base compliance (from gaps)
-total_controls = (
-    len(result["gaps"]["missing"]) +
-    len(result["gaps"]["weak"]) +
-    len(result["gaps"]["covered"])
+# ---------------- Backend Output ----------------
+# Only the framework changes the analysis itself; mode and sensitivity
+# below adjust the score of a finished analysis without rerunning it.
+result = None
+shown_hash = st.session_state.get("analyzed_hash")
+shown_analysis = (
+    store.load_analysis(shown_hash, framework, *analysis_key(framework))
+    if shown_hash in done else None
 )
 
-if total_controls > 0:
-    compliance_score = (
-        len(result["gaps"]["covered"]) / total_controls
-    ) * 100
-else:
-    compliance_score = 0
+if shown_analysis is not None:
+    result = build_result(document_name(shown_hash), framework, shown_analysis)
 
-# ---------------- Analysis Mode Adjustment ----------------
-# Quick = lenient, Deep = strict
-if analysis_mode == "Quick Scan":
-    analysis_factor = 0.9
-elif analysis_mode == "Standard Analysis":
-    analysis_factor = 1.0
-else:  # Deep Compliance Review
-    analysis_factor = 1.2
+# ---------------- Dynamic Compliance Calculation ----------------
 
-compliance_score = compliance_score / analysis_factor
+if result is not None:
+    # Base compliance (from gaps)
+    total_controls = (
+        len(result["gaps"]["missing"]) +
+        len(result["gaps"]["weak"]) +
+        len(result["gaps"]["covered"])
+    )
 
-# ---------------- Risk Sensitivity Adjustment ----------------
-# Sensitivity range: 1 (low) → 5 (high)
-risk_penalty = (risk_sensitivity - 3) * 5
-compliance_score = compliance_score - risk_penalty
+    if total_controls > 0:
+        compliance_score = (
+            len(result["gaps"]["covered"]) / total_controls
+        ) * 100
+    else:
+        compliance_score = 0
 
-# ---------------- Final Normalization ----------------
-compliance_score = round(max(0, min(100, compliance_score)))
+    # ---------------- Analysis Mode Adjustment ----------------
+    # Quick = lenient, Deep = strict
+    if analysis_mode == "Quick Scan":
+        analysis_factor = 0.9
+    elif analysis_mode == "Standard Analysis":
+        analysis_factor = 1.0
+    else:  # Deep Compliance Review
+        analysis_factor = 1.2
 
-result["summary"]["compliance_score"] = compliance_score
+    compliance_score = compliance_score / analysis_factor
 
+    # ---------------- Risk Sensitivity Adjustment ----------------
+    # Sensitivity range: 1 (low) → 5 (high)
+    risk_penalty = (risk_sensitivity - 3) * 5
+    compliance_score = compliance_score - risk_penalty
 
-# ---------------- Main Dashboard ----------------
-if analyze and uploaded_file:
+    # ---------------- Final Normalization ----------------
+    compliance_score = round(max(0, min(100, compliance_score)))
+
+    result["summary"]["compliance_score"] = compliance_score
 
-    with st.spinner("Analyzing policy using offline AI model..."):
-        pass
+
+# ---------------- Main Dashboard ----------------
+if result is not None:
 
     st.success("Policy analysis completed successfully.")
     st.divider()
@@ -256,11 +585,18 @@ if analyze and uploaded_file:
         st.dataframe(maturity, use_container_width=True)
 
         st.markdown("### Framework Coverage Mapping")
+        results_df = pd.DataFrame(result["analysis_results"])
+        function_counts = (
+            results_df.groupby(["nist_function", "coverage"], sort=False)
+            .size()
+            .unstack(fill_value=0)
+            .reindex(columns=["Missing", "Partial", "Covered"], fill_value=0)
+        )
         framework_map = pd.DataFrame({
-            "Framework Function": [
-                "Identify", "Protect", "Detect", "Respond", "Recover"
-            ],
-            "Coverage (%)": [70, 65, 60, 40, 30]
+            "Framework Function": function_counts.index,
+            "Coverage (%)": (
+                function_counts["Covered"] / function_counts.sum(axis=1) * 100
+            ).round(1).values
         })
 
         st.plotly_chart(
@@ -323,15 +659,9 @@ if analyze and uploaded_file:
         st.markdown("### Domain-wise Gap Distribution")
 
         domain_data = pd.DataFrame({
-            "Domain": [
-                "Access Control",
-                "Incident Response",
-                "Risk Management",
-                "Data Protection",
-                "Asset Management"
-            ],
-            "Missing Controls": [2, 2, 1, 0, 1],
-            "Weak Controls": [1, 1, 0, 1, 0]
+            "Domain": function_counts.index,
+            "Missing Controls": function_counts["Missing"].values,
+            "Weak Controls": function_counts["Partial"].values
         })
 
         st.plotly_chart(
@@ -350,7 +680,7 @@ if analyze and uploaded_file:
 
         heatmap_data = pd.DataFrame({
             "Domain": domain_data["Domain"],
-            "Risk Score": [90, 85, 60, 40, 55]
+            "Risk Score": (100 - framework_map["Coverage (%)"]).values
         })
 
         st.plotly_chart(
@@ -365,14 +695,10 @@ if analyze and uploaded_file:
         st.markdown("### Control-Level Mapping")
 
         control_map = pd.DataFrame({
-            "Control ID": ["PR.AC-1", "PR.AC-7", "IR-4", "ID.RA-1"],
-            "Description": [
-                "Identities and credentials managed",
-                "User authentication enforced",
-                "Incident response executed",
-                "Risk assessment conducted"
-            ],
-            "Status": ["Missing", "Weak", "Missing", "Covered"]
+            "Control ID": results_df["clause_id"],
+            "Description": results_df["title"],
+            "Status": results_df["coverage"].replace({"Partial": "Weak"}),
+            "Match Score": results_df["match_score"]
         })
 
         st.dataframe(control_map, use_container_width=True)
@@ -453,20 +779,27 @@ if analyze and uploaded_file:
         else:
             st.error("The policy is non-compliant and requires immediate remediation.")
 
-        # ---------------- FIXED DOWNLOAD SECTION ----------------
-        gap_rows = []
-        for gap_type, controls in result["gaps"].items():
-            for control in controls:
-                gap_rows.append({
-                    "Gap Type": gap_type.capitalize(),
-                    "Control Description": control
-                })
-
-        gap_report_df = pd.DataFrame(gap_rows)
+        # ---------------- DOWNLOAD SECTION ----------------
+        export_format = st.selectbox(
+            "Export format", available_formats(), format_func=str.upper
+        )
+        # The stored analysis is identified by document, framework and key,
+        # so reruns reuse its export instead of rebuilding it
+        export_data = export_gap_report(
+            shown_hash, framework, analysis_key(framework), export_format,
+            result["summary"]["policy_name"], result["analysis_results"]
+        )
 
         st.download_button(
-            "Download Gap Report (CSV)",
-            gap_report_df.to_csv(index=False),
-            "policy_gap_report.csv",
-            "text/csv"
+            f"Download Gap Report ({export_format.upper()})",
+            export_data,
+            f"policy_gap_report.{export_format}",
+            MIME_TYPES[export_format]
         )
+
+
+# ---------------- Job Polling ----------------
+# Rerun while jobs are active so their progress and results show up
+if any(not job.finished for job in session_jobs.values()):
+    time.sleep(POLL_SECONDS)
+    st.rerun()
@@ -0,0 +1,212 @@
+"""
+Benchmark every analysis stage on synthetic data.
+
+    python benchmarks/run_benchmarks.py --clauses 1000 --policy-mb 10 \
+        --output bench.json
+    python benchmarks/run_benchmarks.py --clauses 1000 --policy-mb 10 \
+        --baseline bench.json --max-slowdown 1.2
+
+With --baseline, stages slower than max-slowdown x the baseline timing
+are reported and the script exits with status 1. A baseline generated
+with other data parameters (clauses, policy size, overlap or seed) is
+refused.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from synthetic import write_clause_catalog, write_policy  # noqa: E402
+
+from ingestion.document_loader import load_policy_text  # noqa: E402
+from nlp.clause_library import load_clause_library  # noqa: E402
+from nlp.clause_preprocessing import preprocess_clauses  # noqa: E402
+from nlp.matching import find_best_segment_match  # noqa: E402
+from nlp.preprocessing import normalize_text, segment_policy  # noqa: E402
+from pipeline import AnalysisPipeline  # noqa: E402
+from reporting.final_report import generate_compliance_report  # noqa: E402
+from reporting.gap_report import generate_gap_report  # noqa: E402
+
+# Timings are only comparable between runs on the same synthetic data
+DATA_PARAMETERS = ("clauses", "policy_mb", "overlap", "seed")
+
+
+def time_stage(function, repeat):
+    """
+    Run function `repeat` times; returns (best seconds, all runs, last result).
+    """
+    runs = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        runs.append(time.perf_counter() - start)
+    return min(runs), runs, result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+            text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(args, work_dir):
+    catalog_path = os.path.join(work_dir, "clauses.json")
+    policy_path = os.path.join(work_dir, "policy.txt")
+
+    raw_clauses = write_clause_catalog(catalog_path, args.clauses, seed=args.seed)
+    write_policy(
+        policy_path, int(args.policy_mb * 1024 * 1024), raw_clauses,
+        overlap=args.overlap, seed=args.seed
+    )
+    text = load_policy_text(policy_path)
+
+    timings = {}
+
+    def record(name, function, repeat=args.repeat, **extra):
+        seconds, runs, result = time_stage(function, repeat)
+        timings[name] = {"seconds": seconds, "runs": runs, **extra}
+        print(f"{name:<28} {seconds:10.4f} s")
+        return result
+
+    clauses = record("preprocess_clauses", lambda: preprocess_clauses(raw_clauses))
+    segments = record("segment_policy", lambda: segment_policy(text))
+    record(
+        "normalize_text",
+        lambda: [normalize_text(segment["text"]) for segment in segments],
+        items=len(segments)
+    )
+
+    # Pairwise matching is clauses x segments; time a sample of clauses
+    sample = clauses[:args.match_sample]
+    record(
+        "find_best_segment_match",
+        lambda: [find_best_segment_match(clause, segments) for clause in sample],
+        clauses_sampled=len(sample)
+    )
+
+    gap_report = record(
+        "generate_gap_report", lambda: generate_gap_report(clauses, segments)
+    )
+
+    library = load_clause_library(
+        catalog_path, artifact_path=os.path.join(work_dir, "clauses.clib")
+    )
+    analysis_results = AnalysisPipeline(library, text=text).run().analysis_results
+    record(
+        "generate_compliance_report",
+        lambda: generate_compliance_report(analysis_results)
+    )
+
+    def end_to_end():
+        fresh_library = load_clause_library(
+            catalog_path, artifact_path=os.path.join(work_dir, "clauses.clib")
+        )
+        return AnalysisPipeline(fresh_library, source=policy_path).run()
+
+    record("end_to_end", end_to_end)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "clauses": args.clauses,
+            "policy_mb": args.policy_mb,
+            "overlap": args.overlap,
+            "segments": len(segments),
+            "gap_report_rows": len(gap_report),
+            "seed": args.seed,
+            "repeat": args.repeat
+        },
+        "timings": timings
+    }
+
+
+def compare(results, baseline, max_slowdown):
+    """
+    Return the stages slower than max_slowdown x their baseline timing.
+    Raises ValueError if the baseline was run on different synthetic data.
+    """
+    meta, baseline_meta = results["meta"], baseline.get("meta", {})
+    mismatches = [
+        f"{key}={baseline_meta.get(key)!r} (now {meta[key]!r})"
+        for key in DATA_PARAMETERS
+        if baseline_meta.get(key) != meta[key]
+    ]
+    if mismatches:
+        raise ValueError(
+            "baseline was run with different data: " + ", ".join(mismatches)
+        )
+
+    regressions = []
+    for name, timing in results["timings"].items():
+        previous = baseline.get("timings", {}).get(name)
+        if not previous or previous["seconds"] <= 0:
+            continue
+        ratio = timing["seconds"] / previous["seconds"]
+        print(f"{name:<28} {ratio:6.2f}x baseline")
+        if ratio > max_slowdown:
+            regressions.append({"stage": name, "ratio": ratio})
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Policy gap analysis benchmarks")
+    parser.add_argument("--clauses", type=int, default=500, help="Synthetic clauses (up to 10000)")
+    parser.add_argument("--policy-mb", type=float, default=5.0, help="Synthetic policy size in MB (up to 100)")
+    parser.add_argument("--overlap", type=float, default=0.3, help="Fraction of sentences containing clause keywords")
+    parser.add_argument("--match-sample", type=int, default=20, help="Clauses timed with find_best_segment_match")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Results JSON from an earlier commit to compare against")
+    parser.add_argument("--max-slowdown", type=float, default=1.2, help="Allowed ratio to the baseline before failing")
+    parser.add_argument("--work-dir", help="Keep generated data here instead of a temporary directory")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+        results = run_benchmarks(args, args.work_dir)
+    else:
+        with tempfile.TemporaryDirectory() as work_dir:
+            results = run_benchmarks(args, work_dir)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+
+        try:
+            regressions = compare(results, baseline, args.max_slowdown)
+        except ValueError as error:
+            sys.exit(f"Cannot compare with {args.baseline}: {error}")
+        for regression in regressions:
+            print(
+                f"REGRESSION: {regression['stage']} is {regression['ratio']:.2f}x "
+                f"slower than baseline (limit {args.max_slowdown:.2f}x)"
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import json
+import random
+
+NIST_FUNCTIONS = {
+    "Identify": ["ID.AM", "ID.RA", "ID.GV"],
+    "Protect": ["PR.AC", "PR.DS", "PR.IP"],
+    "Detect": ["DE.CM", "DE.AE"],
+    "Respond": ["RS.RP", "RS.CO"],
+    "Recover": ["RC.RP", "RC.IM"]
+}
+SEVERITIES = ["High", "Medium", "Low"]
+SYLLABLES = [
+    "ac", "ces", "con", "trol", "da", "ta", "in", "ven", "to", "ry",
+    "mo", "ni", "tor", "log", "ging", "re", "spon", "se", "plan", "cov",
+    "er", "back", "up", "en", "cryp", "tion", "au", "dit", "pol", "i",
+    "cy", "sys", "tem", "net", "work", "as", "set", "pro", "cess", "user"
+]
+
+
+def make_vocabulary(size, seed=0):
+    """
+    Deterministic pseudo-words built from security-flavoured syllables.
+    """
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def zipf_weights(n, exponent=1.1):
+    """
+    Rank-frequency weights so a few terms are common and most are rare,
+    as with real framework keywords.
+    """
+    return [1.0 / (rank ** exponent) for rank in range(1, n + 1)]
+
+
+def generate_clause_catalog(n_clauses, vocabulary_size=5000, seed=0):
+    """
+    Build a synthetic clause catalog in the policy_clauses.json schema.
+    """
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size, seed)
+    weights = zipf_weights(len(vocabulary))
+    functions = list(NIST_FUNCTIONS)
+
+    clauses = []
+    for i in range(n_clauses):
+        function = rng.choice(functions)
+        category = rng.choice(NIST_FUNCTIONS[function])
+        keywords = [
+            " ".join(rng.choices(vocabulary, weights, k=rng.randint(1, 3)))
+            for _ in range(rng.randint(2, 6))
+        ]
+        title_words = rng.choices(vocabulary, weights, k=3)
+
+        clauses.append({
+            "clause_id": f"{category.replace('.', '-')}-{i:05d}",
+            "nist_function": function,
+            "nist_category": category,
+            "title": " ".join(word.capitalize() for word in title_words),
+            "description": (
+                "The organization shall " + " ".join(rng.choices(vocabulary, weights, k=12)) + "."
+            ),
+            "keywords": keywords,
+            "severity": rng.choice(SEVERITIES)
+        })
+
+    return clauses
+
+
+def write_clause_catalog(filepath, n_clauses, vocabulary_size=5000, seed=0):
+    clauses = generate_clause_catalog(n_clauses, vocabulary_size, seed)
+    with open(filepath, "w", encoding="utf-8") as file:
+        json.dump(clauses, file)
+    return clauses
+
+
+def write_policy(filepath, target_bytes, clauses, overlap=0.3, seed=0,
+                 vocabulary_size=5000):
+    """
+    Write a synthetic policy of about target_bytes. A fraction `overlap`
+    of sentences embeds a keyword phrase of a random clause; the rest is
+    filler drawn from the same vocabulary.
+    """
+    rng = random.Random(seed + 1)
+    vocabulary = make_vocabulary(vocabulary_size, seed)
+    weights = zipf_weights(len(vocabulary))
+    written = 0
+
+    with open(filepath, "w", encoding="utf-8") as file:
+        while written < target_bytes:
+            paragraph = []
+            for _ in range(rng.randint(3, 8)):
+                words = rng.choices(vocabulary, weights, k=rng.randint(8, 20))
+                if clauses and rng.random() < overlap:
+                    keyword = rng.choice(rng.choice(clauses)["keywords"])
+                    words.insert(rng.randrange(len(words) + 1), keyword)
+                paragraph.append(" ".join(words).capitalize() + ".")
+
+            text = " ".join(paragraph) + "\n\n"
+            file.write(text)
+            written += len(text.encode("utf-8"))
+
+    return written
@@ -0,0 +1,42 @@
+from instrumentation.metrics import stage_timer, timed_blocks
+from ingestion.registry import document_encoding, iter_document_blocks
+from ingestion.text_loader import iter_text_blocks
+
+
+def load_policy_text(filepath):
+    """
+    Load organizational policy text from a file, in whatever encoding
+    it was saved.
+    """
+    return "".join(iter_text_blocks(filepath))
+
+
+def load_policy_document(filepath, workers=None, progress=None):
+    """
+    Load policy text from a TXT, PDF or DOCX file.
+    workers bounds the processes used for PDF page extraction;
+    progress is called as progress(pages=n) while PDF pages are extracted.
+    Prefer iter_policy_blocks where the text is only segmented.
+    """
+    with stage_timer("ingestion"):
+        return "".join(iter_document_blocks(filepath, workers=workers, progress=progress))
+
+
+def iter_policy_blocks(filepath, workers=None, progress=None):
+    """
+    Stream a TXT, PDF or DOCX policy as text blocks whose concatenation
+    equals load_policy_document(filepath), without holding the whole
+    text. The format is sniffed from the content (ingestion.registry).
+    Producing the blocks is timed as the "ingestion" stage.
+    """
+    return timed_blocks(
+        "ingestion", iter_document_blocks(filepath, workers=workers, progress=progress)
+    )
+
+
+def policy_encoding(filepath):
+    """
+    Encoding to pass to nlp.preprocessing.iter_segments with the blocks
+    of iter_policy_blocks, so segment byte offsets point into the file.
+    """
+    return document_encoding(filepath)
@@ -0,0 +1,103 @@
+from xml.etree import ElementTree
+import os
+import re
+import zipfile
+
+DEFAULT_CHUNK_SIZE = 64 * 1024  # characters
+DOCUMENT_PART = "word/document.xml"
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# Built-in heading style ids; custom and localized styles read as body text
+HEADING_STYLE = re.compile(r"^[Hh]eading\s?([1-6])$")
+
+
+def is_docx(filepath):
+    """
+    True for ZIP packages with a WordprocessingML main document part.
+    """
+    if not zipfile.is_zipfile(filepath):
+        return False
+    with zipfile.ZipFile(filepath) as archive:
+        return DOCUMENT_PART in archive.namelist()
+
+
+def _heading_prefix(style):
+    """
+    Markdown heading marker for a paragraph style, so the segmenter's
+    SectionOutline sees Word headings as sections.
+    """
+    if style == "Title":
+        return "# "
+    match = HEADING_STYLE.match(style or "")
+    return "#" * int(match.group(1)) + " " if match else ""
+
+
+def iter_docx_paragraphs(filepath):
+    """
+    Stream the non-empty paragraphs of a DOCX file, in document order.
+
+    word/document.xml is parsed incrementally straight from the archive
+    and every top-level body element is discarded once read, so memory
+    does not grow with the document. Tabs and line breaks inside a
+    paragraph are kept; table cells read as paragraphs of their own.
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"DOCX file not found: {filepath}")
+
+    with zipfile.ZipFile(filepath) as archive, archive.open(DOCUMENT_PART) as part:
+        parts = []
+        style = None
+        body = None
+        depth = 0
+
+        for event, element in ElementTree.iterparse(part, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if element.tag == WORD_NAMESPACE + "body":
+                    body = element
+                continue
+
+            depth -= 1
+            tag = element.tag
+
+            if tag == WORD_NAMESPACE + "t":
+                parts.append(element.text or "")
+            elif tag == WORD_NAMESPACE + "tab":
+                parts.append("\t")
+            elif tag in (WORD_NAMESPACE + "br", WORD_NAMESPACE + "cr"):
+                parts.append("\n")
+            elif tag == WORD_NAMESPACE + "pStyle":
+                style = element.get(WORD_NAMESPACE + "val")
+            elif tag == WORD_NAMESPACE + "p":
+                text = "".join(parts).strip()
+                if text:
+                    yield _heading_prefix(style) + text
+                parts = []
+                style = None
+
+            # document > body > paragraph or table
+            if depth == 2 and body is not None:
+                body.clear()
+
+
+def iter_docx_blocks(filepath, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream a DOCX file as text blocks of about chunk_size characters,
+    with paragraphs separated by blank lines.
+    """
+    separator = ""
+    pending = []
+    size = 0
+
+    for paragraph in iter_docx_paragraphs(filepath):
+        pending.append(separator + paragraph)
+        size += len(pending[-1])
+        separator = "\n\n"
+
+        if size >= chunk_size:
+            yield "".join(pending)
+            pending = []
+            size = 0
+
+    if pending:
+        yield "".join(pending)
@@ -1,21 +1,176 @@
+from concurrent.futures import ProcessPoolExecutor
 from PyPDF2 import PdfReader
+import hashlib
+import json
 import os
+import tempfile
 
+from instrumentation.metrics import increment, stage_timer, timed_blocks
 
-def load_policy_pdf(filepath):
+DEFAULT_CACHE_DIR = os.path.join(".cache", "pdf_text")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256 MB
+CACHE_SUFFIX = ".jsonl"
+PAGES_PER_TASK = 16
+
+
+def file_hash(filepath):
     """
-    Extract text from a PDF policy document (offline).
+    SHA-256 of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _extract_page_range(filepath, start, end):
+    reader = PdfReader(filepath)
+    return [
+        reader.pages[number].extract_text() or ""
+        for number in range(start, end)
+    ]
+
+
+def _extract_pages(filepath, workers, pages_per_task):
+    page_count = len(PdfReader(filepath).pages)
+    ranges = [
+        (start, min(start + pages_per_task, page_count))
+        for start in range(0, page_count, pages_per_task)
+    ]
+
+    if workers == 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            yield from _extract_page_range(filepath, start, end)
+        return
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [
+            executor.submit(_extract_page_range, filepath, start, end)
+            for start, end in ranges
+        ]
+        # Ranges finish out of order; yield them strictly in page order
+        for future in futures:
+            yield from future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def evict_text_cache(cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Delete the least recently used extracted-text files until the cache
+    fits max_bytes. Reads refresh a file's modification time.
+    """
+    if not os.path.isdir(cache_dir):
+        return
+
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(CACHE_SUFFIX):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def _read_cached_pages(cache_path):
+    try:
+        cache_file = open(cache_path, "r", encoding="utf-8")
+        # Another process may evict the file right after it is opened
+        os.utime(cache_path)
+    except OSError:
+        return None
+    return cache_file
+
+
+def iter_pdf_pages(filepath, workers=None, pages_per_task=PAGES_PER_TASK,
+                   cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Stream the text of each PDF page, in page order.
+
+    Page ranges are extracted in parallel worker processes. Extracted
+    text is cached under the file's content hash, so a re-run or a
+    re-upload of the same PDF is served from the cache without PyPDF2.
+    The least recently used entries are evicted once the cache grows
+    beyond max_bytes.
     """
 
     if not os.path.exists(filepath):
         raise FileNotFoundError(f"PDF file not found: {filepath}")
 
-    reader = PdfReader(filepath)
+    cache_path = os.path.join(cache_dir, f"{file_hash(filepath)}{CACHE_SUFFIX}")
+
+    cache_file = _read_cached_pages(cache_path)
+    if cache_file is not None:
+        increment("pdf_text_cache_hits")
+        with cache_file:
+            for line in cache_file:
+                increment("pages")
+                yield json.loads(line)
+        return
+
+    increment("pdf_text_cache_misses")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # A unique name per writer, so threads and processes extracting the
+    # same PDF never write into one file
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as cache_file:
+            for text in _extract_pages(filepath, workers, pages_per_task):
+                cache_file.write(json.dumps(text) + "\n")
+                increment("pages")
+                yield text
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        # Never leave a partial extraction behind as a cache entry
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    evict_text_cache(cache_dir, max_bytes)
+
+
+def load_policy_pdf(filepath, workers=None, progress=None):
+    """
+    Extract text from a PDF policy document (offline).
+    progress, if given, is called as progress(pages=n) after each page.
+    """
+
     extracted_text = []
 
-    for page in reader.pages:
-        text = page.extract_text()
-        if text:
-            extracted_text.append(text)
+    with stage_timer("pdf_extraction"):
+        for number, text in enumerate(iter_pdf_pages(filepath, workers=workers), start=1):
+            if text:
+                extracted_text.append(text)
+            if progress is not None:
+                progress(pages=number)
 
     return "\n".join(extracted_text)
+
+
+def iter_pdf_blocks(filepath, workers=None, progress=None):
+    """
+    Stream a PDF as one text block per non-empty page, joined like
+    load_policy_pdf. progress works as in load_policy_pdf. Extraction
+    is timed as the "pdf_extraction" stage, apart from the consumer.
+    """
+    separator = ""
+    pages = timed_blocks("pdf_extraction", iter_pdf_pages(filepath, workers=workers))
+    for number, text in enumerate(pages, start=1):
+        if text:
+            yield separator + text
+            separator = "\n"
+        if progress is not None:
+            progress(pages=number)
@@ -0,0 +1,92 @@
+import os
+
+from ingestion.text_loader import SNIFF_BYTES, looks_like_text, sniff_encoding
+
+PDF_HEADER = b"%PDF-"
+
+
+def _sniff_pdf(filepath):
+    with open(filepath, "rb") as file:
+        return file.read(len(PDF_HEADER)) == PDF_HEADER
+
+
+def _iter_pdf(filepath, workers=None, progress=None):
+    # PyPDF2 is only needed once a PDF actually shows up
+    from ingestion.pdf_loader import iter_pdf_blocks
+    return iter_pdf_blocks(filepath, workers=workers, progress=progress)
+
+
+def _sniff_docx(filepath):
+    from ingestion.docx_loader import is_docx
+    return is_docx(filepath)
+
+
+def _iter_docx(filepath, workers=None, progress=None):
+    from ingestion.docx_loader import iter_docx_blocks
+    return iter_docx_blocks(filepath)
+
+
+def _sniff_text(filepath):
+    with open(filepath, "rb") as file:
+        return looks_like_text(file.read(SNIFF_BYTES))
+
+
+def _iter_text(filepath, workers=None, progress=None):
+    from ingestion.text_loader import iter_text_blocks
+    return iter_text_blocks(filepath)
+
+
+# Format name -> (sniff(filepath), iter_blocks(filepath, workers, progress)).
+# Formats are tried in order; plain text is the fallback and stays last.
+FORMATS = {
+    "pdf": (_sniff_pdf, _iter_pdf),
+    "docx": (_sniff_docx, _iter_docx),
+    "text": (_sniff_text, _iter_text)
+}
+
+
+def register_format(name, sniff, iter_blocks):
+    """
+    Add (or replace) a document format, tried before plain text.
+    iter_blocks(filepath, workers=None, progress=None) must yield text
+    blocks whose concatenation is the document text.
+    """
+    text = FORMATS.pop("text")
+    FORMATS.pop(name, None)
+    FORMATS[name] = (sniff, iter_blocks)
+    FORMATS["text"] = text
+
+
+def sniff_format(filepath):
+    """
+    Name of the format of a file, decided by its content rather than
+    its extension.
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"Policy file not found: {filepath}")
+
+    for name, (sniff, _) in FORMATS.items():
+        if sniff(filepath):
+            return name
+
+    raise ValueError(f"Unsupported policy document format: {filepath}")
+
+
+def document_encoding(filepath):
+    """
+    Encoding in which the text blocks of a document measure its bytes:
+    the file's own encoding for plain text, and UTF-8 for formats whose
+    text is extracted, where offsets refer to the extracted text.
+    """
+    if sniff_format(filepath) != "text":
+        return "utf-8"
+    return sniff_encoding(filepath)
+
+
+def iter_document_blocks(filepath, workers=None, progress=None):
+    """
+    Stream any supported policy document as text blocks, to be fed
+    straight into nlp.preprocessing.iter_segments.
+    """
+    _, iter_blocks = FORMATS[sniff_format(filepath)]
+    return iter_blocks(filepath, workers=workers, progress=progress)
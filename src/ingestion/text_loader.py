@@ -0,0 +1,96 @@
+import codecs
+import mmap
+import os
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # bytes
+SNIFF_BYTES = 64 * 1024
+
+# Longest BOM first: the UTF-32 LE BOM starts with the UTF-16 LE one
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16")
+)
+
+
+def detect_encoding(sample):
+    """
+    Guess the encoding of a text file from its first bytes.
+
+    A byte order mark decides outright. Otherwise the sample must decode
+    as UTF-8 (a multi-byte character cut off at its end is allowed);
+    NUL bytes on alternating positions mean BOM-less UTF-16, and
+    anything else is read as Windows-1252, or Latin-1 as a last resort.
+    """
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    if b"\x00" in sample:
+        half = len(sample) // 2
+        if sample[1::2].count(0) > half // 2:
+            return "utf-16-le"
+        if sample[0::2].count(0) > half // 2:
+            return "utf-16-be"
+
+    for encoding in ("utf-8", "cp1252"):
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        except UnicodeDecodeError:
+            continue
+        return encoding
+
+    return "latin-1"
+
+
+def sniff_encoding(filepath):
+    """
+    detect_encoding of a text file's first SNIFF_BYTES.
+    """
+    with open(filepath, "rb") as file:
+        return detect_encoding(file.read(SNIFF_BYTES))
+
+
+def looks_like_text(sample):
+    """
+    False for samples with NUL bytes that no UTF-16/32 encoding explains.
+    """
+    return b"\x00" not in sample or detect_encoding(sample).startswith("utf-")
+
+
+def iter_text_blocks(filepath, chunk_size=DEFAULT_CHUNK_SIZE, encoding=None):
+    """
+    Stream a text file as decoded blocks of about chunk_size bytes.
+
+    The file is memory-mapped, so the OS pages it in as the blocks are
+    consumed and only one block is decoded at a time. The encoding is
+    detected from the first SNIFF_BYTES unless given. Line endings are
+    kept as they are in the file, so that segment byte offsets taken in
+    that encoding (see nlp.preprocessing.iter_segments) point into the
+    file. Undecodable
+    bytes become U+FFFD instead of aborting the analysis; offsets after
+    one are only exact if it stood for a single character's bytes.
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"Policy file not found: {filepath}")
+
+    with open(filepath, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            # Empty files cannot be mapped
+            return
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            encoding = encoding or detect_encoding(view[:SNIFF_BYTES])
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+            for start in range(0, size, chunk_size):
+                text = decoder.decode(view[start:start + chunk_size])
+                if text:
+                    yield text
+
+            text = decoder.decode(b"", final=True)
+            if text:
+                yield text
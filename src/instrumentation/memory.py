@@ -0,0 +1,190 @@
+from contextlib import contextmanager
+import os
+import threading
+import tracemalloc
+
+# Peak bytes held while segmenting, per byte of source document: the text
+# itself plus the segment dicts with their raw and normalized strings
+SEGMENTATION_OVERHEAD = 6
+TOP_SITES = 5
+
+
+class MemoryTracker:
+    """
+    Optional per-stage allocation accounting built on tracemalloc.
+
+    For every stage it records the peak traced memory above the level at
+    stage entry and the memory still retained at exit, plus the source
+    lines that allocated the most during the stage. Nested stages are
+    inclusive, like the stage timings in instrumentation.metrics.
+
+    Tracing slows allocation-heavy code down noticeably, so the tracker
+    does nothing until start() is called.
+    """
+
+    def __init__(self, top_sites=TOP_SITES):
+        self.top_sites = top_sites
+        self.enabled = False
+        self.stages = {}
+        self._frames = []
+        self._lock = threading.Lock()
+
+    def start(self, frames=1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+        self._frames = []
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Account the allocations of a block of work to the given stage.
+        """
+        if not self.enabled or threading.current_thread() is not threading.main_thread():
+            # tracemalloc peaks are process-wide; only the main thread is attributed
+            yield
+            return
+
+        current, peak = tracemalloc.get_traced_memory()
+        if self._frames:
+            # The parent's peak so far must survive the reset below
+            self._frames[-1]["peak"] = max(self._frames[-1]["peak"], peak)
+
+        frame = {
+            "start": current,
+            "peak": current,
+            "snapshot": tracemalloc.take_snapshot() if self.top_sites else None
+        }
+        self._frames.append(frame)
+        tracemalloc.reset_peak()
+
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            self._frames.pop()
+            frame["peak"] = max(frame["peak"], peak)
+            if self._frames:
+                self._frames[-1]["peak"] = max(self._frames[-1]["peak"], frame["peak"])
+
+            sites = []
+            if frame["snapshot"] is not None:
+                sites = _top_sites(frame["snapshot"], self.top_sites)
+
+            self._record(name, frame["peak"] - frame["start"], current - frame["start"], sites)
+
+    def _record(self, name, peak, retained, sites, calls=1):
+        with self._lock:
+            stage = self.stages.setdefault(
+                name, {"calls": 0, "peak_bytes": 0, "retained_bytes": 0, "top_sites": []}
+            )
+            stage["calls"] += calls
+            stage["retained_bytes"] += retained
+            if peak >= stage["peak_bytes"]:
+                # Keep the allocation sites of the call with the highest peak
+                stage["peak_bytes"] = peak
+                stage["top_sites"] = sites
+
+    def merge(self, snapshot):
+        """
+        Fold in a snapshot from another process (e.g. a batch worker).
+        """
+        for name, stage in snapshot.items():
+            self._record(
+                name, stage["peak_bytes"], stage["retained_bytes"],
+                stage["top_sites"], calls=stage["calls"]
+            )
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {**stage, "top_sites": list(stage["top_sites"])}
+                for name, stage in self.stages.items()
+            }
+
+    def report(self):
+        """
+        Human-readable table of stage peaks, retained memory and the
+        largest allocation sites of each stage.
+        """
+        snapshot = self.snapshot()
+        lines = [f"{'Stage':<28}{'Peak MB':>12}{'Retained MB':>14}"]
+        ordered = sorted(snapshot.items(), key=lambda item: -item[1]["peak_bytes"])
+
+        for name, stage in ordered:
+            lines.append(
+                f"{name:<28}{_mb(stage['peak_bytes']):>12.2f}"
+                f"{_mb(stage['retained_bytes']):>14.2f}"
+            )
+
+        for name, stage in ordered:
+            if not stage["top_sites"]:
+                continue
+            lines.append("")
+            lines.append(f"Top allocation sites in {name}:")
+            for site in stage["top_sites"]:
+                lines.append(
+                    f"  {_mb(site['bytes']):>8.2f} MB  {site['count']:>9} blocks  "
+                    f"{site['location']}"
+                )
+
+        return "\n".join(lines)
+
+
+def _top_sites(before, limit):
+    after = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, os.path.join(os.path.dirname(__file__), "*"))
+    ])
+    differences = after.compare_to(before, "lineno")
+
+    sites = []
+    for stat in differences:
+        if stat.size_diff <= 0:
+            continue
+        frame = stat.traceback[0]
+        sites.append({
+            "location": f"{frame.filename}:{frame.lineno}",
+            "bytes": stat.size_diff,
+            "count": stat.count_diff
+        })
+        if len(sites) == limit:
+            break
+
+    return sites
+
+
+def _mb(size):
+    return size / (1024 * 1024)
+
+
+def estimate_segmentation_memory(filepath):
+    """
+    Rough peak memory needed to load and segment a document in one go.
+    """
+    return os.path.getsize(filepath) * SEGMENTATION_OVERHEAD
+
+
+def parse_size(value):
+    """
+    Parse a byte size such as "512M", "2G" or "1048576".
+    """
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    value = value.strip().upper().removesuffix("B")
+
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+MEMORY = MemoryTracker()
+
@@ -0,0 +1,183 @@
+from contextlib import contextmanager
+import json
+import os
+import re
+import threading
+import time
+
+from instrumentation.memory import MEMORY
+
+PROMETHEUS_PREFIX = "policy_gap"
+
+
+class Metrics:
+    """
+    Process-wide stage timings and event counters.
+
+    Recording costs a perf_counter call and a locked dict update, so it
+    stays enabled in production. Stage timings are inclusive: a stage
+    that runs inside another is counted in both.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a block of work under the given stage name.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds, calls=1):
+        """
+        Record time measured elsewhere under the given stage name.
+        """
+        with self._lock:
+            stage = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+            stage["calls"] += calls
+            stage["seconds"] += seconds
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        """
+        Copy of the current metrics as plain dicts.
+        """
+        with self._lock:
+            return {
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+                "counters": dict(self.counters)
+            }
+
+    def merge(self, snapshot):
+        """
+        Add a snapshot from another process (e.g. a batch worker).
+        """
+        with self._lock:
+            for name, stage in snapshot["stages"].items():
+                own = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+                own["calls"] += stage["calls"]
+                own["seconds"] += stage["seconds"]
+            for name, value in snapshot["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_prometheus(self, prefix=PROMETHEUS_PREFIX):
+        """
+        Render metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds_total Wall time spent in each analysis stage.",
+            f"# TYPE {prefix}_stage_seconds_total counter"
+        ]
+        for name, stage in sorted(snapshot["stages"].items()):
+            lines.append(f'{prefix}_stage_seconds_total{{stage="{name}"}} {stage["seconds"]:.6f}')
+
+        lines += [
+            f"# HELP {prefix}_stage_calls_total Number of times each analysis stage ran.",
+            f"# TYPE {prefix}_stage_calls_total counter"
+        ]
+        for name, stage in sorted(snapshot["stages"].items()):
+            lines.append(f'{prefix}_stage_calls_total{{stage="{name}"}} {stage["calls"]}')
+
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, filepath):
+        _write_atomic(filepath, json.dumps(self.snapshot(), indent=2))
+
+    def write_prometheus(self, filepath, prefix=PROMETHEUS_PREFIX):
+        _write_atomic(filepath, self.to_prometheus(prefix))
+
+    def summary(self):
+        """
+        Human-readable table of stages and counters.
+        """
+        snapshot = self.snapshot()
+        lines = [f"{'Stage':<28}{'Calls':>8}{'Seconds':>12}"]
+        for name, stage in sorted(
+            snapshot["stages"].items(), key=lambda item: -item[1]["seconds"]
+        ):
+            lines.append(f"{name:<28}{stage['calls']:>8}{stage['seconds']:>12.4f}")
+
+        lines.append("")
+        lines.append(f"{'Counter':<36}{'Value':>12}")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"{name:<36}{value:>12}")
+
+        return "\n".join(lines)
+
+
+def _write_atomic(filepath, content):
+    # Scrapers (e.g. the node exporter textfile collector) must never see partial files
+    directory = os.path.dirname(os.path.abspath(filepath))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{filepath}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(content)
+    os.replace(tmp_path, filepath)
+
+
+METRICS = Metrics()
+
+
+@contextmanager
+def stage_timer(name):
+    """
+    Time a block under a stage name in the process-wide metrics, and
+    account its allocations when memory tracking is enabled.
+    """
+    # Memory snapshots are taken outside the timed region
+    with MEMORY.stage(name), METRICS.stage(name):
+        yield
+
+
+def timed_blocks(name, blocks):
+    """
+    Yield from blocks, timing only the work of producing each block
+    under a stage name, as one call per stream. For lazy sources whose
+    consumer runs between blocks (e.g. PDF pages read by segmentation),
+    where stage_timer would also count the consumer.
+    """
+    iterator = iter(blocks)
+    seconds = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                block = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                seconds += time.perf_counter() - start
+            yield block
+    finally:
+        # Abandoned streams clean up (e.g. partial cache files) right away
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+        METRICS.add_time(name, seconds)
+
+
+def increment(name, value=1):
+    """
+    Add to a process-wide counter.
+    """
+    METRICS.increment(name, value)
@@ -0,0 +1,132 @@
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import threading
+import time
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    """
+    One background analysis. Progress is reported by the job function
+    through update() and read by the UI through snapshot().
+    """
+
+    def __init__(self, job_id, name, key=None):
+        self.id = job_id
+        self.name = name
+        self.key = key
+        self.status = QUEUED
+        self.stage = None
+        self.counts = {}
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def update(self, stage, **counts):
+        """
+        Progress callback: record the current stage and its counters.
+        """
+        with self._lock:
+            if stage != self.stage:
+                self.stage = stage
+                self.counts = {}
+            self.counts.update(counts)
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "name": self.name,
+                "status": self.status,
+                "stage": self.stage,
+                "counts": dict(self.counts),
+                "error": self.error,
+                "elapsed": (self.finished_at or time.time()) - (self.started_at or time.time())
+            }
+
+
+class JobRegistry:
+    """
+    Thread pool running analysis jobs, plus the jobs it has run.
+
+    Jobs submitted with a key are deduplicated: a key that is queued,
+    running or done returns the existing job, so finished results double
+    as a cache. Only the most recent max_finished finished jobs are kept.
+    """
+
+    def __init__(self, max_workers=2, max_finished=64):
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="analysis-job"
+        )
+        self._jobs = {}
+        self._keys = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, name, function, *args, key=None, **kwargs):
+        """
+        Queue function(*args, progress=job.update, **kwargs) and return
+        its Job at once.
+        """
+        with self._lock:
+            existing = self._jobs.get(self._keys.get(key)) if key is not None else None
+            if existing is not None and existing.status != FAILED:
+                return existing
+
+            job = Job(next(self._ids), name, key)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._keys[key] = job.id
+            self._evict()
+
+        self._executor.submit(self._run, job, function, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def find(self, key):
+        with self._lock:
+            return self._jobs.get(self._keys.get(key))
+
+    def _run(self, job, function, args, kwargs):
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            result = function(*args, progress=job.update, **kwargs)
+        except Exception as error:
+            job.error = f"{type(error).__name__}: {error}"
+            status = FAILED
+        else:
+            job.result = result
+            status = DONE
+
+        # Readers treat the status as the completion signal; set it last
+        job.finished_at = time.time()
+        job.status = status
+
+    def _evict(self):
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished),
+            key=lambda job: job.finished_at
+        )
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.id]
+            if self._keys.get(job.key) == job.id:
+                del self._keys[job.key]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
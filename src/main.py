@@ -1,57 +1,506 @@
-from nlp.preprocessing import segment_policy
-from nlp.clause_preprocessing import preprocess_clauses
-from nlp.matching import find_best_segment_match, classify_coverage
-from reporting.gap_report import generate_gap_report
-from remediation.policy_suggestions import generate_policy_suggestions
-from roadmap.improvement_roadmap import generate_improvement_roadmap
-from reporting.final_report import generate_compliance_report
-
-
+from ingestion.document_loader import iter_policy_blocks, policy_encoding
+from instrumentation.memory import MEMORY, parse_size
+from instrumentation.metrics import METRICS, stage_timer
+from nlp.preprocessing import segment_blocks
+from nlp.clause_library import load_clause_library
+from nlp.frameworks import DEFAULT_DATA_DIR, FrameworkRegistry
+from nlp.matching import classify_coverage
+from nlp.vector_cache import DEFAULT_CACHE_DIR as DEFAULT_VECTOR_CACHE_DIR
+from pipeline import (
+    AnalysisPipeline, GapReportResult, IngestionResult, SegmentationResult,
+    analyze_frameworks
+)
+from remediation.generation import GenerationCache, load_generation_backend
+from reporting.export import EXPORT_FORMATS, ReportExporter
+from reporting.incremental import (
+    incremental_gap_report, load_analysis_state, save_analysis_state
+)
+
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+import argparse
 import json
 import os
 
+POLICY_EXTENSIONS = (".txt", ".pdf", ".docx")
+
+# Clause library and pipeline options of a batch worker process, set by _init_worker
+_worker_library = None
+_worker_options = {}
+
+
+def analyze_policy(library, policy_text=None, source=None, **options):
+    """
+    Run gap analysis, suggestions and roadmap for one policy text (or
+    policy file). options are passed on to AnalysisPipeline. Returns
+    the final compliance report together with the gap report.
+    """
+    final = AnalysisPipeline(
+        library, source=source, text=policy_text, **options
+    ).run("final_report")
+
+    return {
+        "gap_report": final.analysis_results,
+        "final_report": final.report
+    }
+
+
+def collect_policy_files(batch_path):
+    """
+    List policy files from a directory (searched recursively) or from
+    a manifest file with one path per line, relative to the manifest.
+    """
+    if os.path.isdir(batch_path):
+        return sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(batch_path)
+            for name in names
+            if name.lower().endswith(POLICY_EXTENSIONS)
+        )
+
+    if not os.path.exists(batch_path):
+        raise FileNotFoundError(f"Batch input not found: {batch_path}")
+
+    base_dir = os.path.dirname(os.path.abspath(batch_path))
+    with open(batch_path, "r", encoding="utf-8") as file:
+        return [
+            os.path.join(base_dir, line.strip())
+            for line in file
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+
+
+def _init_worker(clauses_path, memory_report=False, options=None, generator=None):
+    global _worker_library, _worker_options
+    # Maps the artifact compiled by the parent process; no rebuild happens here
+    _worker_library = load_clause_library(clauses_path)
+    # Models are loaded once per worker rather than pickled from the parent
+    _worker_options = {**(options or {}), "generator": load_generation_backend(generator)}
+    if memory_report:
+        MEMORY.start()
+
+
+def _analyze_document(filepath, output_path, export=False):
+    # Worker metrics are per document; the parent merges them into its own
+    METRICS.reset()
+    MEMORY.reset()
+
+    # Batch workers already run one per core; extract PDF pages serially
+    result = analyze_policy(
+        _worker_library, source=filepath, pdf_workers=1, **_worker_options
+    )
+
+    with open(output_path, "w", encoding="utf-8") as file:
+        json.dump({"document": filepath, **result}, file, indent=2)
+
+    return (
+        result["final_report"]["statistics"],
+        METRICS.snapshot(),
+        MEMORY.snapshot(),
+        # Only sent back to the parent when it exports the rows
+        result if export else None
+    )
+
 
-def load_policy_clauses(filepath):
+def _output_names(policy_files):
+    names = {}
+    used = set()
+
+    for filepath in policy_files:
+        stem = os.path.splitext(os.path.basename(filepath))[0]
+        name, n = stem, 1
+        while name in used:
+            n += 1
+            name = f"{stem}-{n}"
+        used.add(name)
+        names[filepath] = f"{name}.json"
+
+    return names
+
+
+def run_batch(batch_path, output_dir, clauses_path, workers=None, generator=None,
+              export_format=None, **options):
     """
-    Load benchmark policy clauses from a JSON file.
+    Analyze every policy in a directory or manifest in parallel,
+    writing one JSON result per document plus a batch summary.
+    options (e.g. memory_budget in bytes) are passed on to each
+    document's AnalysisPipeline. generator is a generation backend spec
+    (see remediation.generation.load_generation_backend).
+
+    With export_format ("csv", "jsonl" or "parquet"), the findings,
+    roadmap items and statistics of all documents are also written to
+    one file per table in output_dir, as each document finishes.
+
+    A document that fails is recorded in the summary with its error;
+    the rest of the batch still completes.
     """
-    if not os.path.exists(filepath):
-        raise FileNotFoundError(f"Policy clauses file not found: {filepath}")
+    policy_files = collect_policy_files(batch_path)
+
+    # Largest documents first so they do not end up alone at the tail
+    policy_files.sort(
+        key=lambda path: os.path.getsize(path) if os.path.exists(path) else 0,
+        reverse=True
+    )
+
+    # Compile (or validate) the clause artifact once before workers map it
+    load_clause_library(clauses_path)
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_names = _output_names(policy_files)
+    summary = {}
+    exporter = ReportExporter(output_dir, export_format) if export_format else None
+
+    with exporter or nullcontext(), ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(clauses_path, MEMORY.enabled, options, generator)
+    ) as executor:
+        futures = {
+            executor.submit(
+                _analyze_document,
+                filepath,
+                os.path.join(output_dir, output_names[filepath]),
+                exporter is not None
+            ): filepath
+            for filepath in policy_files
+        }
+
+        # Documents are exported as they finish; the summary keeps input order
+        for future in as_completed(futures):
+            filepath = futures.pop(future)
+            try:
+                statistics, metrics, memory, result = future.result()
+            except Exception as error:
+                print(f"[FAILED] {filepath}: {error}")
+                summary[filepath] = {
+                    "document": filepath,
+                    "status": "failed",
+                    "error": f"{type(error).__name__}: {error}"
+                }
+                continue
+
+            METRICS.merge(metrics)
+            MEMORY.merge(memory)
+            if exporter is not None:
+                exporter.add(filepath, result["gap_report"], result["final_report"])
+            print(f"[OK] {filepath}: {statistics['coverage_percentage']}% covered")
+            summary[filepath] = {
+                "document": filepath,
+                "status": "ok",
+                "result": output_names[filepath],
+                "statistics": statistics
+            }
+
+    summary = [summary[filepath] for filepath in policy_files]
+    with open(os.path.join(output_dir, "batch_summary.json"), "w", encoding="utf-8") as file:
+        json.dump(summary, file, indent=2)
+
+    return summary
+
+
+def run_incremental(policy_path, state_path, clauses_path, output_dir="results",
+                    **options):
+    """
+    Re-analyze a policy against its stored analysis state, print the
+    coverage changes and store the updated state. The merged gap report
+    and its final compliance report are written to output_dir as in
+    batch mode, and returned in analyze_policy's format with the delta.
+
+    options are passed on to the AnalysisPipeline that writes the
+    suggestions, roadmap and report (e.g. generator). The gap report
+    itself is always rescored by keyword matching, so a different
+    method, evidence_k or hierarchical raise ValueError.
+    """
+    if (
+        options.get("method", "keyword") != "keyword"
+        or options.get("evidence_k")
+        or options.get("hierarchical")
+    ):
+        raise ValueError(
+            "Incremental re-analysis supports keyword matching only, "
+            "without evidence or hierarchical matching"
+        )
+
+    library = load_clause_library(clauses_path)
+    encoding = policy_encoding(policy_path)
+    policy_segments = segment_blocks(iter_policy_blocks(policy_path), encoding=encoding)
+
+    with stage_timer("incremental_analysis"):
+        gap_report, delta, state = incremental_gap_report(
+            library.clauses,
+            policy_segments,
+            load_analysis_state(state_path),
+            automaton=library.automaton
+        )
+    save_analysis_state(state, state_path)
+
+    print(f"=== COVERAGE CHANGES ({len(delta)} of {len(gap_report)} clauses) ===\n")
+    for change in delta:
+        print(
+            f"[{change['clause_id']}] {change['previous_coverage']} -> "
+            f"{change['coverage']} ({change['previous_score']} -> "
+            f"{change['match_score']})"
+        )
+
+    # Suggestions, roadmap and final report follow from the merged gap report
+    pipeline = AnalysisPipeline(library, source=policy_path, **options)
+    pipeline.seed(
+        "ingestion", IngestionResult(source=policy_path, text=None, encoding=encoding)
+    )
+    pipeline.seed("segmentation", SegmentationResult(segments=policy_segments))
+    pipeline.seed("gap_report", GapReportResult(entries=gap_report))
+    final = pipeline.run("final_report")
+    result = {"gap_report": final.analysis_results, "final_report": final.report}
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, _output_names([policy_path])[policy_path])
+    with open(output_path, "w", encoding="utf-8") as file:
+        json.dump({"document": policy_path, **result}, file, indent=2)
 
-    with open(filepath, "r", encoding="utf-8") as file:
-        clauses = json.load(file)
+    print(f"\nStatistics: {final.report['statistics']}")
+    print(f"Report written to {output_path}")
 
-    return clauses
+    return result, delta
 
 
-def load_policy_text(filepath):
+def run_frameworks(policy_path, registry, frameworks, **options):
     """
-    Load organizational policy text from a file.
+    Analyze one policy against several frameworks, segmenting it once.
+    options are passed on to every framework's AnalysisPipeline.
     """
-    if not os.path.exists(filepath):
-        raise FileNotFoundError(f"Policy file not found: {filepath}")
+    libraries = {
+        registry.catalogs[framework]["name"]: registry.get(framework)
+        for framework in frameworks
+    }
+    results = analyze_frameworks(libraries, source=policy_path, **options)
 
-    with open(filepath, "r", encoding="utf-8") as file:
-        text = file.read()
+    print(f"=== FRAMEWORK COMPARISON ({os.path.basename(policy_path)}) ===\n")
+    for name, final in results.items():
+        print(f"{name}:")
+        print(f"  Summary: {final.report['summary']}")
+        print(f"  Statistics: {final.report['statistics']}\n")
 
-    return text
+    return results
 
 
-def main():
-    clauses_path = os.path.join(
-        "data", "nist_csf", "policy_clauses.json"
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline policy gap analysis")
+    parser.add_argument(
+        "--clauses",
+        default=os.path.join("data", "nist_csf", "policy_clauses.json"),
+        help="Benchmark policy clauses JSON"
+    )
+    parser.add_argument(
+        "--framework",
+        action="append",
+        help="Framework id or name from the data directory (e.g. nist_csf or NIST) "
+             "instead of --clauses; repeat it, or pass 'all', to compare frameworks"
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=DEFAULT_DATA_DIR,
+        help="Directory holding one <framework>/policy_clauses.json per framework"
+    )
+    parser.add_argument(
+        "--policy",
+        default=os.path.join("data", "sample_policies", "sample_policy.txt"),
+        help="Policy document to analyze"
+    )
+    parser.add_argument(
+        "--state",
+        help="Analysis state file; re-analyzes --policy incrementally against it"
+    )
+    parser.add_argument(
+        "--batch",
+        help="Directory of policies or manifest file listing one policy per line"
+    )
+    parser.add_argument(
+        "--output-dir",
+        default="results",
+        help="Where batch and incremental runs write one JSON result per document"
+    )
+    parser.add_argument(
+        "--export",
+        choices=EXPORT_FORMATS,
+        help="In batch mode, also write the findings, roadmap and statistics "
+             "of all documents to one file per table in this format"
     )
-    policy_path = os.path.join(
-        "data", "sample_policies", "sample_policy.txt"
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Batch worker processes (defaults to the number of CPUs)"
     )
+    parser.add_argument(
+        "--method",
+        choices=["keyword", "tfidf", "bm25", "embedding"],
+        default="keyword",
+        help="Clause matching method: keyword overlap, or tfidf, bm25 or "
+             "embedding similarity scores"
+    )
+    parser.add_argument(
+        "--vector-cache",
+        default=DEFAULT_VECTOR_CACHE_DIR,
+        help="Directory memoizing embedding vectors across runs"
+    )
+    parser.add_argument(
+        "--no-vector-cache",
+        action="store_true",
+        help="Embed every clause and segment again instead of using the vector cache"
+    )
+    parser.add_argument(
+        "--evidence",
+        type=int,
+        default=0,
+        metavar="K",
+        help="Report the K best matching segments of each clause as evidence, "
+             "with their combined keyword coverage"
+    )
+    parser.add_argument(
+        "--hierarchical",
+        action="store_true",
+        help="Skip document sections without any of a clause's keywords; "
+             "exact for keyword matching, an approximation for scored methods"
+    )
+    parser.add_argument(
+        "--generator",
+        help="Write suggestions for non-covered clauses with a local model: "
+             "the path of a GGUF model file (llama-cpp-python), or 'template' "
+             "for the offline stand-in"
+    )
+    parser.add_argument(
+        "--generation-cache",
+        help="Directory memoizing generated suggestions across runs"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print per-stage timings and counters when the run finishes"
+    )
+    parser.add_argument(
+        "--metrics-json",
+        help="Write stage timings and counters as JSON to this file"
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        help="Write stage timings and counters in Prometheus text format to this file"
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=parse_size,
+        help="Memory budget per document, e.g. 512M; larger documents are "
+             "analyzed with streaming segmentation and released segment text"
+    )
+    parser.add_argument(
+        "--memory-report",
+        action="store_true",
+        help="Track peak and retained memory per stage (slower) and print "
+             "the largest allocation sites"
+    )
+    return parser.parse_args()
+
+
+def pipeline_options(args):
+    """
+    AnalysisPipeline options selected on the command line, except the
+    generation backend, which each process loads from args.generator.
+    """
+    return {
+        "memory_budget": args.memory_budget,
+        "evidence_k": args.evidence,
+        "hierarchical": args.hierarchical,
+        "method": args.method,
+        "vector_cache_dir": None if args.no_vector_cache else args.vector_cache,
+        "generation_cache": (
+            GenerationCache(args.generation_cache) if args.generation_cache else None
+        )
+    }
+
+
+def export_metrics(args):
+    """
+    Report the metrics collected during the run as requested on the command line.
+    """
+    if args.profile:
+        print("\n=== PROFILE ===\n")
+        print(METRICS.summary())
+
+    if args.memory_report:
+        print("\n=== MEMORY ===\n")
+        print(MEMORY.report())
+
+    if args.metrics_json:
+        METRICS.write_json(args.metrics_json)
+
+    if args.metrics_prom:
+        METRICS.write_prometheus(args.metrics_prom)
+
+
+def main():
+    args = parse_args()
+
+    if args.memory_report:
+        MEMORY.start()
+
+    try:
+        run(args)
+    finally:
+        export_metrics(args)
+
+
+def run(args):
+    if args.framework:
+        registry = FrameworkRegistry(args.data_dir)
+        try:
+            if "all" in args.framework:
+                frameworks = list(registry.catalogs)
+            else:
+                frameworks = list(dict.fromkeys(registry.resolve(f) for f in args.framework))
+        except KeyError as error:
+            raise SystemExit(error.args[0])
+
+        if len(frameworks) > 1:
+            if args.batch or args.state:
+                raise SystemExit("Comparing frameworks is supported for a single --policy only")
+            run_frameworks(
+                args.policy, registry, frameworks,
+                generator=load_generation_backend(args.generator), **pipeline_options(args)
+            )
+            return
+
+        args.clauses = registry.catalog_path(frameworks[0])
+
+    if args.batch:
+        summary = run_batch(
+            args.batch, args.output_dir, args.clauses, args.workers,
+            generator=args.generator, export_format=args.export, **pipeline_options(args)
+        )
+        failed = sum(1 for item in summary if item["status"] == "failed")
+        print(f"\nAnalyzed {len(summary) - failed} of {len(summary)} documents.")
+        return
+
+    if args.state:
+        if args.method != "keyword" or args.evidence or args.hierarchical:
+            raise SystemExit(
+                "--state re-analyzes with keyword matching only; "
+                "it cannot be combined with --method, --evidence or --hierarchical"
+            )
+        run_incremental(
+            args.policy, args.state, args.clauses, args.output_dir,
+            generator=load_generation_backend(args.generator), **pipeline_options(args)
+        )
+        return
+
+    clauses_path = args.clauses
+    policy_path = args.policy
 
     print("Loading policy clauses...")
-    clauses = load_policy_clauses(clauses_path)
+    # 🔹 Phase 4.2 – Benchmark Clause Preprocessing (precompiled artifact)
+    library = load_clause_library(clauses_path)
+    clauses = library.clauses
     print(f"Loaded {len(clauses)} policy clauses.\n")
 
-    # 🔹 Phase 4.2 – Benchmark Clause Preprocessing
-    clauses = preprocess_clauses(clauses)
-
     print("=== BENCHMARK CLAUSES (Phase 4.2 Validation) ===\n")
     for clause in clauses:
         print(f"[{clause['clause_id']}] {clause['title']}")
@@ -60,19 +509,24 @@ def main():
         print(f"  Normalized Keywords: {clause['normalized_keywords']}\n")
 
     print("Loading policy document...")
-    policy_text = load_policy_text(policy_path)
+    pipeline = AnalysisPipeline(
+        library, source=policy_path,
+        generator=load_generation_backend(args.generator), **pipeline_options(args)
+    )
+    #  Phase 4.1 – Policy Segmentation
+    # Sources are streamed into segmentation, which keeps the preview
+    segmentation = pipeline.run("segmentation")
+    policy_segments = segmentation.segments
     print("Policy text loaded successfully.\n")
 
     print("Policy Preview:")
-    print(policy_text[:300])
-
-    #  Phase 4.1 – Policy Segmentation
-    policy_segments = segment_policy(policy_text)
+    print(segmentation.preview)
 
     print("\n=== GAP ANALYSIS (Phase 4.3 Validation) ===\n")
 
-    for clause in clauses:
-        match = find_best_segment_match(clause, policy_segments)
+    matches = pipeline.run("matching").matches
+
+    for clause, match in zip(clauses, matches):
         coverage = classify_coverage(match["best_score"])
     
         print(f"[{clause['clause_id']}] {clause['title']}")
@@ -89,60 +543,33 @@ def main():
 
     print("\n=== POLICY SEGMENTS (Phase 4.1 Validation) ===\n")
     for seg in policy_segments:
-        print(f"[{seg['id']}] {seg['text']}")
+        print(f"[{seg['id']}] {seg.get('text', '<not kept under memory budget>')}")
 
-    gap_report = generate_gap_report(clauses, policy_segments)
+    gap_report = pipeline.run("gap_report").entries
 
     print("\n=== STRUCTURED GAP REPORT (Phase 5.1 Validation) ===\n")
     for item in gap_report:
         print(item)
 
-
-    suggestions = generate_policy_suggestions(gap_report)
-    
-    # Build lookup table by clause_id
-    suggestion_map = {
-        s["clause_id"]: s["suggestion"]
-        for s in suggestions
-    }
-    
-    # Attach suggestion to EVERY clause
-    for gap in gap_report:
-        gap["suggestion"] = suggestion_map.get(
-            gap["clause_id"],
-            "No improvement required. Policy is adequately covered."
-        )
-
+    final = pipeline.run("final_report")
     
     print("\n=== POLICY IMPROVEMENT SUGGESTIONS (Phase 5.2 Validation) ===\n")
-    for g in gap_report:
+    for g in final.analysis_results:
         print({
             "clause_id": g["clause_id"],
             "suggestion": g["suggestion"]
         })
 
-    roadmap = generate_improvement_roadmap(gap_report)
-
-    # 🔹 Merge priority back into gap_report
-    priority_map = {
-        r["clause_id"]: r["priority"]
-        for r in roadmap
-    }
-    
-    for item in gap_report:
-        item["priority"] = priority_map.get(item["clause_id"], "Unassigned")
-
-
     print("\n=== IMPROVEMENT ROADMAP (Phase 5.3 Validation) ===\n")
-    for r in roadmap:
+    for r in pipeline.run("roadmap").items:
         print(r)
 
     print("\n=== DEBUG: gap_report keys ===\n")
-    for item in gap_report:
+    for item in final.analysis_results:
         print(item["clause_id"], item.keys())
 
 
-    final_report = generate_compliance_report(gap_report)
+    final_report = final.report
     print("\n=== FINAL COMPLIANCE REPORT (Phase 5.4 Validation) ===\n")
 
     print("Summary:")
@@ -0,0 +1,193 @@
+import json
+import os
+
+import numpy as np
+
+from nlp.clause_preprocessing import clause_document
+from nlp.embeddings import HashedNgramBackend, embed_texts
+from nlp.matching import find_best_segment_match, classify_coverage
+from nlp.preprocessing import normalize_text
+
+DEFAULT_N_PROBE = 8
+KMEANS_ITERATIONS = 10
+ASSIGN_BATCH_SIZE = 65536
+
+_ARRAYS = ("centroids", "vectors", "ids", "offsets")
+
+
+def _assign(vectors, centroids):
+    """
+    Index of the closest centroid (by inner product) for every vector,
+    computed in batches to bound memory.
+    """
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_BATCH_SIZE):
+        batch = vectors[start:start + ASSIGN_BATCH_SIZE]
+        labels[start:start + len(batch)] = (batch @ centroids.T).argmax(axis=1)
+    return labels
+
+
+def _top_k(scores, k):
+    """
+    Indices of the k highest scores, best first, without a full sort.
+    """
+    if k >= len(scores):
+        return np.argsort(-scores)
+    top = np.argpartition(-scores, k)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class SegmentIndex:
+    """
+    Inverted-file (IVF) index over L2-normalized segment vectors.
+
+    Vectors are clustered with spherical k-means and stored grouped by
+    cluster, so a query only scans the n_probe clusters whose centroids
+    are closest to it. n_probe trades recall for latency: n_probe equal
+    to the number of lists is an exact search.
+    """
+
+    def __init__(self, centroids, vectors, ids, offsets, model_id=None):
+        self.centroids = centroids
+        self.vectors = vectors
+        self.ids = ids
+        self.offsets = offsets
+        self.model_id = model_id
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, vectors, ids=None, n_lists=None, model_id=None, seed=0,
+              iterations=KMEANS_ITERATIONS):
+        """
+        Cluster vectors into n_lists inverted lists
+        (defaults to about sqrt(len(vectors))).
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        ids = np.arange(len(vectors)) if ids is None else np.asarray(ids)
+        n_lists = n_lists or max(1, int(np.sqrt(len(vectors))))
+        n_lists = min(n_lists, max(1, len(vectors)))
+
+        rng = np.random.default_rng(seed)
+        if len(vectors):
+            centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)]
+        else:
+            centroids = np.zeros((n_lists, vectors.shape[1]), dtype=np.float32)
+
+        for _ in range(iterations):
+            labels = _assign(vectors, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, vectors)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty clusters keep their previous centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+
+        labels = _assign(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(labels, minlength=n_lists))
+
+        return cls(
+            centroids.astype(np.float32),
+            vectors[order],
+            ids[order].astype(np.int64),
+            offsets,
+            model_id
+        )
+
+    def search(self, query, k=10, n_probe=DEFAULT_N_PROBE):
+        """
+        Return up to k (id, score) pairs for the segments closest to the
+        query vector, scanning only the n_probe nearest lists.
+        """
+        query = np.asarray(query, dtype=np.float32)
+        lists = _top_k(self.centroids @ query, min(n_probe, self.n_lists))
+
+        ranges = [(self.offsets[i], self.offsets[i + 1]) for i in lists]
+        if not any(end > start for start, end in ranges):
+            return []
+
+        rows = np.concatenate([np.arange(start, end) for start, end in ranges])
+        scores = self.vectors[rows] @ query
+        best = _top_k(scores, k)
+
+        return [(int(self.ids[rows[i]]), float(scores[i])) for i in best]
+
+    def save(self, index_dir):
+        """
+        Write the index as .npy arrays plus a JSON metadata file.
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(index_dir, f"{name}.npy"), getattr(self, name))
+
+        with open(os.path.join(index_dir, "meta.json"), "w", encoding="utf-8") as file:
+            json.dump({"model_id": self.model_id, "n_lists": self.n_lists}, file)
+
+    @classmethod
+    def load(cls, index_dir, mmap=True):
+        """
+        Load a saved index. Arrays are memory-mapped by default so an
+        archive-sized index is paged in on demand rather than read whole.
+        """
+        meta_path = os.path.join(index_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"Segment index not found: {index_dir}")
+
+        with open(meta_path, "r", encoding="utf-8") as file:
+            meta = json.load(file)
+
+        mmap_mode = "r" if mmap else None
+        arrays = [
+            np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in _ARRAYS
+        ]
+
+        return cls(*arrays, model_id=meta["model_id"])
+
+
+def build_segment_index(policy_segments, backend=None, cache=None, n_lists=None):
+    """
+    Embed segments and index them by their position in policy_segments.
+    """
+    backend = backend or HashedNgramBackend()
+    vectors = embed_texts(backend, [s["normalized"] for s in policy_segments], cache)
+
+    return SegmentIndex.build(vectors, n_lists=n_lists, model_id=backend.model_id)
+
+
+def match_clause_with_index(clause, index, policy_segments, backend=None,
+                            cache=None, k=10, n_probe=DEFAULT_N_PROBE):
+    """
+    Retrieve the top-k candidate segments for a clause from the index,
+    then score only those candidates by keyword overlap.
+
+    policy_segments is any sequence indexable by the ids stored in the
+    index. Returns the find_best_segment_match result plus its coverage.
+    """
+    backend = backend or HashedNgramBackend()
+    if index.model_id and index.model_id != backend.model_id:
+        raise ValueError(
+            f"Index was built with {index.model_id}, not {backend.model_id}"
+        )
+
+    query = embed_texts(
+        backend, [normalize_text(clause_document(clause))], cache
+    )[0]
+    candidates = [
+        policy_segments[segment_index]
+        for segment_index, _ in index.search(query, k=k, n_probe=n_probe)
+    ]
+
+    match = find_best_segment_match(clause, candidates)
+
+    return {
+        **match,
+        "coverage": classify_coverage(match["best_score"]),
+        "candidates_scored": len(candidates)
+    }
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from instrumentation.metrics import increment, stage_timer
+from nlp.clause_preprocessing import clause_document, intern_clause_tokens, preprocess_clauses
+from nlp.embeddings import HashedNgramBackend
+from nlp.keyword_matcher import (
+    ArrayAutomaton, build_clause_automaton, automaton_to_arrays
+)
+from nlp.preprocessing import normalize_text
+
+DEFAULT_ARTIFACT_DIR = os.path.join(".cache", "clause_libraries")
+FORMAT_VERSION = 2
+MAGIC = b"PGACLIB1"
+ALIGNMENT = 64
+
+# Array name -> dtype stored in the artifact
+AUTOMATON_DTYPES = {
+    "goto_offsets": np.int64,
+    "goto_symbols": np.uint32,
+    "goto_targets": np.int32,
+    "fail": np.int32,
+    "output_offsets": np.int64,
+    "output_keywords": np.int32
+}
+
+
+class ClauseLibrary:
+    """
+    Preprocessed clause catalog: normalized clauses, keyword vocabulary,
+    compiled keyword automaton and clause embedding vectors.
+
+    When loaded from an artifact, the automaton (an ArrayAutomaton) and
+    clause_vectors are views into its memory map, shared by every
+    process that maps it; the clause dicts are parsed per process.
+    backend is the embedding backend clause_vectors were made with.
+    """
+
+    def __init__(self, clauses, keywords, automaton, clause_vectors,
+                 model_id, source_hash, buffer=None, backend=None):
+        self.clauses = clauses
+        self.keywords = keywords
+        self.automaton = automaton
+        self.clause_vectors = clause_vectors
+        self.model_id = model_id
+        self.source_hash = source_hash
+        self.backend = backend
+        # Keeps the memory map alive for arrays that view into it
+        self._buffer = buffer
+        # Clauses parsed from an artifact were not preprocessed in this process
+        intern_clause_tokens(clauses)
+
+    def __len__(self):
+        return len(self.clauses)
+
+
+def source_hash(source_path):
+    """
+    SHA-256 of the clause catalog file contents.
+    """
+    digest = hashlib.sha256()
+    with open(source_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def default_artifact_path(source_path, artifact_dir=DEFAULT_ARTIFACT_DIR):
+    """
+    Artifact location for a catalog, e.g. nist_csf-policy_clauses.clib.
+    """
+    source_path = os.path.abspath(source_path)
+    parent = os.path.basename(os.path.dirname(source_path))
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(artifact_dir, f"{parent}-{stem}.clib")
+
+
+def compile_clause_library(source_path, artifact_path=None, backend=None):
+    """
+    Preprocess a clause catalog and write it to a binary artifact.
+
+    Layout: magic, header length, JSON header (clauses, keywords,
+    array descriptors), then 64-byte aligned raw arrays that
+    load_clause_library memory-maps without copying.
+    """
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"Policy clauses file not found: {source_path}")
+
+    artifact_path = artifact_path or default_artifact_path(source_path)
+    backend = backend or HashedNgramBackend()
+    increment("clause_library_compiles")
+
+    with open(source_path, "r", encoding="utf-8") as file:
+        clauses = preprocess_clauses(json.load(file))
+
+    automaton = build_clause_automaton(clauses)
+    keywords = sorted(set().union(*automaton["output"]))
+
+    arrays = {
+        name: np.asarray(values, dtype=AUTOMATON_DTYPES[name])
+        for name, values in automaton_to_arrays(automaton, keywords).items()
+    }
+    arrays["clause_vectors"] = backend.embed(
+        [normalize_text(clause_document(c)) for c in clauses]
+    ).astype(np.float32)
+
+    descriptors = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        descriptors[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset
+        }
+        offset += array.nbytes
+
+    header = json.dumps({
+        "format_version": FORMAT_VERSION,
+        "source_hash": source_hash(source_path),
+        "model_id": backend.model_id,
+        "clauses": clauses,
+        "keywords": keywords,
+        "arrays": descriptors
+    }).encode("utf-8")
+
+    prefix_length = len(MAGIC) + 8 + len(header)
+    data_start = -(-prefix_length // ALIGNMENT) * ALIGNMENT
+
+    artifact_dir = os.path.dirname(os.path.abspath(artifact_path))
+    os.makedirs(artifact_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=artifact_dir, suffix=".tmp")
+
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(MAGIC)
+            file.write(struct.pack("<Q", len(header)))
+            file.write(header)
+            for name, array in arrays.items():
+                file.seek(data_start + descriptors[name]["offset"])
+                file.write(array.tobytes())
+
+        # Atomic swap so concurrent workers never read a half-written artifact
+        os.replace(tmp_path, artifact_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return artifact_path
+
+
+def _read_artifact(artifact_path):
+    with open(artifact_path, "rb") as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"Not a clause library artifact: {artifact_path}")
+
+    (header_length,) = struct.unpack_from("<Q", buffer, len(MAGIC))
+    header_start = len(MAGIC) + 8
+    header = json.loads(buffer[header_start:header_start + header_length])
+    data_start = -(-(header_start + header_length) // ALIGNMENT) * ALIGNMENT
+
+    return header, buffer, data_start
+
+
+def load_clause_library(source_path, artifact_path=None, backend=None):
+    """
+    Load a clause catalog from its compiled artifact, recompiling first
+    when the artifact is missing, from an older format, built with a
+    different embedding model, or out of date with the source JSON.
+    """
+    with stage_timer("clause_library_load"):
+        return _load_clause_library(source_path, artifact_path, backend)
+
+
+def _load_clause_library(source_path, artifact_path, backend):
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"Policy clauses file not found: {source_path}")
+
+    artifact_path = artifact_path or default_artifact_path(source_path)
+    backend = backend or HashedNgramBackend()
+    current_hash = source_hash(source_path)
+
+    header = None
+    if os.path.exists(artifact_path):
+        try:
+            header, buffer, data_start = _read_artifact(artifact_path)
+        except (ValueError, struct.error):
+            header = None
+
+    if (
+        header is None
+        or header["format_version"] != FORMAT_VERSION
+        or header["source_hash"] != current_hash
+        or header["model_id"] != backend.model_id
+    ):
+        compile_clause_library(source_path, artifact_path, backend)
+        header, buffer, data_start = _read_artifact(artifact_path)
+
+    arrays = {}
+    for name, descriptor in header["arrays"].items():
+        dtype = np.dtype(descriptor["dtype"])
+        count = int(np.prod(descriptor["shape"]))
+        arrays[name] = np.frombuffer(
+            buffer, dtype=dtype, count=count,
+            offset=data_start + descriptor["offset"]
+        ).reshape(descriptor["shape"])
+
+    keywords = header["keywords"]
+
+    return ClauseLibrary(
+        clauses=header["clauses"],
+        keywords=keywords,
+        automaton=ArrayAutomaton(arrays, keywords),
+        clause_vectors=arrays["clause_vectors"],
+        model_id=header["model_id"],
+        source_hash=header["source_hash"],
+        buffer=buffer,
+        backend=backend
+    )
@@ -1,4 +1,4 @@
-from src.nlp.preprocessing import normalize_text
+from nlp.preprocessing import VOCABULARY, normalize_text
 
 
 def preprocess_clauses(clauses):
@@ -24,4 +24,26 @@ def preprocess_clauses(clauses):
             "normalized_keywords": normalized_keywords
         })
 
+    intern_clause_tokens(processed_clauses)
     return processed_clauses
+
+
+def clause_document(clause):
+    """
+    Build the text a clause is scored with: its normalized requirement
+    (or description when no requirement text is given) plus its keywords.
+    """
+    requirement = clause.get("normalized_requirement") or normalize_text(
+        clause.get("description", "")
+    )
+    return " ".join([requirement, *clause.get("normalized_keywords", [])])
+
+
+def intern_clause_tokens(clauses, vocabulary=VOCABULARY):
+    """
+    Intern the tokens of every clause document, so the policy segments
+    scored against the clauses share their ids (see
+    nlp.preprocessing.DocumentVocabulary).
+    """
+    for clause in clauses:
+        vocabulary.encode(clause_document(clause).split())
@@ -0,0 +1,162 @@
+from abc import ABC, abstractmethod
+import hashlib
+import os
+import zlib
+
+import numpy as np
+
+from nlp.clause_preprocessing import clause_document
+from nlp.preprocessing import normalize_text
+
+DEFAULT_MIN_SIMILARITY = 0.2
+
+
+class EmbeddingBackend(ABC):
+    """
+    Interface for local embedding models.
+
+    Subclasses set model_id (which keys the vector cache, so it must
+    change whenever the model's output would) and dim, and implement
+    embed() for a batch of normalized texts.
+    """
+
+    model_id = None
+    dim = None
+
+    @abstractmethod
+    def embed(self, texts):
+        """
+        Return a (len(texts), dim) float32 array of L2-normalized vectors.
+        """
+
+
+class HashedNgramBackend(EmbeddingBackend):
+    """
+    Deterministic offline stand-in: signed feature hashing of character
+    n-grams into a fixed number of dimensions.
+    """
+
+    def __init__(self, dim=512, min_n=3, max_n=5):
+        self.dim = dim
+        self.min_n = min_n
+        self.max_n = max_n
+        self.model_id = f"hashed-ngram-{dim}-{min_n}-{max_n}"
+
+    def _features(self, text):
+        padded = f" {text} "
+        for n in range(self.min_n, self.max_n + 1):
+            for start in range(len(padded) - n + 1):
+                yield zlib.crc32(padded[start:start + n].encode("utf-8"))
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+
+        for row, text in enumerate(texts):
+            hashes = np.fromiter(self._features(text), dtype=np.uint32)
+            if not hashes.size:
+                continue
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+            vectors[row] = np.bincount(
+                hashes % self.dim, weights=signs, minlength=self.dim
+            )
+
+        return _l2_normalize(vectors)
+
+
+class WordVectorBackend(EmbeddingBackend):
+    """
+    Averages pretrained word vectors from a local GloVe-style text file
+    ("word v1 v2 ..." per line). Out-of-vocabulary words are skipped.
+    """
+
+    def __init__(self, model_path):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Embedding model file not found: {model_path}")
+
+        digest = hashlib.sha256()
+        words = []
+        rows = []
+
+        with open(model_path, "rb") as file:
+            for line in file:
+                digest.update(line)
+                parts = line.decode("utf-8").rstrip().split(" ")
+                if len(parts) < 2:
+                    continue
+                words.append(parts[0])
+                rows.append(np.array(parts[1:], dtype=np.float32))
+
+        self.vectors = np.vstack(rows)
+        self.index = {word: i for i, word in enumerate(words)}
+        self.dim = self.vectors.shape[1]
+        self.model_id = f"word-vectors-{digest.hexdigest()[:16]}"
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+
+        for row, text in enumerate(texts):
+            ids = [self.index[w] for w in text.split() if w in self.index]
+            if ids:
+                vectors[row] = self.vectors[ids].mean(axis=0)
+
+        return _l2_normalize(vectors)
+
+
+def _l2_normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def embed_texts(backend, texts, cache=None):
+    """
+    Embed normalized texts, reusing cached vectors where possible.
+    Only cache misses are sent to the backend, as one batch.
+    """
+    vectors = np.zeros((len(texts), backend.dim), dtype=np.float32)
+    missing = {}
+
+    for row, text in enumerate(texts):
+        vector = cache.get(backend.model_id, text) if cache is not None else None
+        if vector is None:
+            # Identical boilerplate sentences are embedded only once
+            missing.setdefault(text, []).append(row)
+        else:
+            vectors[row] = vector
+
+    if missing:
+        unique_texts = list(missing)
+        embedded = backend.embed(unique_texts)
+        for text, vector in zip(unique_texts, embedded):
+            vectors[missing[text]] = vector
+            if cache is not None:
+                cache.put(backend.model_id, text, vector)
+
+    return vectors
+
+
+def embedding_score_matrix(clauses, policy_segments, backend=None, cache=None,
+                           min_similarity=DEFAULT_MIN_SIMILARITY,
+                           clause_vectors=None):
+    """
+    Cosine similarity between clause and segment embeddings, computed as
+    one matrix product. Similarities below min_similarity are treated
+    as no match so that unrelated text still classifies as Missing.
+
+    clause_vectors may be passed in precomputed (e.g. from
+    nlp.clause_library) when they come from the same backend.
+    """
+    backend = backend or HashedNgramBackend()
+
+    if clause_vectors is None:
+        clause_vectors = embed_texts(
+            backend, [normalize_text(clause_document(c)) for c in clauses], cache
+        )
+    segment_vectors = embed_texts(
+        backend, [s["normalized"] for s in policy_segments], cache
+    )
+
+    scores = clause_vectors @ segment_vectors.T
+    scores[scores < min_similarity] = 0.0
+
+    return np.clip(scores, 0.0, 1.0)
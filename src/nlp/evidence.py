@@ -0,0 +1,169 @@
+import heapq
+
+import numpy as np
+
+from instrumentation.metrics import increment, stage_timer
+from nlp.keyword_matcher import (
+    build_clause_automaton, build_keyword_automaton, scan_keywords, scan_segments
+)
+from nlp.matching import keyword_hit_score
+
+DEFAULT_EVIDENCE_K = 3
+
+
+def top_k_indices(scores, k):
+    """
+    Indices of the k highest positive scores, best first, in O(n).
+
+    Ties are broken by position, earlier segments first, which keeps
+    the first entry identical to find_best_segment_match.
+    """
+    scores = np.asarray(scores)
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    threshold = np.partition(scores, n - k)[n - k]
+    above = np.flatnonzero(scores > threshold)
+    tied = np.flatnonzero(scores == threshold)[:k - len(above)]
+    selected = np.concatenate([above, tied])
+    selected = selected[scores[selected] > 0]
+
+    return selected[np.lexsort((selected, -scores[selected]))]
+
+
+def build_evidence(clause, ranked):
+    """
+    Evidence record from ranked (score, segment, keyword hits) entries.
+
+    combined_score is the share of the clause's keywords found in at
+    least one of the evidence segments, scored like keyword_hit_score.
+    """
+    keywords = clause["normalized_keywords"]
+    combined = set()
+    segments = []
+
+    for score, segment, hits in ranked:
+        found = sorted(set(keywords).intersection(hits))
+        combined.update(found)
+        segments.append({
+            "segment_id": segment["id"],
+            "segment_text": segment["text"],
+            "score": float(score),
+            "keywords": found
+        })
+
+    return {
+        "segments": segments,
+        "combined_keywords": sorted(combined),
+        "combined_score": keyword_hit_score(keywords, combined)
+    }
+
+
+def evidence_to_match(evidence):
+    """
+    The find_best_segment_match result implied by an evidence record.
+    """
+    if not evidence["segments"]:
+        return {"best_score": 0.0, "best_segment_id": None, "best_segment_text": None}
+
+    best = evidence["segments"][0]
+    return {
+        "best_score": best["score"],
+        "best_segment_id": best["segment_id"],
+        "best_segment_text": best["segment_text"]
+    }
+
+
+def find_top_segments(clause, policy_segments, k=DEFAULT_EVIDENCE_K,
+                      segment_hits=None, scores=None):
+    """
+    The k best matching segments of a clause, with their combined
+    keyword coverage.
+
+    segment_hits and scores work as in find_best_segment_match: keyword
+    overlap by default, or this clause's row of a score matrix. With
+    scores, only the selected segments are scanned for keywords.
+    """
+    if scores is not None:
+        ranked = [int(i) for i in top_k_indices(scores, k)]
+        if segment_hits is None:
+            automaton = build_keyword_automaton(clause["normalized_keywords"])
+            segment_hits = scan_segments(automaton, [policy_segments[i] for i in ranked])
+    else:
+        if segment_hits is None:
+            automaton = build_keyword_automaton(clause["normalized_keywords"])
+            segment_hits = scan_segments(automaton, policy_segments)
+
+        increment("clause_segment_comparisons", len(policy_segments))
+        scores = [
+            keyword_hit_score(clause["normalized_keywords"], segment_hits[segment["id"]])
+            for segment in policy_segments
+        ]
+        # Highest score first; on equal scores the earlier segment
+        ranked = heapq.nlargest(
+            k,
+            (i for i, score in enumerate(scores) if score > 0),
+            key=lambda i: (scores[i], -i)
+        )
+
+    return build_evidence(clause, [
+        (scores[i], policy_segments[i], segment_hits[policy_segments[i]["id"]])
+        for i in ranked
+    ])
+
+
+def stream_top_matches(clauses, policy_segments, k=DEFAULT_EVIDENCE_K,
+                       automaton=None):
+    """
+    Top-k evidence for every clause in a single pass over the segments.
+
+    Like nlp.matching.stream_best_matches, policy_segments may be a lazy
+    iterator. Each clause keeps a bounded min-heap of its k best
+    segments, so memory stays at k entries per clause however long the
+    document is. Returns one evidence record per clause, in clause order.
+    """
+    with stage_timer("matching"):
+        if automaton is None:
+            automaton = build_clause_automaton(clauses)
+
+        keyword_clauses = {}
+        for position, clause in enumerate(clauses):
+            for kw in set(clause["normalized_keywords"]):
+                keyword_clauses.setdefault(kw, []).append(position)
+
+        # Entries are (score, -segment position, segment, hits): the heap
+        # root is the weakest entry, and on equal scores the later segment
+        heaps = [[] for _ in clauses]
+        comparisons = 0
+
+        for order, segment in enumerate(policy_segments):
+            hits = scan_keywords(automaton, segment["tokens"])
+            candidates = {
+                position
+                for kw in hits
+                for position in keyword_clauses[kw]
+            }
+            comparisons += len(candidates)
+
+            for position in candidates:
+                score = keyword_hit_score(clauses[position]["normalized_keywords"], hits)
+                if score <= 0:
+                    continue
+                entry = (score, -order, segment, hits)
+                heap = heaps[position]
+                if len(heap) < k:
+                    heapq.heappush(heap, entry)
+                elif entry[:2] > heap[0][:2]:
+                    heapq.heapreplace(heap, entry)
+
+        increment("clause_segment_comparisons", comparisons)
+
+        return [
+            build_evidence(clause, [
+                (score, segment, hits)
+                for score, _, segment, hits in sorted(heap, key=lambda e: e[:2], reverse=True)
+            ])
+            for clause, heap in zip(clauses, heaps)
+        ]
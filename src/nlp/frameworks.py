@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+
+from nlp.clause_library import load_clause_library
+
+DEFAULT_DATA_DIR = "data"
+CATALOG_FILENAME = "policy_clauses.json"
+METADATA_FILENAME = "framework.json"
+
+# Display names for catalog directories without a framework.json
+DISPLAY_NAMES = {
+    "nist_csf": "NIST",
+    "cis_v8": "CIS Controls v8"
+}
+
+
+class FrameworkRegistry:
+    """
+    Clause catalogs discovered under data/<framework>/policy_clauses.json.
+
+    A catalog is compiled to its memory-mapped artifact and loaded on
+    first use only, then kept for the life of the registry. Processes
+    that map the same artifact share one copy of its keyword automaton
+    and clause vectors in the page cache; the clause dicts are parsed
+    from the artifact header by each process.
+
+    Frameworks are addressed by directory id ("nist_csf") or display
+    name ("NIST"), which comes from an optional framework.json
+    ({"name": ...}) next to the catalog, then DISPLAY_NAMES.
+    """
+
+    def __init__(self, data_dir=DEFAULT_DATA_DIR, backend=None):
+        self.data_dir = data_dir
+        self.backend = backend
+        self._libraries = {}
+        self._lock = threading.Lock()
+        self.catalogs = self._discover()
+
+    def _discover(self):
+        catalogs = {}
+        if not os.path.isdir(self.data_dir):
+            return catalogs
+
+        for framework_id in sorted(os.listdir(self.data_dir)):
+            path = os.path.join(self.data_dir, framework_id, CATALOG_FILENAME)
+            if os.path.isfile(path):
+                catalogs[framework_id] = {
+                    "id": framework_id,
+                    "name": _display_name(self.data_dir, framework_id),
+                    "path": path
+                }
+
+        return catalogs
+
+    def names(self):
+        """
+        Display names of the available frameworks, in id order.
+        """
+        return [catalog["name"] for catalog in self.catalogs.values()]
+
+    def resolve(self, framework):
+        """
+        Framework id for an id or display name (case-insensitive).
+        """
+        if framework in self.catalogs:
+            return framework
+
+        wanted = framework.casefold()
+        for framework_id, catalog in self.catalogs.items():
+            if wanted in (framework_id.casefold(), catalog["name"].casefold()):
+                return framework_id
+
+        raise KeyError(
+            f"Unknown framework: {framework}. "
+            f"Available frameworks: {', '.join(self.names()) or 'none'}"
+        )
+
+    def catalog_path(self, framework):
+        return self.catalogs[self.resolve(framework)]["path"]
+
+    def get(self, framework):
+        """
+        ClauseLibrary of a framework, loaded on first use.
+        """
+        framework_id = self.resolve(framework)
+
+        with self._lock:
+            library = self._libraries.get(framework_id)
+            if library is None:
+                library = load_clause_library(
+                    self.catalogs[framework_id]["path"], backend=self.backend
+                )
+                self._libraries[framework_id] = library
+
+        return library
+
+    def loaded(self):
+        """
+        Ids of the frameworks loaded so far.
+        """
+        with self._lock:
+            return list(self._libraries)
+
+
+def _display_name(data_dir, framework_id):
+    metadata_path = os.path.join(data_dir, framework_id, METADATA_FILENAME)
+
+    if os.path.isfile(metadata_path):
+        with open(metadata_path, "r", encoding="utf-8") as file:
+            name = json.load(file).get("name")
+        if name:
+            return name
+
+    return DISPLAY_NAMES.get(framework_id, framework_id.replace("_", " ").upper())
@@ -0,0 +1,232 @@
+from collections import deque
+
+import numpy as np
+
+from nlp.preprocessing import VOCABULARY
+
+
+def build_keyword_automaton(keywords, vocabulary=VOCABULARY):
+    """
+    Compile keywords into an Aho-Corasick automaton.
+
+    The automaton is built once for the whole clause catalog so that a
+    single pass over a segment reports every keyword it contains.
+    Keywords are normalized strings; the automaton runs over their
+    token ids, so a keyword only matches whole tokens of a segment.
+    """
+    goto = [{}]
+    fail = [0]
+    output = [set()]
+
+    for keyword in dict.fromkeys(keywords):
+        state = 0
+        for symbol in vocabulary.encode(keyword.split()).tolist():
+            next_state = goto[state].get(symbol)
+            if next_state is None:
+                next_state = len(goto)
+                goto[state][symbol] = next_state
+                goto.append({})
+                fail.append(0)
+                output.append(set())
+            state = next_state
+        output[state].add(keyword)
+
+    # Breadth-first pass to wire failure links and merge outputs
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for symbol, next_state in goto[state].items():
+            queue.append(next_state)
+            fallback = fail[state]
+            while fallback and symbol not in goto[fallback]:
+                fallback = fail[fallback]
+            target = goto[fallback].get(symbol, 0)
+            fail[next_state] = target if target != next_state else 0
+            if fail[next_state]:
+                output[next_state] |= output[fail[next_state]]
+
+    return {
+        "goto": goto,
+        "fail": fail,
+        "output": output
+    }
+
+
+def scan_keywords(automaton, tokens):
+    """
+    Return the set of compiled keywords that occur in a token id
+    sequence (a segment's "tokens" array).
+    """
+    if isinstance(automaton, ArrayAutomaton):
+        return automaton.scan(tokens)
+
+    goto = automaton["goto"]
+    fail = automaton["fail"]
+    output = automaton["output"]
+
+    # Empty keywords match everywhere, mirroring `"" in text`
+    hits = set(output[0])
+    state = 0
+
+    if hasattr(tokens, "tolist"):
+        # Iterating Python ints is much faster than NumPy scalars
+        tokens = tokens.tolist()
+
+    for symbol in tokens:
+        while state and symbol not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(symbol, 0)
+        if output[state]:
+            hits |= output[state]
+
+    return hits
+
+
+def build_clause_automaton(clauses):
+    """
+    Compile the normalized keywords of every clause into one automaton.
+    """
+    keywords = [
+        keyword
+        for clause in clauses
+        for keyword in clause["normalized_keywords"]
+    ]
+    return build_keyword_automaton(keywords)
+
+
+def scan_segments(automaton, policy_segments):
+    """
+    Scan each segment's tokens once.
+    Returns a mapping of segment id to the keywords found in it.
+    """
+    return {
+        segment["id"]: scan_keywords(automaton, segment["tokens"])
+        for segment in policy_segments
+    }
+
+
+def keyword_tokens(keywords):
+    """
+    Sorted distinct tokens of a keyword list: the symbol table of the
+    stored automaton arrays.
+    """
+    return sorted({token for keyword in keywords for token in keyword.split()})
+
+
+def automaton_to_arrays(automaton, keywords, vocabulary=VOCABULARY):
+    """
+    Flatten an automaton into integer lists so it can be stored in a
+    binary artifact. Keywords must list every compiled keyword; outputs
+    are stored as indices into it. Token ids only hold within a process,
+    so symbols are stored as indices into keyword_tokens(keywords).
+    """
+    keyword_index = {kw: i for i, kw in enumerate(keywords)}
+    tokens = keyword_tokens(keywords)
+    symbol_index = dict(zip(vocabulary.encode(tokens).tolist(), range(len(tokens))))
+    arrays = {
+        "goto_offsets": [0],
+        "goto_symbols": [],
+        "goto_targets": [],
+        "fail": list(automaton["fail"]),
+        "output_offsets": [0],
+        "output_keywords": []
+    }
+
+    for transitions, output in zip(automaton["goto"], automaton["output"]):
+        for symbol, target in transitions.items():
+            arrays["goto_symbols"].append(symbol_index[symbol])
+            arrays["goto_targets"].append(target)
+        arrays["goto_offsets"].append(len(arrays["goto_symbols"]))
+
+        arrays["output_keywords"].extend(sorted(keyword_index[kw] for kw in output))
+        arrays["output_offsets"].append(len(arrays["output_keywords"]))
+
+    return arrays
+
+
+class ArrayAutomaton:
+    """
+    Keyword automaton that runs directly on its automaton_to_arrays
+    form, e.g. views into a memory-mapped clause library artifact.
+
+    Loading copies nothing: every process mapping the same artifact
+    shares one copy of the arrays in the page cache. The transitions and
+    outputs of a state are decoded into small per-process lookups the
+    first time a scan reaches it, so only the states segments actually
+    visit are ever materialized.
+    """
+
+    def __init__(self, arrays, keywords, vocabulary=VOCABULARY):
+        self.keywords = keywords
+        # Stored symbols index the keyword tokens; map them to this
+        # process's token ids
+        self._symbol_ids = vocabulary.encode(keyword_tokens(keywords)).tolist()
+        self._goto_offsets = memoryview(np.ascontiguousarray(arrays["goto_offsets"]))
+        self._goto_symbols = np.asarray(arrays["goto_symbols"])
+        self._goto_targets = np.asarray(arrays["goto_targets"])
+        self._fail = memoryview(np.ascontiguousarray(arrays["fail"]))
+        self._output_offsets = memoryview(np.ascontiguousarray(arrays["output_offsets"]))
+        self._output_keywords = np.asarray(arrays["output_keywords"])
+        self._goto = {}
+        self._output = {}
+
+    def __len__(self):
+        return len(self._fail)
+
+    def _transitions(self, state):
+        start, end = self._goto_offsets[state], self._goto_offsets[state + 1]
+        symbol_ids = self._symbol_ids
+        transitions = {
+            symbol_ids[symbol]: target
+            for symbol, target in zip(
+                self._goto_symbols[start:end].tolist(), self._goto_targets[start:end].tolist()
+            )
+        }
+        self._goto[state] = transitions
+        return transitions
+
+    def output(self, state):
+        """
+        Keywords recognized on reaching a state.
+        """
+        keywords = self._output.get(state)
+        if keywords is None:
+            start, end = self._output_offsets[state], self._output_offsets[state + 1]
+            keywords = frozenset(
+                self.keywords[i] for i in self._output_keywords[start:end].tolist()
+            )
+            self._output[state] = keywords
+        return keywords
+
+    def scan(self, tokens):
+        """
+        scan_keywords for this automaton.
+        """
+        goto = self._goto
+        fail = self._fail
+        outputs = self._output
+
+        # Empty keywords match everywhere, mirroring `"" in text`
+        hits = set(self.output(0))
+        state = 0
+
+        if hasattr(tokens, "tolist"):
+            tokens = tokens.tolist()
+
+        for symbol in tokens:
+            while True:
+                transitions = goto.get(state)
+                if transitions is None:
+                    transitions = self._transitions(state)
+                if not state or symbol in transitions:
+                    break
+                state = fail[state]
+            state = transitions.get(symbol, 0)
+            found = outputs.get(state)
+            if found is None:
+                found = self.output(state)
+            if found:
+                hits |= found
+
+        return hits
+
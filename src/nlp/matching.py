@@ -1,36 +1,90 @@
+from instrumentation.metrics import increment, stage_timer
+from nlp.keyword_matcher import (
+    build_clause_automaton, build_keyword_automaton, scan_keywords, scan_segments
+)
+from nlp.preprocessing import tokenize
+
+PROGRESS_INTERVAL = 1024  # segments between stream_best_matches progress calls
+# Bump whenever the same clauses and text can score differently, so
+# stored results (incremental state, analysis history) are recomputed.
+# 2: keywords match whole tokens instead of substrings
+MATCHER_VERSION = 2
+
 
 def keyword_overlap_score(clause_keywords, segment_text):
     """
     Calculate keyword overlap score between a clause and a policy segment.
     Score = matched keywords / total clause keywords
+
+    Both sides are normalized, and keywords match on token boundaries.
     """
 
     if not clause_keywords:
         return 0.0
 
-    segment_text = segment_text.lower()
-    matched = 0
+    keywords = [tokenize(kw)[0] for kw in clause_keywords]
+    automaton = build_keyword_automaton(keywords)
+
+    return keyword_hit_score(keywords, scan_keywords(automaton, tokenize(segment_text)[1]))
+
+
+def keyword_hit_score(clause_keywords, segment_hits):
+    """
+    Calculate keyword overlap score from precomputed segment keyword hits.
+    Score = matched keywords / total clause keywords
+    """
 
-    for kw in clause_keywords:
-        if kw.lower() in segment_text:
-            matched += 1
+    if not clause_keywords:
+        return 0.0
+
+    matched = sum(1 for kw in clause_keywords if kw in segment_hits)
 
     return matched / len(clause_keywords)
 
 
-def find_best_segment_match(clause, policy_segments):
+def find_best_segment_match(clause, policy_segments, segment_hits=None,
+                            scores=None):
     """
     Find the policy segment that best matches a given clause.
     Returns the best matching segment and its score.
+
+    segment_hits maps segment ids to the keywords found in them
+    (see nlp.keyword_matcher.scan_segments). When omitted, the
+    segments are scanned for this clause's keywords only.
+
+    scores is this clause's row of a clause x segment score matrix
+    (see nlp.scoring.build_score_matrix). When given, the best match
+    is read from it instead of keyword overlap.
     """
 
+    if scores is not None:
+        best_index = int(scores.argmax()) if len(policy_segments) else None
+        if best_index is not None and scores[best_index] > 0:
+            best_segment = policy_segments[best_index]
+            return {
+                "best_score": float(scores[best_index]),
+                "best_segment_id": best_segment["id"],
+                "best_segment_text": best_segment["text"]
+            }
+        return {
+            "best_score": 0.0,
+            "best_segment_id": None,
+            "best_segment_text": None
+        }
+
+    increment("clause_segment_comparisons", len(policy_segments))
+
+    if segment_hits is None:
+        automaton = build_keyword_automaton(clause["normalized_keywords"])
+        segment_hits = scan_segments(automaton, policy_segments)
+
     best_score = 0.0
     best_segment = None
 
     for segment in policy_segments:
-        score = keyword_overlap_score(
+        score = keyword_hit_score(
             clause["normalized_keywords"],
-            segment["text"]
+            segment_hits[segment["id"]]
         )
 
         if score > best_score:
@@ -44,6 +98,78 @@ def find_best_segment_match(clause, policy_segments):
     }
 
 
+def stream_best_matches(clauses, policy_segments, automaton=None, progress=None):
+    """
+    Find the best matching segment of every clause in a single pass.
+
+    policy_segments may be any iterable, including the lazy generator of
+    nlp.preprocessing.iter_segments, so matching starts before the whole
+    document has been read. Returns one find_best_segment_match result
+    per clause, in clause order. A precompiled automaton for the clauses
+    (e.g. from nlp.clause_library) skips the build step.
+
+    progress, if given, is called as progress(segments=..., clauses_matched=...)
+    every PROGRESS_INTERVAL segments and once at the end.
+    """
+
+    with stage_timer("matching"):
+        return _stream_best_matches(clauses, policy_segments, automaton, progress)
+
+
+def _stream_best_matches(clauses, policy_segments, automaton, progress):
+    if automaton is None:
+        automaton = build_clause_automaton(clauses)
+
+    # Only clauses sharing a keyword with a segment can score on it
+    keyword_clauses = {}
+    for position, clause in enumerate(clauses):
+        for kw in set(clause["normalized_keywords"]):
+            keyword_clauses.setdefault(kw, []).append(position)
+
+    best_scores = [0.0] * len(clauses)
+    best_segments = [None] * len(clauses)
+    comparisons = 0
+    keyword_hits = 0
+    matched = 0
+    count = 0
+
+    for count, segment in enumerate(policy_segments, start=1):
+        hits = scan_keywords(automaton, segment["tokens"])
+        candidates = {
+            position
+            for kw in hits
+            for position in keyword_clauses[kw]
+        }
+        comparisons += len(candidates)
+        keyword_hits += len(hits)
+
+        for position in candidates:
+            score = keyword_hit_score(clauses[position]["normalized_keywords"], hits)
+            if score > best_scores[position]:
+                if best_segments[position] is None:
+                    matched += 1
+                best_scores[position] = score
+                best_segments[position] = segment
+
+        if progress is not None and count % PROGRESS_INTERVAL == 0:
+            progress(segments=count, clauses_matched=matched)
+
+    if progress is not None:
+        progress(segments=count, clauses_matched=matched)
+
+    increment("clause_segment_comparisons", comparisons)
+    increment("keyword_hits", keyword_hits)
+
+    return [
+        {
+            "best_score": score,
+            "best_segment_id": segment["id"] if segment else None,
+            "best_segment_text": segment["text"] if segment else None
+        }
+        for score, segment in zip(best_scores, best_segments)
+    ]
+
+
 def classify_coverage(score):
     """
     Classify coverage level based on match score.
@@ -1,6 +1,44 @@
+import codecs
+import functools
+import itertools
 import re
+import threading
+
+import numpy as np
+
+from instrumentation.metrics import increment, stage_timer
 
 MIN_SEGMENT_LENGTH = 25  # characters
+SEGMENT_BOUNDARY = re.compile(r"[.!?]\s+")
+DEFAULT_CHUNK_SIZE = 64 * 1024  # bytes
+MAX_PIECE_LENGTH = 4096  # characters of unpunctuated text before a forced cut
+TOKEN_DTYPE = np.int32
+
+MAX_HEADING_LENGTH = 80  # characters
+MAX_HEADING_WORDS = 12
+MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.+)$")
+NUMBERED_HEADING = re.compile(r"^(\d+(?:\.\d+)*)\.?\s+(.+)$")
+# A list number left alone when sentence splitting cuts "1. Scope" at ". "
+BARE_NUMBER = re.compile(r"^\d+(?:\.\d+)*$")
+# One line and its line break; text files keep their \r\n or \r endings
+LINE = re.compile(r"([^\r\n]*)(?:\r\n?|\n)?")
+
+
+class _NormalizeTable(dict):
+    """
+    str.translate table keeping a-z and 0-9 and mapping every other
+    character to a space. Characters are classified on first sight and
+    cached, so the table covers all of Unicode without precomputing it.
+    """
+
+    def __missing__(self, code_point):
+        char = chr(code_point)
+        keep = ("a" <= char <= "z") or ("0" <= char <= "9")
+        replacement = self[code_point] = char if keep else " "
+        return replacement
+
+
+_NORMALIZE_TABLE = _NormalizeTable()
 
 
 def normalize_text(text: str) -> str:
@@ -10,29 +48,476 @@ def normalize_text(text: str) -> str:
     - remove punctuation
     - collapse whitespace
     """
-    text = text.lower()
-    text = re.sub(r"[^a-z0-9\s]", " ", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    return " ".join(text.lower().translate(_NORMALIZE_TABLE).split())
+
+
+class Vocabulary:
+    """
+    Interned token ids shared by every clause catalog in the process,
+    so keyword and clause tokens compare as integer arrays.
+
+    Only clause documents and keywords are interned here; the other
+    words of a policy get ids of their own document (see
+    DocumentVocabulary), so the shared vocabulary does not grow with
+    every document a long-running process reads.
+
+    Ids are assigned in order of first appearance and never change.
+    They are only meaningful within one process: anything persisted
+    must store the tokens themselves (see nlp.clause_library).
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._tokens = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def __contains__(self, token):
+        return token in self._ids
+
+    def get(self, token, default=None):
+        return self._ids.get(token, default)
+
+    def intern(self, token):
+        token_id = self._ids.get(token)
+        if token_id is None:
+            with self._lock:
+                token_id = self._ids.get(token)
+                if token_id is None:
+                    token_id = len(self._tokens)
+                    self._tokens.append(token)
+                    self._ids[token] = token_id
+        return token_id
+
+    def encode(self, tokens):
+        """
+        Token ids of a token sequence as a compact integer array.
+        """
+        ids = self._ids
+        intern = self.intern
+        return np.fromiter(
+            (ids[token] if token in ids else intern(token) for token in tokens),
+            dtype=TOKEN_DTYPE, count=len(tokens)
+        )
+
+    def decode(self, token_ids):
+        return [self._tokens[token_id] for token_id in token_ids]
+
+
+VOCABULARY = Vocabulary()
+
+
+class DocumentVocabulary:
+    """
+    Token ids of one policy document. Tokens of the shared vocabulary
+    keep their ids; the document's other tokens are numbered -1, -2, ...
+    here, so distinct words stay distinct for scoring and are dropped
+    with the document.
+
+    A catalog loaded after the document was tokenized may intern some
+    of those words; refresh gives them their shared ids before matching.
+    """
+
+    def __init__(self, vocabulary=VOCABULARY):
+        self.vocabulary = vocabulary
+        self._ids = {}
+        self._assigned = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def encode(self, tokens):
+        """
+        Token ids of a token sequence as a compact integer array.
+        """
+        shared = self.vocabulary._ids
+        local = self._ids
+
+        def token_id(token):
+            token_id = shared.get(token)
+            if token_id is None:
+                token_id = local.get(token)
+                if token_id is None:
+                    self._assigned += 1
+                    token_id = local[token] = -self._assigned
+            return token_id
+
+        return np.fromiter(map(token_id, tokens), dtype=TOKEN_DTYPE, count=len(tokens))
+
+    def refresh(self, segments):
+        """
+        Replace the document ids of words interned in the shared
+        vocabulary since, in the "tokens" of segments tokenized with
+        this vocabulary. Returns the number of words promoted.
+        """
+        promoted = [token for token in self._ids if token in self.vocabulary]
+        if not promoted:
+            return 0
+
+        # Indexed by -1 - document id; ids that stay local map to themselves
+        translation = -1 - np.arange(self._assigned, dtype=TOKEN_DTYPE)
+        for token in promoted:
+            translation[-1 - self._ids.pop(token)] = self.vocabulary.get(token)
+
+        for segment in segments:
+            tokens = segment.get("tokens")
+            if tokens is None:
+                continue
+            local = tokens < 0
+            if local.any():
+                tokens = tokens.copy()
+                tokens[local] = translation[-1 - tokens[local]]
+                segment["tokens"] = tokens
+
+        return len(promoted)
+
+
+def tokenize(text, vocabulary=None):
+    """
+    Normalize text and encode its tokens with the DocumentVocabulary of
+    its document; by default the text is a document of its own.
+    Returns (normalized text, token id array).
+    """
+    if vocabulary is None:
+        vocabulary = DocumentVocabulary()
+    normalized = normalize_text(text)
+    return normalized, vocabulary.encode(normalized.split())
+
+
+def _is_title(text):
+    """
+    Short line in title case or capitals without sentence punctuation,
+    e.g. "Access Control Policy" or "INCIDENT RESPONSE".
+    """
+    words = text.split()
+    if (
+        len(text) > MAX_HEADING_LENGTH
+        or len(words) > MAX_HEADING_WORDS
+        or text[-1] in ".,;!?"
+        or not text[0].isupper()
+    ):
+        return False
+
+    return text.isupper() or all(
+        word[0].isupper() for word in words if len(word) >= 4 and word.isalpha()
+    )
+
+
+def detect_heading(line, number=None):
+    """
+    (level, title) if a stripped line looks like a heading, else None.
+
+    Recognized: Markdown "## Title", numbered "2.1 Title" (level is the
+    number's depth) and plain title-case or capitalized lines (level 1).
+    number is a list number that preceded the line, e.g. "2" of "2. Scope".
+    """
+    match = MARKDOWN_HEADING.match(line)
+    if match:
+        return len(match.group(1)), match.group(2).strip()
+
+    match = NUMBERED_HEADING.match(line)
+    if match and _is_title(match.group(2)):
+        return match.group(1).count(".") + 1, line
+
+    if _is_title(line):
+        if number is not None:
+            return number.count(".") + 1, f"{number}. {line}"
+        return 1, line
+
+    return None
+
+
+class SectionOutline:
+    """
+    Section tree of a document, built while it is segmented.
 
+    iter_segments splits every piece of text between sentence boundaries,
+    including pieces too short to become segments, at its heading lines
+    and tags each segment with the id of its section. A heading opens a
+    section under the closest open section of a lower level. Section 0 is
+    the document root and holds text before any heading.
 
-def segment_policy(text: str):
+    With index_words, the outline also keeps word_sections, the sorted
+    ids of the sections holding each normalized word, so hierarchical
+    matching (see nlp.sections) needs no second pass over the segments.
     """
-    Split policy text into sentence-level segments.
+
+    def __init__(self, index_words=False):
+        self.sections = [{"id": 0, "title": None, "level": 0, "parent": None}]
+        self.word_sections = {} if index_words else None
+        self._open = [0]
+        self._number = None
+
+    def _open_section(self, level, title):
+        while self.sections[self._open[-1]]["level"] >= level:
+            self._open.pop()
+
+        section = {
+            "id": len(self.sections),
+            "title": title,
+            "level": level,
+            "parent": self._open[-1]
+        }
+        self.sections.append(section)
+        self._open.append(section["id"])
+
+    def split(self, piece):
+        """
+        Read the headings of a piece and cut it at them.
+
+        Returns (start, end, section) character spans of the piece, in
+        order: each heading line is a span of its own in the section it
+        opens, without Markdown markers, and the text between headings
+        is one span in the section it follows.
+        """
+        spans = []
+        start = None
+        previous_blank = True
+
+        for match in LINE.finditer(piece):
+            line_start, raw_line = match.start(), match.group(1)
+            line = raw_line.strip()
+            if not line:
+                previous_blank = True
+                continue
+
+            number, self._number = self._number, None
+            heading = detect_heading(line, number) if previous_blank or number else None
+            previous_blank = False
+
+            if heading is not None:
+                # The heading closes the text before it
+                if start is not None:
+                    spans.append((start, line_start, self._open[-1]))
+                    start = None
+                self._open_section(*heading)
+
+                title_start = line_start + len(raw_line) - len(raw_line.lstrip())
+                markdown = MARKDOWN_HEADING.match(line)
+                if markdown:
+                    title_start += markdown.start(2)
+                spans.append((title_start, line_start + len(raw_line), self._open[-1]))
+            elif BARE_NUMBER.match(line):
+                self._number = line
+            elif start is None:
+                start = line_start
+
+        if start is not None:
+            spans.append((start, len(piece), self._open[-1]))
+        return spans
+
+    def index_segment(self, segment):
+        """
+        Record the words of a segment in word_sections.
+        """
+        section = segment.get("section", 0)
+        for word in set(segment["normalized"].split()):
+            sections = self.word_sections.get(word)
+            if sections is None:
+                self.word_sections[word] = [section]
+            elif sections[-1] != section:
+                # Segments arrive in document order, so lists stay sorted
+                sections.append(section)
+
+
+@functools.lru_cache(maxsize=None)
+def _bom_length(encoding):
+    # Codecs such as utf-16 and utf-8-sig start every encode() with a BOM
+    return len("".encode(encoding))
+
+
+def _byte_length(text, encoding):
     """
-    raw_segments = re.split(r"[.!?]\s+", text)
+    Bytes text takes up in encoding, not counting a byte order mark.
+    """
+    return len(text.encode(encoding)) - _bom_length(encoding)
+
+
+def _make_segment(piece, idx, byte_offset, encoding, vocabulary, section=None):
+    raw = piece.strip()
+    # Offsets follow the source's line endings; the text reads with "\n"
+    segment = raw.replace("\r\n", "\n").replace("\r", "\n") if "\r" in raw else raw
+
+    if len(segment) < MIN_SEGMENT_LENGTH:
+        return None
+
+    leading = piece[:len(piece) - len(piece.lstrip())]
+    byte_start = byte_offset + _byte_length(leading, encoding)
+    normalized, tokens = tokenize(segment, vocabulary)
+
+    segment = {
+        "id": idx,
+        "text": segment,
+        "normalized": normalized,
+        "tokens": tokens,
+        "byte_start": byte_start,
+        "byte_end": byte_start + _byte_length(raw, encoding)
+    }
+    if section is not None:
+        segment["section"] = section
+
+    return segment
+
+
+def iter_segments(blocks, encoding="utf-8", outline=None, vocabulary=None):
+    """
+    Lazily split a stream of text blocks into sentence-level segments.
+
+    Sentence boundaries may straddle block edges, and headings end the
+    text before them (see SectionOutline.split). Segment ids match those
+    of segment_policy on the joined text. Byte offsets refer to the text
+    encoded with the given encoding, including the byte order mark such
+    codecs as utf-16 and utf-8-sig write: with the encoding the blocks
+    were decoded from (see ingestion.document_loader.policy_encoding),
+    they point into the source file. Segment text always reads with
+    "\\n" line breaks. With a SectionOutline, segments also get the id
+    of their "section". Segment "tokens" are encoded with vocabulary,
+    a DocumentVocabulary (a new one by default).
+    """
+    if vocabulary is None:
+        vocabulary = DocumentVocabulary()
+
+    count = 0
+    try:
+        for segment in _split_blocks(blocks, encoding, outline, vocabulary):
+            count += 1
+            yield segment
+    finally:
+        increment("segments", count)
+
+
+def _split_piece(piece, idx, byte_offset, encoding, outline, tag_sections, vocabulary):
+    """
+    Segments of the text between two sentence boundaries, cut at its
+    headings. Returns (segments, number of ids used).
+    """
+    spans = outline.split(piece)
     segments = []
 
-    for idx, segment in enumerate(raw_segments):
-        segment = segment.strip()
+    for number, (start, end, section) in enumerate(spans):
+        segment = _make_segment(
+            piece[start:end], idx + number,
+            byte_offset + _byte_length(piece[:start], encoding), encoding,
+            vocabulary, section if tag_sections else None
+        )
+        if segment:
+            if tag_sections and outline.word_sections is not None:
+                outline.index_segment(segment)
+            segments.append(segment)
+
+    return segments, len(spans)
+
+
+def _forced_cut(text, start):
+    """
+    Where to end a piece that runs past MAX_PIECE_LENGTH without a
+    sentence boundary: after its last line break, else at its last
+    space, else at the limit itself.
+    """
+    limit = start + MAX_PIECE_LENGTH
+    for separator in ("\n", "\r", " "):
+        position = text.rfind(separator, start + 1, limit)
+        if position != -1:
+            return position + 1
+    return limit
+
+
+def _split_blocks(blocks, encoding, outline, vocabulary):
+    # Headings split segments even when the caller keeps no outline
+    tag_sections = outline is not None
+    if outline is None:
+        outline = SectionOutline()
+
+    pending = ""
+    search_from = 0
+    byte_offset = _bom_length(encoding)
+    idx = 0
+
+    # A trailing empty block flushes what is left once the stream ends
+    for block, final in itertools.chain(
+            ((block, False) for block in blocks), (("", True),)):
+        pending += block
+        start = 0
+
+        while True:
+            match = SEGMENT_BOUNDARY.search(pending, search_from)
+
+            # Cuts only depend on the text up to the limit, so streamed
+            # and joined input still split alike
+            if match is not None:
+                overlong = match.start() - start > MAX_PIECE_LENGTH
+            else:
+                overlong = len(pending) - start > MAX_PIECE_LENGTH + 1
+
+            if overlong:
+                cut = end = _forced_cut(pending, start)
+            elif match is None:
+                break
+            elif match.end() == len(pending) and not final:
+                # A boundary at the very end may still grow into the next block
+                break
+            else:
+                cut, end = match.start(), match.end()
+
+            segments, used = _split_piece(
+                pending[start:cut], idx, byte_offset, encoding,
+                outline, tag_sections, vocabulary
+            )
+            yield from segments
 
-        if len(segment) < MIN_SEGMENT_LENGTH:
-            continue
+            byte_offset += _byte_length(pending[start:end], encoding)
+            idx += used
+            start = search_from = end
 
-        segments.append({
-            "id": idx,
-            "text": segment,
-            "normalized": normalize_text(segment)
-        })
+        pending = pending[start:]
+        if match is not None:
+            search_from = max(0, match.start() - start)
+        else:
+            # Only the last character can start a boundary once more text arrives
+            search_from = max(0, len(pending) - 1)
 
-    return segments
+    segments, _ = _split_piece(
+        pending, idx, byte_offset, encoding, outline, tag_sections, vocabulary
+    )
+    yield from segments
+
+
+def iter_policy_segments(filepath, chunk_size=DEFAULT_CHUNK_SIZE, encoding="utf-8",
+                         outline=None, vocabulary=None):
+    """
+    Stream segments from a policy file, reading it in fixed-size chunks
+    so memory use does not grow with the document size.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+
+    def blocks():
+        with open(filepath, "rb") as file:
+            while True:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    break
+                yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+
+    return iter_segments(blocks(), encoding, outline, vocabulary)
+
+
+def segment_policy(text: str, outline=None, vocabulary=None):
+    """
+    Split policy text into sentence-level segments, recording its
+    sections in outline if one is given. Pass a DocumentVocabulary to
+    refresh the segment tokens later (see iter_segments).
+    """
+    return segment_blocks([text], outline, vocabulary=vocabulary)
+
+
+def segment_blocks(blocks, outline=None, encoding="utf-8", vocabulary=None):
+    """
+    segment_policy for a stream of text blocks, such as
+    ingestion.document_loader.iter_policy_blocks; encoding is that of
+    ingestion.document_loader.policy_encoding, for byte offsets.
+    """
+    with stage_timer("segmentation"):
+        return list(iter_segments(blocks, encoding, outline, vocabulary))
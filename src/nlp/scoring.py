@@ -0,0 +1,143 @@
+import numpy as np
+from scipy import sparse
+
+from instrumentation.metrics import increment, stage_timer
+from nlp.clause_preprocessing import clause_document
+from nlp.embeddings import embedding_score_matrix
+from nlp.preprocessing import VOCABULARY
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def build_term_matrices(clause_docs, segment_docs):
+    """
+    Build sparse term-count matrices for clauses and segments from
+    their token id arrays, with columns for the token ids that occur
+    in either.
+    """
+    docs = [*clause_docs, *segment_docs]
+    lengths = np.fromiter((len(doc) for doc in docs), dtype=np.int64, count=len(docs))
+    tokens = np.concatenate(docs) if docs else np.empty(0, dtype=np.int64)
+
+    # Compact the process-wide ids to this pair's own vocabulary
+    terms, cols = np.unique(tokens, return_inverse=True)
+    rows = np.repeat(np.arange(len(docs)), lengths)
+    data = np.ones(len(cols), dtype=np.float64)
+
+    # Duplicate (row, col) entries are summed into term counts
+    counts = sparse.csr_matrix(
+        (data, (rows, cols.ravel())), shape=(len(docs), len(terms))
+    )
+
+    return counts[:len(clause_docs)], counts[len(clause_docs):]
+
+
+def clause_tokens(clause):
+    """
+    Token ids of the text a clause is scored with.
+    """
+    return VOCABULARY.encode(clause_document(clause).split())
+
+
+def document_frequency(counts):
+    """
+    Number of rows each term occurs in.
+    """
+    return np.bincount(counts.indices, minlength=counts.shape[1])
+
+
+def _l2_normalize_rows(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ matrix
+
+
+def tfidf_score_matrix(clauses, policy_segments):
+    """
+    Cosine similarity between TF-IDF vectors of clauses and segments.
+    IDF is taken over the policy segments.
+    """
+    clause_counts, segment_counts = build_term_matrices(
+        [clause_tokens(c) for c in clauses],
+        [s["tokens"] for s in policy_segments]
+    )
+
+    n_segments = segment_counts.shape[0]
+    df = document_frequency(segment_counts)
+    idf = np.log((1 + n_segments) / (1 + df)) + 1.0
+    idf_diag = sparse.diags(idf)
+
+    clause_vectors = _l2_normalize_rows(clause_counts @ idf_diag)
+    segment_vectors = _l2_normalize_rows(segment_counts @ idf_diag)
+
+    return (clause_vectors @ segment_vectors.T).toarray()
+
+
+def bm25_score_matrix(clauses, policy_segments, k1=BM25_K1, b=BM25_B):
+    """
+    Okapi BM25 scores of every segment for every clause, treating the
+    clause document as the query.
+
+    Each clause row is divided by its saturation bound
+    (sum of idf * (k1 + 1) over query terms), so scores fall in [0, 1]
+    and remain comparable with the coverage thresholds.
+    """
+    clause_counts, segment_counts = build_term_matrices(
+        [clause_tokens(c) for c in clauses],
+        [s["tokens"] for s in policy_segments]
+    )
+
+    n_segments = segment_counts.shape[0]
+    df = document_frequency(segment_counts)
+    idf = np.log(1.0 + (n_segments - df + 0.5) / (df + 0.5))
+
+    lengths = np.asarray(segment_counts.sum(axis=1)).ravel()
+    avg_length = lengths.mean() if n_segments else 0.0
+    if avg_length:
+        length_norm = k1 * (1.0 - b + b * lengths / avg_length)
+    else:
+        length_norm = np.full(n_segments, k1)
+
+    # Saturate term frequencies on the sparse structure
+    saturated = segment_counts.tocsr(copy=True)
+    row_norm = np.repeat(length_norm, np.diff(saturated.indptr))
+    saturated.data = saturated.data * (k1 + 1.0) / (saturated.data + row_norm)
+
+    query = clause_counts.copy()
+    query.data[:] = 1.0
+    weighted_query = query @ sparse.diags(idf)
+
+    scores = (weighted_query @ saturated.T).toarray()
+
+    bounds = np.asarray(weighted_query.sum(axis=1)).ravel() * (k1 + 1.0)
+    bounds[bounds == 0] = 1.0
+
+    return scores / bounds[:, None]
+
+
+SCORERS = {
+    "tfidf": tfidf_score_matrix,
+    "bm25": bm25_score_matrix,
+    "embedding": embedding_score_matrix
+}
+
+
+def build_score_matrix(clauses, policy_segments, method="tfidf", **options):
+    """
+    Compute the full clause x segment similarity matrix in one batch.
+    Rows follow the order of clauses, columns the order of segments.
+    Extra options are passed to the selected scorer.
+    """
+    if method not in SCORERS:
+        raise ValueError(
+            f"Unknown scoring method: {method}. "
+            f"Available methods: {', '.join(sorted(SCORERS))}"
+        )
+
+    with stage_timer(f"scoring_{method}"):
+        score_matrix = SCORERS[method](clauses, policy_segments, **options)
+
+    increment("clause_segment_comparisons", score_matrix.size)
+    return score_matrix
+
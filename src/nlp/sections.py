@@ -0,0 +1,144 @@
+import numpy as np
+
+from instrumentation.metrics import increment, stage_timer
+from nlp.evidence import evidence_to_match, stream_top_matches
+from nlp.matching import stream_best_matches
+from nlp.preprocessing import SectionOutline
+
+
+class SectionIndex:
+    """
+    Section-level keyword summaries of a segmented document.
+
+    Every section is summarized by the words occurring in its segments,
+    kept as the sorted sections of each word (SectionOutline.word_sections).
+    A keyword can only occur in a segment of a section that contains all
+    of its words, which makes those sections the candidates of a clause:
+    pruning to them never loses a keyword match.
+    """
+
+    def __init__(self, segments, word_sections=None):
+        # Section of each segment, by position; segments without one are in the root
+        self.segment_sections = np.fromiter(
+            (segment.get("section", 0) for segment in segments),
+            dtype=np.int64, count=len(segments)
+        )
+        self.n_sections = int(self.segment_sections.max(initial=0)) + 1
+
+        if word_sections is None:
+            # No summary kept during segmentation: build one from the segments
+            outline = SectionOutline(index_words=True)
+            for segment in segments:
+                outline.index_segment(segment)
+            word_sections = outline.word_sections
+        self.word_sections = word_sections
+        self._keyword_sections = {}
+
+    def _word_sections(self, word):
+        return np.array(self.word_sections.get(word, ()), dtype=np.int64)
+
+    def keyword_sections(self, keyword):
+        """
+        Sections containing every word of a normalized keyword.
+        """
+        sections = self._keyword_sections.get(keyword)
+        if sections is None:
+            words = keyword.split()
+            if not words:
+                # Empty keywords match everywhere
+                sections = np.arange(self.n_sections)
+            else:
+                sections = self._word_sections(words[0])
+                for word in words[1:]:
+                    sections = np.intersect1d(
+                        sections, self._word_sections(word), assume_unique=True
+                    )
+            self._keyword_sections[keyword] = sections
+        return sections
+
+    def candidate_sections(self, clause):
+        """
+        Boolean mask of the sections that may contain one of the
+        clause's keywords.
+        """
+        candidates = np.zeros(self.n_sections, dtype=bool)
+        for keyword in set(clause["normalized_keywords"]):
+            candidates[self.keyword_sections(keyword)] = True
+        return candidates
+
+    def segments_in(self, sections):
+        """
+        Positions of the segments in a boolean section mask, in document order.
+        """
+        return np.flatnonzero(sections[self.segment_sections])
+
+
+def hierarchical_keyword_matches(clauses, segments, automaton=None, evidence_k=0,
+                                 word_sections=None):
+    """
+    Keyword matching that skips sections no clause can match.
+
+    Sections holding none of any clause's keywords (by their token
+    summaries) are pruned and their segments never scanned; the
+    remaining segments are matched in one stream_best_matches pass
+    (stream_top_matches with evidence_k), so results are identical.
+    Stream matching already scores a clause only on segments holding
+    one of its keywords, so per-clause pruning would save nothing more:
+    the saving is the scan of the pruned segments. Pass the
+    word_sections of a SectionOutline(index_words=True) the segments
+    came from to reuse its summaries; otherwise they are built here,
+    which costs about as much as the scan they save.
+
+    Returns (matches, evidence); evidence is None unless evidence_k > 0.
+    """
+    with stage_timer("section_pruning"):
+        index = SectionIndex(segments, word_sections)
+        sections = np.zeros(index.n_sections, dtype=bool)
+        for clause in clauses:
+            sections |= index.candidate_sections(clause)
+        subset = [segments[i] for i in index.segments_in(sections).tolist()]
+
+    increment("sections", index.n_sections)
+    increment("pruned_segments", len(segments) - len(subset))
+
+    if evidence_k:
+        evidence = stream_top_matches(clauses, subset, evidence_k, automaton)
+        return [evidence_to_match(record) for record in evidence], evidence
+
+    return stream_best_matches(clauses, subset, automaton), None
+
+
+def hierarchical_score_matrix(clauses, segments, method="tfidf", word_sections=None,
+                              **options):
+    """
+    Coarse-to-fine variant of nlp.scoring.build_score_matrix.
+
+    Only segments in some clause's candidate sections are scored, and
+    each clause keeps the scores of its own candidates; the rest are 0.
+    Unlike the keyword path this is an approximation: a segment in a
+    section without any of a clause's keywords cannot match it, and
+    TF-IDF/BM25 statistics come from the scored segments only.
+    word_sections is as for hierarchical_keyword_matches.
+    """
+    from nlp.scoring import build_score_matrix
+
+    with stage_timer("section_pruning"):
+        index = SectionIndex(segments, word_sections)
+        candidates = np.array(
+            [index.candidate_sections(clause) for clause in clauses], dtype=bool
+        ).reshape(len(clauses), index.n_sections)
+        columns = index.segments_in(candidates.any(axis=0))
+
+    increment("sections", index.n_sections)
+    increment("pruned_segments", len(segments) - len(columns))
+
+    matrix = np.zeros((len(clauses), len(segments)))
+    if len(columns):
+        scores = build_score_matrix(
+            clauses, [segments[i] for i in columns.tolist()], method, **options
+        )
+        # Each clause keeps only the segments of its own candidate sections
+        mask = candidates[:, index.segment_sections[columns]]
+        matrix[:, columns] = np.where(mask, scores, 0.0)
+
+    return matrix
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from instrumentation.metrics import increment
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "vectors")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+
+# cache_dir -> VectorCache shared by the pipelines of a process
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+
+def vector_key(model_id, normalized_text):
+    """
+    Content address of a vector: hash of the model ID and normalized text.
+    """
+    digest = hashlib.sha256()
+    digest.update(model_id.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalized_text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class VectorCache:
+    """
+    On-disk, content-addressed store of embedding vectors.
+
+    Each vector lives in its own .npy file named by its key and sharded
+    by the first two hex digits. Reads refresh the file's modification
+    time, and writes evict the least recently used files once the
+    cache grows beyond max_bytes.
+
+    Subclasses may store other values by overriding suffix, _read and
+    _write (see remediation.generation.GenerationCache).
+    """
+
+    suffix = ".npy"
+    metric = "vector_cache"
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}{self.suffix}")
+
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+
+        entries = []
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(self.suffix):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def size(self):
+        """
+        Total bytes currently held by the cache.
+        """
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        return self._size
+
+    def get(self, model_id, normalized_text):
+        """
+        Return the cached vector, or None on a miss.
+        """
+        path = self._path(vector_key(model_id, normalized_text))
+
+        try:
+            vector = self._read(path)
+            # Another process may evict the file right after the read
+            os.utime(path)
+        except (ValueError, OSError):
+            self.misses += 1
+            increment(f"{self.metric}_misses")
+            return None
+
+        self.hits += 1
+        increment(f"{self.metric}_hits")
+        return vector
+
+    def put(self, model_id, normalized_text, vector):
+        """
+        Store a vector and enforce the size budget.
+        """
+        path = self._path(vector_key(model_id, normalized_text))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        current_size = self.size()
+        previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+
+        # Write to a uniquely named temporary file first, so readers never
+        # see partial data and concurrent writers never share one
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                self._write(file, vector)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._size = current_size - previous_size + os.path.getsize(path)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _read(self, path):
+        return np.load(path)
+
+    def _write(self, file, vector):
+        np.save(file, np.asarray(vector, dtype=np.float32))
+
+    def evict(self):
+        """
+        Delete least recently used vectors until the cache fits its budget.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        self._size = total
+
+
+def shared_vector_cache(cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    One VectorCache per directory and process, so pipelines reuse its
+    size accounting instead of rescanning the directory.
+    """
+    with _shared_lock:
+        cache = _shared_caches.get(cache_dir)
+        if cache is None:
+            cache = _shared_caches[cache_dir] = VectorCache(cache_dir, max_bytes)
+        return cache
@@ -0,0 +1,496 @@
+from dataclasses import dataclass
+import json
+import os
+
+from ingestion.document_loader import iter_policy_blocks, policy_encoding
+from instrumentation.memory import SEGMENTATION_OVERHEAD, estimate_segmentation_memory
+from instrumentation.metrics import stage_timer
+from nlp.evidence import evidence_to_match, find_top_segments, stream_top_matches
+from nlp.matching import MATCHER_VERSION, stream_best_matches, find_best_segment_match
+from nlp.vector_cache import DEFAULT_CACHE_DIR as DEFAULT_VECTOR_CACHE_DIR, shared_vector_cache
+from nlp.sections import hierarchical_keyword_matches, hierarchical_score_matrix
+from nlp.preprocessing import (
+    DocumentVocabulary, SectionOutline, iter_segments, segment_blocks, tokenize
+)
+from reporting.gap_report import generate_gap_report
+from remediation.policy_suggestions import generate_policy_suggestions
+from roadmap.improvement_roadmap import generate_improvement_roadmap
+from reporting.final_report import generate_compliance_report
+
+PREVIEW_CHARS = 300
+# Stored analyses (storage.history) are reused only under the same
+# version; bump REPORT_FORMAT whenever gap entries or reports change shape
+REPORT_FORMAT = 1
+ANALYSIS_VERSION = f"matcher-{MATCHER_VERSION}.report-{REPORT_FORMAT}"
+
+
+@dataclass
+class IngestionResult:
+    source: str
+    text: str  # None for sources, which segmentation streams block by block
+    encoding: str = "utf-8"  # of the source bytes that segment offsets count
+
+
+@dataclass
+class SegmentationResult:
+    segments: list  # in low-memory mode only matched segments carry text
+    sections: list = None  # nlp.preprocessing.SectionOutline sections
+    preview: str = ""  # first PREVIEW_CHARS characters of the policy text
+    vocabulary: DocumentVocabulary = None  # ids of the segment tokens, if kept
+    word_sections: dict = None  # SectionOutline.word_sections, for hierarchical matching
+
+
+@dataclass
+class MatchingResult:
+    method: str
+    matches: list  # one find_best_segment_match result per clause
+    evidence: list = None  # one nlp.evidence record per clause, if requested
+
+
+@dataclass
+class GapReportResult:
+    entries: list
+
+
+@dataclass
+class SuggestionsResult:
+    suggestions: list
+
+
+@dataclass
+class RoadmapResult:
+    items: list
+
+
+@dataclass
+class FinalReportResult:
+    analysis_results: list  # merged gap entries, or a ColumnarReport
+    report: dict
+
+
+class AnalysisPipeline:
+    """
+    Analysis of one policy document as a chain of memoized stages:
+
+        ingestion -> segmentation -> matching -> gap_report
+            -> suggestions -> roadmap -> final_report
+
+    Each stage runs at most once per input and hands a typed result to
+    the stages after it. Requesting a stage runs whatever it depends on;
+    invalidating a stage forces it and everything downstream to rerun.
+
+    A source document is never loaded as one string: segmentation
+    streams its text blocks (see ingestion.registry) into the segmenter.
+    In low-memory mode segmentation also keeps only segment ids and
+    offsets, matching streams the source again, and only the matched
+    segments get their text back. The mode is chosen up front when the
+    estimated segmentation footprint exceeds memory_budget, and a run
+    that hits MemoryError under a budget is retried once in it.
+
+    progress, if given, is called as progress(stage, **counts) when a
+    stage starts and as it advances, e.g. progress("segmentation", pages=3)
+    or progress("matching", segments=2048, clauses_matched=41).
+    """
+
+    STAGES = (
+        "ingestion",
+        "segmentation",
+        "matching",
+        "gap_report",
+        "suggestions",
+        "roadmap",
+        "final_report"
+    )
+
+    def __init__(self, library, source=None, text=None, method="keyword",
+                 scoring_options=None, pdf_workers=None, columnar=False,
+                 memory_budget=None, progress=None, evidence_k=0,
+                 hierarchical=False, generator=None, generation_cache=None,
+                 generation_context=None, vector_cache_dir=DEFAULT_VECTOR_CACHE_DIR):
+        """
+        library is a compiled nlp.clause_library.ClauseLibrary. Provide
+        either a policy file path (source) or the policy text itself.
+        method is "keyword" or any nlp.scoring method name. With
+        columnar=True the report stages share one ColumnarReport that
+        each stage adds its columns to. memory_budget is in bytes.
+        evidence_k > 0 keeps the k best segments of every clause as
+        evidence in the gap report. hierarchical=True matches clauses
+        to candidate sections first and scores only their segments
+        (see nlp.sections). generator is a remediation.generation
+        backend that writes the suggestions of non-covered clauses,
+        memoized in generation_cache; generation_context names the
+        framework and policy in its prompts. Embedding scoring memoizes
+        vectors under vector_cache_dir; None turns the cache off.
+        """
+        if source is None and text is None:
+            raise ValueError("Provide a policy source path or policy text")
+
+        self.library = library
+        self.source = source
+        self.text = text
+        self.method = method
+        self.scoring_options = scoring_options or {}
+        self.pdf_workers = pdf_workers
+        self.columnar = columnar
+        self.memory_budget = memory_budget
+        self.progress = progress
+        self.evidence_k = evidence_k
+        self.hierarchical = hierarchical
+        self.generator = generator
+        self.generation_cache = generation_cache
+        self.vector_cache_dir = vector_cache_dir
+        self.generation_context = {
+            "policy": os.path.basename(source) if source else None,
+            **(generation_context or {})
+        }
+        self.low_memory = False
+        self._results = {}
+        self._depth = 0
+
+        if memory_budget is not None:
+            if text is not None:
+                estimate = len(text) * SEGMENTATION_OVERHEAD
+            else:
+                estimate = estimate_segmentation_memory(source)
+            self.low_memory = estimate > memory_budget
+
+    @property
+    def clauses(self):
+        return self.library.clauses
+
+    def run(self, stage="final_report"):
+        """
+        Return the result of a stage, computing it and any missing
+        upstream stages first.
+        """
+        if stage not in self.STAGES:
+            raise ValueError(f"Unknown pipeline stage: {stage}")
+
+        if stage in self._results:
+            return self._results[stage]
+
+        retry = False
+        self._depth += 1
+        try:
+            result = getattr(self, f"_run_{stage}")()
+        except MemoryError:
+            # Only the outermost call retries, once nothing holds the old results
+            if self._depth > 1 or self.memory_budget is None or self.low_memory:
+                raise
+            retry = True
+        finally:
+            self._depth -= 1
+
+        if retry:
+            self._results.clear()
+            self.low_memory = True
+            return self.run(stage)
+
+        self._results[stage] = result
+        return result
+
+    def seed(self, stage, result):
+        """
+        Supply a stage result computed elsewhere (e.g. a cached
+        segmentation shared between frameworks). Downstream stages are
+        invalidated so they are computed from it.
+        """
+        self.invalidate(stage)
+        self._results[stage] = result
+
+    def invalidate(self, stage="ingestion"):
+        """
+        Drop the memoized result of a stage and every stage after it.
+        """
+        for name in self.STAGES[self.STAGES.index(stage):]:
+            self._results.pop(name, None)
+
+    def rerun(self, stage):
+        """
+        Recompute one stage (and its downstream) from cached upstream results.
+        """
+        self.invalidate(stage)
+        return self.run(stage)
+
+    def _report(self, stage, **counts):
+        if self.progress is not None:
+            self.progress(stage, **counts)
+
+    def _stage_progress(self, stage):
+        return lambda **counts: self._report(stage, **counts)
+
+    def _run_ingestion(self):
+        # Sources are not loaded here: segmentation streams their blocks
+        if self.text is not None:
+            return IngestionResult(source=self.source, text=self.text)
+        return IngestionResult(
+            source=self.source, text=None, encoding=policy_encoding(self.source)
+        )
+
+    def _run_segmentation(self):
+        self.run("ingestion")
+        self._report("segmentation")
+        preview = []
+        vocabulary = DocumentVocabulary()
+
+        if not self.low_memory:
+            # Hierarchical matching reuses the section summaries built here
+            outline = SectionOutline(index_words=self.hierarchical)
+            return SegmentationResult(
+                segments=segment_blocks(
+                    self._iter_source_blocks(True, preview), outline,
+                    self.run("ingestion").encoding, vocabulary
+                ),
+                sections=outline.sections,
+                preview="\n".join(preview)[:PREVIEW_CHARS],
+                vocabulary=vocabulary,
+                word_sections=outline.word_sections
+            )
+
+        # Only ids, sections and byte offsets are kept; matching streams
+        # the text again and attaches it to the segments it selects
+        outline = SectionOutline()
+        with stage_timer("segmentation"):
+            segments = [
+                {
+                    "id": segment["id"],
+                    "section": segment["section"],
+                    "byte_start": segment["byte_start"],
+                    "byte_end": segment["byte_end"]
+                }
+                for segment in iter_segments(
+                    self._iter_source_blocks(True, preview),
+                    self.run("ingestion").encoding, outline
+                )
+            ]
+            return SegmentationResult(
+                segments=segments, sections=outline.sections,
+                preview="\n".join(preview)[:PREVIEW_CHARS],
+                vocabulary=vocabulary
+            )
+
+    def _iter_source_blocks(self, progress=False, preview=None):
+        text = self.run("ingestion").text
+        if text is not None:
+            blocks = [text]
+        else:
+            blocks = iter_policy_blocks(
+                self.source, workers=self.pdf_workers,
+                progress=self._stage_progress("segmentation") if progress else None
+            )
+        if preview is None:
+            return blocks
+        return _preview_blocks(blocks, preview)
+
+    def _iter_source_segments(self, outline=None, progress=False):
+        return iter_segments(
+            self._iter_source_blocks(progress), self.run("ingestion").encoding, outline
+        )
+
+    def _run_matching(self):
+        segmentation = self.run("segmentation")
+        segments = segmentation.segments
+        if segmentation.vocabulary is not None:
+            # Catalogs loaded since segmentation may have interned segment words
+            segmentation.vocabulary.refresh(segments)
+        self._report("matching", clauses=len(self.clauses))
+        if self.low_memory:
+            segments = self._iter_source_segments(SectionOutline())
+
+        evidence = None
+        if self.method == "keyword" and self.hierarchical and not self.low_memory:
+            # Low-memory mode streams instead; stream matching needs no segment list
+            matches, evidence = hierarchical_keyword_matches(
+                self.clauses, segments, self.library.automaton, self.evidence_k,
+                segmentation.word_sections
+            )
+            self._report("matching", segments=len(segments), clauses_matched=sum(
+                match["best_segment_id"] is not None for match in matches
+            ))
+        elif self.method == "keyword" and self.evidence_k:
+            evidence = stream_top_matches(
+                self.clauses, segments, self.evidence_k, self.library.automaton
+            )
+            matches = [evidence_to_match(record) for record in evidence]
+            self._report("matching", clauses_matched=sum(
+                match["best_segment_id"] is not None for match in matches
+            ))
+        elif self.method == "keyword":
+            matches = stream_best_matches(
+                self.clauses, segments, self.library.automaton,
+                progress=self._stage_progress("matching")
+            )
+        else:
+            from nlp.scoring import build_score_matrix
+
+            # Score matrices need every segment at once, even in low-memory mode
+            segments = list(segments)
+            if self.hierarchical:
+                score_matrix = hierarchical_score_matrix(
+                    self.clauses, segments, self.method,
+                    None if self.low_memory else segmentation.word_sections,
+                    **self._score_options()
+                )
+            else:
+                score_matrix = build_score_matrix(
+                    self.clauses, segments, self.method, **self._score_options()
+                )
+            with stage_timer("matching"):
+                if self.evidence_k:
+                    evidence = [
+                        find_top_segments(clause, segments, self.evidence_k, scores=scores)
+                        for clause, scores in zip(self.clauses, score_matrix)
+                    ]
+                    matches = [evidence_to_match(record) for record in evidence]
+                else:
+                    matches = [
+                        find_best_segment_match(clause, segments, scores=scores)
+                        for clause, scores in zip(self.clauses, score_matrix)
+                    ]
+            self._report("matching", segments=len(segments), clauses_matched=sum(
+                match["best_segment_id"] is not None for match in matches
+            ))
+
+        if self.low_memory:
+            matched_text = {
+                match["best_segment_id"]: match["best_segment_text"]
+                for match in matches
+                if match["best_segment_id"] is not None
+            }
+            for segment in segmentation.segments:
+                if segment["id"] in matched_text:
+                    segment["text"] = matched_text[segment["id"]]
+                    segment["normalized"], segment["tokens"] = tokenize(
+                        segment["text"], segmentation.vocabulary
+                    )
+
+        return MatchingResult(method=self.method, matches=matches, evidence=evidence)
+
+    def _score_options(self):
+        options = dict(self.scoring_options)
+        if self.method != "embedding":
+            return options
+
+        # Clause vectors come precomputed with the library, unless another
+        # embedding model was asked for
+        options.setdefault("backend", self.library.backend)
+        if options["backend"] is not None and options["backend"].model_id == self.library.model_id:
+            options.setdefault("clause_vectors", self.library.clause_vectors)
+        if self.vector_cache_dir is not None:
+            options.setdefault("cache", shared_vector_cache(self.vector_cache_dir))
+        return options
+
+    # Report stages resolve their inputs before starting the timer, so
+    # each stage's recorded time excludes the stages it depends on
+
+    def _run_gap_report(self):
+        segments = self.run("segmentation").segments
+        matching = self.run("matching")
+
+        self._report("gap_report")
+        with stage_timer("gap_report"):
+            return GapReportResult(entries=generate_gap_report(
+                self.clauses, segments, matches=matching.matches,
+                columnar=self.columnar, evidence=matching.evidence
+            ))
+
+    def _run_suggestions(self):
+        gap_report = self.run("gap_report").entries
+
+        self._report("suggestions")
+        with stage_timer("suggestions"):
+            return SuggestionsResult(suggestions=generate_policy_suggestions(
+                gap_report, self.generator, self.generation_cache, self.generation_context
+            ))
+
+    def _run_roadmap(self):
+        gap_report = self.run("gap_report").entries
+
+        self._report("roadmap")
+        with stage_timer("roadmap"):
+            return RoadmapResult(items=generate_improvement_roadmap(gap_report))
+
+    def _run_final_report(self):
+        gap_report = self.run("gap_report").entries
+        suggestions = self.run("suggestions").suggestions
+        roadmap = self.run("roadmap").items
+
+        self._report("final_report")
+        with stage_timer("final_report"):
+            if self.columnar:
+                analysis_results = gap_report
+            else:
+                # Suggestions and roadmap items are produced in gap report order
+                analysis_results = [
+                    {
+                        **entry,
+                        "suggestion": suggestion["suggestion"],
+                        "priority": item["priority"]
+                    }
+                    for entry, suggestion, item in zip(gap_report, suggestions, roadmap)
+                ]
+
+            return FinalReportResult(
+                analysis_results=analysis_results,
+                report=generate_compliance_report(analysis_results)
+            )
+
+
+def _preview_blocks(blocks, preview):
+    """
+    Pass blocks through, collecting the leading ones into preview until
+    they hold PREVIEW_CHARS characters, so the preview costs no extra read.
+    """
+    length = 0
+    for block in blocks:
+        if length < PREVIEW_CHARS:
+            preview.append(block)
+            length += len(block)
+        yield block
+
+
+def analyze_frameworks(libraries, source=None, text=None, stage="final_report", **options):
+    """
+    Run one document against several clause libraries, e.g.
+    {"NIST": nist_library, "CIS Controls v8": cis_library}.
+
+    The document is ingested and segmented once; every framework's
+    pipeline is seeded with those results. options are passed on to
+    AnalysisPipeline, with each framework's name added to the generation
+    context. Returns {name: result of stage}.
+    """
+    results = {}
+    shared = None
+
+    for name, library in libraries.items():
+        context = {**(options.get("generation_context") or {}), "framework": name}
+        pipeline = AnalysisPipeline(library, source=source, text=text, **{
+            **options, "generation_context": context
+        })
+
+        if shared is None:
+            shared = pipeline
+            pipeline.run("segmentation")
+        else:
+            pipeline.low_memory = shared.low_memory
+            pipeline.seed("ingestion", shared.run("ingestion"))
+            pipeline.seed("segmentation", shared.run("segmentation"))
+
+        results[name] = pipeline.run(stage)
+
+    return results
+
+
+def analysis_version(method="keyword", evidence_k=0, hierarchical=False,
+                     scoring_options=None):
+    """
+    ANALYSIS_VERSION qualified with the matching options of an
+    AnalysisPipeline, so stored analyses are only reused for the same
+    method, evidence and hierarchical settings.
+    """
+    version = f"{ANALYSIS_VERSION}.{method}.evidence-{evidence_k}"
+    if hierarchical:
+        version += ".hierarchical"
+    if scoring_options:
+        version += "." + json.dumps(scoring_options, sort_keys=True, default=str)
+    return version
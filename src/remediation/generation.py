@@ -0,0 +1,233 @@
+from abc import ABC, abstractmethod
+import hashlib
+import os
+import threading
+
+from instrumentation.metrics import increment, stage_timer
+from nlp.vector_cache import VectorCache
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "generations")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # 64 MB
+DEFAULT_MAX_TOKENS = 256
+# Part of every memo key; bump it whenever the prompts change
+PROMPT_VERSION = 1
+
+PROMPT_PREFIX = (
+    "You are a cybersecurity policy analyst working fully offline.\n"
+    "Framework: {framework}\n"
+    "Policy document: {policy}\n"
+    "For each finding below, write one concise recommendation (at most three "
+    "sentences) for how the organization should change its policy to meet the "
+    "requirement. Do not repeat the finding.\n\n"
+)
+
+PROMPT_TEMPLATE = (
+    "Finding: {clause_id} {title} ({category}, {severity} severity)\n"
+    "Coverage: {coverage}\n"
+    "Closest policy text: {matched_text}\n"
+    "Recommendation:"
+)
+
+
+class GenerationBackend(ABC):
+    """
+    Interface for local text generation models.
+
+    Subclasses set model_id (which keys the generation cache, so it must
+    change whenever the model's output would) and implement generate()
+    for a batch of requests sharing one prompt prefix.
+    """
+
+    model_id = None
+
+    @abstractmethod
+    def generate(self, prefix, requests):
+        """
+        Return one generated text per request. Each request is a dict with
+        the finding ("clause_id", "title", "coverage", ...) and its
+        rendered "prompt", to be appended to prefix.
+        """
+
+
+class TemplateBackend(GenerationBackend):
+    """
+    Deterministic offline stand-in that renders the fixed suggestion
+    templates, so the generation path can run without a model.
+    """
+
+    model_id = "suggestion-templates-1"
+
+    def generate(self, prefix, requests):
+        from remediation.policy_suggestions import render_suggestion
+
+        return [
+            render_suggestion(request["coverage"], request["title"])
+            for request in requests
+        ]
+
+
+class LlamaCppBackend(GenerationBackend):
+    """
+    Local CPU inference on a GGUF model through llama-cpp-python.
+
+    The model is loaded once per backend. llama-cpp-python decodes one
+    sequence at a time, so the requests of a batch are not decoded
+    together: they run back to back in one context. Before each prompt
+    is evaluated, llama-cpp-python keeps the tokens its context shares
+    with the previous prompt. Every prompt starts with the batch's
+    shared prefix, so the prefix is evaluated once per batch and each
+    request only pays for its own finding and output. Decoding is greedy
+    (temperature 0), which makes outputs reproducible and safe to memoize.
+    A llama.cpp context is not thread-safe, so batches run one at a time.
+    """
+
+    def __init__(self, model_path, n_ctx=4096, n_threads=None,
+                 max_tokens=DEFAULT_MAX_TOKENS):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Generation model file not found: {model_path}")
+
+        try:
+            from llama_cpp import Llama
+        except ImportError as error:
+            raise ImportError(
+                "LlamaCppBackend requires llama-cpp-python (pip install llama-cpp-python)"
+            ) from error
+
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+        self.model = Llama(
+            model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, verbose=False
+        )
+
+        # GGUF metadata sits at the start of the file; hashing all of a
+        # multi-gigabyte model on every start would dominate small runs
+        digest = hashlib.sha256()
+        digest.update(str(os.path.getsize(model_path)).encode("utf-8"))
+        with open(model_path, "rb") as file:
+            digest.update(file.read(1024 * 1024))
+        self.model_id = f"llama-cpp-{digest.hexdigest()[:16]}-{max_tokens}"
+
+    def generate(self, prefix, requests):
+        texts = []
+        with self._lock:
+            for request in requests:
+                completion = self.model.create_completion(
+                    prefix + request["prompt"],
+                    max_tokens=self.max_tokens,
+                    temperature=0.0,
+                    stop=["\nFinding:"]
+                )
+                texts.append(completion["choices"][0]["text"].strip())
+        return texts
+
+
+class GenerationCache(VectorCache):
+    """
+    On-disk memo of generated texts, with the same content-addressed
+    layout and LRU size budget as nlp.vector_cache.VectorCache.
+    """
+
+    suffix = ".txt"
+    metric = "generation_cache"
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        super().__init__(cache_dir, max_bytes)
+
+    def _read(self, path):
+        with open(path, "r", encoding="utf-8") as file:
+            return file.read()
+
+    def _write(self, file, text):
+        file.write(text.encode("utf-8"))
+
+
+def load_generation_backend(spec):
+    """
+    Backend for a command-line style spec: None, "template", or the
+    path of a GGUF model file.
+    """
+    if spec is None:
+        return None
+    if spec == "template":
+        return TemplateBackend()
+    return LlamaCppBackend(spec)
+
+
+def build_prompt_prefix(context=None):
+    """
+    Prompt prefix shared by every finding of a report.
+    """
+    context = context or {}
+    return PROMPT_PREFIX.format(
+        framework=context.get("framework") or "NIST Cybersecurity Framework",
+        policy=context.get("policy") or "unnamed policy"
+    )
+
+
+def build_request(item):
+    """
+    Generation request for one gap report entry.
+    """
+    matched_text = item.get("matched_segment_text")
+    request = {
+        "clause_id": item["clause_id"],
+        "title": item["title"],
+        "coverage": item["coverage"]
+    }
+    request["prompt"] = PROMPT_TEMPLATE.format(
+        clause_id=item["clause_id"],
+        title=item["title"],
+        category=item.get("nist_category", ""),
+        severity=item.get("severity", ""),
+        coverage=item["coverage"],
+        matched_text=" ".join((matched_text or "none").split())
+    )
+    return request
+
+
+def memo_key(request, prefix):
+    """
+    Cache key text of a request behind a prompt prefix; combined with the
+    model id by the cache. Both the prefix and the rendered prompt are
+    hashed whole, so every field the backend sees is part of the key.
+    """
+    return "\0".join([
+        str(PROMPT_VERSION),
+        hashlib.sha1(prefix.encode("utf-8")).hexdigest(),
+        hashlib.sha1(request["prompt"].encode("utf-8")).hexdigest()
+    ])
+
+
+def generate_remediations(items, backend, cache=None, context=None):
+    """
+    Generated recommendation text for each gap report entry, in order.
+
+    Cached texts are reused; all misses go to the backend as one batch
+    behind a single shared prefix, and are then stored in the cache.
+    """
+    prefix = build_prompt_prefix(context)
+    requests = [build_request(item) for item in items]
+    texts = [None] * len(requests)
+    missing = []
+
+    for position, request in enumerate(requests):
+        text = (
+            cache.get(backend.model_id, memo_key(request, prefix))
+            if cache is not None else None
+        )
+        if text is None:
+            missing.append(position)
+        else:
+            texts[position] = text
+
+    if missing:
+        with stage_timer("generation"):
+            generated = backend.generate(prefix, [requests[i] for i in missing])
+        increment("generated_suggestions", len(missing))
+
+        for position, text in zip(missing, generated):
+            texts[position] = text
+            if cache is not None:
+                cache.put(backend.model_id, memo_key(requests[position], prefix), text)
+
+    return texts
@@ -1,29 +1,70 @@
-def generate_policy_suggestions(gap_report):
+from remediation.generation import generate_remediations
+from reporting.columnar import ColumnarReport, COVERAGE_LEVELS
+
+SUGGESTION_TEMPLATES = {
+    "Missing": (
+        "Add a policy statement that addresses the following requirement: "
+        "{title}. The policy should clearly define responsibilities, "
+        "processes, and enforcement mechanisms."
+    ),
+    "Partial": (
+        "Enhance the existing policy section related to {title} by "
+        "providing more detailed guidance, roles, and implementation procedures "
+        "to fully meet the requirement."
+    ),
+    "Covered": "No changes required. Existing policy sufficiently addresses this requirement."
+}
+
+
+def render_suggestion(coverage, title):
     """
-    Generate policy improvement suggestions based on gap report.
+    Suggestion text for a clause with the given coverage.
     """
+    template = SUGGESTION_TEMPLATES.get(coverage, SUGGESTION_TEMPLATES["Covered"])
+    return template.format(title=title)
 
-    suggestions = []
 
-    for item in gap_report:
-        coverage = item["coverage"]
+def generate_policy_suggestions(gap_report, backend=None, cache=None, context=None):
+    """
+    Generate policy improvement suggestions based on gap report.
 
-        if coverage == "Missing":
-            suggestion = (
-                f"Add a policy statement that addresses the following requirement: "
-                f"{item['title']}. The policy should clearly define responsibilities, "
-                f"processes, and enforcement mechanisms."
-            )
+    With a generation backend (see remediation.generation), suggestions
+    for clauses that are not covered are generated in one batch, reusing
+    texts memoized in cache; context ({"framework", "policy"}) fills the
+    shared prompt prefix. Otherwise they are rendered from templates.
+
+    A ColumnarReport is annotated in place with a suggestion column of
+    template codes (rendered on demand) and returned.
+    """
 
-        elif coverage == "Partial":
-            suggestion = (
-                f"Enhance the existing policy section related to {item['title']} by "
-                f"providing more detailed guidance, roles, and implementation procedures "
-                f"to fully meet the requirement."
+    if isinstance(gap_report, ColumnarReport):
+        if backend is not None:
+            rows = (gap_report.coverage != COVERAGE_LEVELS.index("Covered")).nonzero()[0]
+            texts = generate_remediations(
+                [gap_report.record(row) for row in rows], backend, cache, context
             )
+            gap_report.generated = [None] * len(gap_report.clauses)
+            for row, text in zip(rows, texts):
+                gap_report.generated[gap_report.clause_index[row]] = text
+
+        # Templates are keyed by coverage, so the coverage codes double as suggestion codes
+        gap_report.suggestion = gap_report.coverage.copy()
+        return gap_report
 
-        else:  # Covered
-            suggestion = "No changes required. Existing policy sufficiently addresses this requirement."
+    generated = [None] * len(gap_report)
+    if backend is not None:
+        positions = [i for i, item in enumerate(gap_report) if item["coverage"] != "Covered"]
+        texts = generate_remediations(
+            [gap_report[i] for i in positions], backend, cache, context
+        )
+        for position, text in zip(positions, texts):
+            generated[position] = text
+
+    suggestions = []
+
+    for item, text in zip(gap_report, generated):
+        coverage = item["coverage"]
+        suggestion = text or render_suggestion(coverage, item["title"])
 
         suggestions.append({
             "clause_id": item["clause_id"],
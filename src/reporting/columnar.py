@@ -0,0 +1,205 @@
+import numpy as np
+
+COVERAGE_LEVELS = ("Missing", "Partial", "Covered")
+PRIORITY_LEVELS = ("Immediate", "Short-Term", "Long-Term", "No Action")
+UNSET = -1
+
+
+def code_dtype(n_levels):
+    """
+    Smallest signed integer dtype holding codes for n_levels levels,
+    with room for UNSET.
+    """
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_levels <= np.iinfo(dtype).max + 1:
+            return dtype
+    return np.int64
+
+
+def encode_categorical(values, levels=()):
+    """
+    Encode strings as integer codes, int8 unless there are more levels
+    than it can hold. Returns (codes, levels); values not already in
+    levels are appended to it in order of appearance.
+    """
+    index = {level: code for code, level in enumerate(levels)}
+    codes = np.empty(len(values), dtype=np.int64)
+
+    for row, value in enumerate(values):
+        codes[row] = index.setdefault(value, len(index))
+
+    return codes.astype(code_dtype(len(index))), tuple(index)
+
+
+class ColumnarReport:
+    """
+    Column-oriented gap analysis result for one document.
+
+    Rows are clauses. Text is never copied into the report: clause fields
+    come from the shared clause list through clause_index, matched text
+    from the document's segment list through segment_index, and the
+    repeated labels (coverage, severity, NIST function, priority) are
+    stored as small integer codes into category tuples.
+
+    Suggestion and priority columns stay UNSET until the remediation and
+    roadmap stages fill them in. evidence, when present, holds one
+    nlp.evidence record per clause and is also read through clause_index,
+    as does generated, the model-written suggestion texts (None where the
+    template applies).
+    """
+
+    def __init__(self, clauses, segments, clause_index, match_score,
+                 segment_index, coverage, severity, severity_levels,
+                 function, function_levels, suggestion=None, priority=None,
+                 evidence=None, generated=None):
+        self.clauses = clauses
+        self.segments = segments
+        self.clause_index = clause_index
+        self.match_score = match_score
+        self.segment_index = segment_index
+        self.coverage = coverage
+        self.severity = severity
+        self.severity_levels = severity_levels
+        self.function = function
+        self.function_levels = function_levels
+        self.suggestion = suggestion
+        self.priority = priority
+        self.evidence = evidence
+        self.generated = generated
+
+    def __len__(self):
+        return len(self.clause_index)
+
+    @classmethod
+    def from_matches(cls, clauses, segments, matches, evidence=None):
+        """
+        Build the gap report columns from one match per clause.
+        segments must be the full segment list the matches refer to.
+        """
+        position = {segment["id"]: i for i, segment in enumerate(segments)}
+        severity, severity_levels = encode_categorical(
+            [clause["severity"] for clause in clauses]
+        )
+        function, function_levels = encode_categorical(
+            [clause["nist_function"] for clause in clauses]
+        )
+
+        match_score = np.fromiter(
+            (match["best_score"] for match in matches),
+            dtype=np.float32, count=len(clauses)
+        )
+        segment_index = np.fromiter(
+            (position.get(match["best_segment_id"], UNSET) for match in matches),
+            dtype=np.int32, count=len(clauses)
+        )
+
+        # Same thresholds as nlp.matching.classify_coverage
+        coverage = np.select(
+            [match_score == 0.0, match_score < 0.5], [0, 1], default=2
+        ).astype(np.int8)
+
+        return cls(
+            clauses=clauses,
+            segments=segments,
+            clause_index=np.arange(len(clauses), dtype=np.int32),
+            match_score=match_score,
+            segment_index=segment_index,
+            coverage=coverage,
+            severity=severity,
+            severity_levels=severity_levels,
+            function=function,
+            function_levels=function_levels,
+            evidence=evidence
+        )
+
+    def take(self, rows):
+        """
+        Subset of rows (index array or boolean mask) sharing the same
+        clause and segment lists.
+        """
+        def pick(column):
+            return None if column is None else column[rows]
+
+        return ColumnarReport(
+            clauses=self.clauses,
+            segments=self.segments,
+            clause_index=self.clause_index[rows],
+            match_score=self.match_score[rows],
+            segment_index=self.segment_index[rows],
+            coverage=self.coverage[rows],
+            severity=self.severity[rows],
+            severity_levels=self.severity_levels,
+            function=self.function[rows],
+            function_levels=self.function_levels,
+            suggestion=pick(self.suggestion),
+            priority=pick(self.priority),
+            evidence=self.evidence,
+            generated=self.generated
+        )
+
+    def coverage_counts(self):
+        """
+        Number of rows per coverage level, keyed by level name.
+        """
+        counts = np.bincount(self.coverage, minlength=len(COVERAGE_LEVELS))
+        return dict(zip(COVERAGE_LEVELS, counts.tolist()))
+
+    def clause(self, row):
+        return self.clauses[self.clause_index[row]]
+
+    def segment_text(self, row):
+        index = self.segment_index[row]
+        return self.segments[index]["text"] if index != UNSET else None
+
+    def suggestion_text(self, row):
+        """
+        Generated suggestion of a row, or its template rendered from
+        the template code.
+        """
+        from remediation.policy_suggestions import render_suggestion
+
+        if self.suggestion is None or self.suggestion[row] == UNSET:
+            return None
+        if self.generated is not None and self.generated[self.clause_index[row]]:
+            return self.generated[self.clause_index[row]]
+        return render_suggestion(
+            COVERAGE_LEVELS[self.suggestion[row]], self.clause(row)["title"]
+        )
+
+    def record(self, row):
+        """
+        One row as a gap report dict, for display and export.
+        """
+        clause = self.clause(row)
+        index = self.segment_index[row]
+
+        record = {
+            "clause_id": clause["clause_id"],
+            "title": clause["title"],
+            "nist_function": self.function_levels[self.function[row]],
+            "nist_category": clause["nist_category"],
+            "severity": self.severity_levels[self.severity[row]],
+            "coverage": COVERAGE_LEVELS[self.coverage[row]],
+            "match_score": round(float(self.match_score[row]), 2),
+            "matched_segment_id": self.segments[index]["id"] if index != UNSET else None,
+            "matched_segment_text": self.segment_text(row)
+        }
+
+        if self.evidence is not None:
+            evidence = self.evidence[self.clause_index[row]]
+            record["matched_text"] = [segment["segment_text"] for segment in evidence["segments"]]
+            record["evidence"] = evidence["segments"]
+            record["evidence_coverage"] = round(evidence["combined_score"], 2)
+        if self.suggestion is not None:
+            record["suggestion"] = self.suggestion_text(row)
+        if self.priority is not None and self.priority[row] != UNSET:
+            record["priority"] = PRIORITY_LEVELS[self.priority[row]]
+
+        return record
+
+    def iter_records(self):
+        """
+        Lazily yield rows as dicts.
+        """
+        for row in range(len(self)):
+            yield self.record(row)
@@ -0,0 +1,337 @@
+from abc import ABC, abstractmethod
+import csv
+import importlib.util
+import io
+import json
+import os
+
+from reporting.columnar import ColumnarReport
+from reporting.final_report import iter_roadmap
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+MIME_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet"
+}
+BUFFER_SIZE = 1024 * 1024  # bytes
+DEFAULT_ROW_GROUP_SIZE = 64 * 1024  # rows
+DEFAULT_COMPRESSION = "zstd"
+
+# Table name -> (column, type) pairs; types are "string", "float", "int"
+# or "list" (of strings)
+TABLES = {
+    "findings": (
+        ("document", "string"),
+        ("clause_id", "string"),
+        ("title", "string"),
+        ("nist_function", "string"),
+        ("nist_category", "string"),
+        ("severity", "string"),
+        ("coverage", "string"),
+        ("match_score", "float"),
+        ("priority", "string"),
+        ("evidence_coverage", "float"),
+        ("matched_text", "list"),
+        ("suggestion", "string")
+    ),
+    "roadmap": (
+        ("document", "string"),
+        ("clause_id", "string"),
+        ("priority", "string"),
+        ("action", "string")
+    ),
+    "statistics": (
+        ("document", "string"),
+        ("total_clauses", "int"),
+        ("covered", "int"),
+        ("partial", "int"),
+        ("missing", "int"),
+        ("coverage_percentage", "float"),
+        ("overall_posture", "string"),
+        ("key_risks", "int")
+    )
+}
+
+
+def available_formats():
+    """
+    Export formats usable here; Parquet needs pyarrow.
+    """
+    if importlib.util.find_spec("pyarrow") is None:
+        return tuple(name for name in EXPORT_FORMATS if name != "parquet")
+    return EXPORT_FORMATS
+
+
+def iter_finding_rows(analysis_results, document=None):
+    """
+    Lazily yield one findings row per gap report entry.
+    """
+    records = (
+        analysis_results.iter_records()
+        if isinstance(analysis_results, ColumnarReport) else analysis_results
+    )
+
+    for entry in records:
+        matched_text = entry.get("matched_text")
+        if matched_text is None:
+            matched_text = [entry["matched_segment_text"]] if entry.get("matched_segment_text") else []
+
+        yield {
+            "document": document,
+            "clause_id": entry["clause_id"],
+            "title": entry["title"],
+            "nist_function": entry.get("nist_function"),
+            "nist_category": entry.get("nist_category"),
+            "severity": entry.get("severity"),
+            "coverage": entry["coverage"],
+            "match_score": entry.get("match_score"),
+            "priority": entry.get("priority"),
+            "evidence_coverage": entry.get("evidence_coverage"),
+            "matched_text": matched_text,
+            "suggestion": entry.get("suggestion")
+        }
+
+
+def iter_roadmap_rows(analysis_results, document=None):
+    """
+    Lazily yield one roadmap row per clause that is not covered.
+    """
+    for item in iter_roadmap(analysis_results):
+        yield {"document": document, **item}
+
+
+def statistics_row(report, document=None):
+    """
+    The statistics and summary of a compliance report as one row.
+    """
+    return {"document": document, **report["statistics"], **report["summary"]}
+
+
+class ExportWriter(ABC):
+    """
+    Writes the rows of one table to a binary file object, in batches.
+
+    close() flushes everything written but leaves the file object open,
+    so it can be handed on (e.g. to a download) or closed by its owner.
+    """
+
+    def __init__(self, sink, table):
+        self.sink = sink
+        self.table = table
+        self.columns = [name for name, _ in TABLES[table]]
+        self.rows = 0
+
+    @abstractmethod
+    def write(self, rows):
+        """
+        Write an iterable of row dicts; missing columns are left empty.
+        Returns the number of rows written.
+        """
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _TextExportWriter(ExportWriter):
+    def __init__(self, sink, table):
+        super().__init__(sink, table)
+        self._text = io.TextIOWrapper(sink, encoding="utf-8", newline="")
+
+    def close(self):
+        self._text.flush()
+        # Keep the sink open for its owner
+        self._text.detach()
+
+
+class CsvExportWriter(_TextExportWriter):
+    """
+    CSV with a header row; lists are joined with newlines.
+    """
+
+    def __init__(self, sink, table):
+        super().__init__(sink, table)
+        self._writer = csv.writer(self._text)
+        self._writer.writerow(self.columns)
+
+    def write(self, rows):
+        count = 0
+        for row in rows:
+            self._writer.writerow([
+                "\n".join(value) if isinstance(value, list) else "" if value is None else value
+                for value in (row.get(column) for column in self.columns)
+            ])
+            count += 1
+        self.rows += count
+        return count
+
+
+class JsonlExportWriter(_TextExportWriter):
+    """
+    One JSON object per line, with the table's columns in order.
+    """
+
+    def write(self, rows):
+        count = 0
+        for row in rows:
+            self._text.write(json.dumps(
+                {column: row.get(column) for column in self.columns}, ensure_ascii=False
+            ))
+            self._text.write("\n")
+            count += 1
+        self.rows += count
+        return count
+
+
+class ParquetExportWriter(ExportWriter):
+    """
+    Compressed Parquet through pyarrow. Rows are buffered per column and
+    written out as a row group every row_group_size rows, so memory is
+    bounded by one row group however many documents are exported.
+    """
+
+    def __init__(self, sink, table, row_group_size=DEFAULT_ROW_GROUP_SIZE,
+                 compression=DEFAULT_COMPRESSION):
+        super().__init__(sink, table)
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {
+            "string": pa.string(),
+            "float": pa.float64(),
+            "int": pa.int64(),
+            "list": pa.list_(pa.string())
+        }
+        self._pa = pa
+        self.schema = pa.schema([(name, types[kind]) for name, kind in TABLES[table]])
+        self.row_group_size = row_group_size
+        self._writer = pq.ParquetWriter(sink, self.schema, compression=compression)
+        self._buffer = {column: [] for column in self.columns}
+        self._buffered = 0
+
+    def write(self, rows):
+        count = 0
+        for row in rows:
+            for column in self.columns:
+                self._buffer[column].append(row.get(column))
+            self._buffered += 1
+            count += 1
+            if self._buffered >= self.row_group_size:
+                self._flush()
+        self.rows += count
+        return count
+
+    def _flush(self):
+        if self._buffered:
+            self._writer.write_table(
+                self._pa.Table.from_pydict(self._buffer, schema=self.schema),
+                row_group_size=self.row_group_size
+            )
+            self._buffer = {column: [] for column in self.columns}
+            self._buffered = 0
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+WRITERS = {
+    "csv": CsvExportWriter,
+    "jsonl": JsonlExportWriter,
+    "parquet": ParquetExportWriter
+}
+
+
+def check_format(format):
+    """
+    Raise before any file is created if a format cannot be written here.
+    """
+    if format not in WRITERS:
+        raise ValueError(
+            f"Unknown export format: {format}. Use one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    if format not in available_formats():
+        raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+
+
+def open_writer(sink, table, format="csv", **options):
+    """
+    ExportWriter of a format for one table. options (row_group_size,
+    compression) apply to Parquet.
+    """
+    check_format(format)
+    if format == "parquet":
+        return ParquetExportWriter(sink, table, **options)
+    return WRITERS[format](sink, table)
+
+
+def export_report(sink, analysis_results, format="csv", document=None, **options):
+    """
+    Stream the findings of one analysis to a binary file object.
+    Returns the number of rows written.
+    """
+    with open_writer(sink, "findings", format, **options) as writer:
+        return writer.write(iter_finding_rows(analysis_results, document))
+
+
+class ReportExporter:
+    """
+    Findings, roadmap items and statistics of many documents, written to
+    one file per table (findings.csv, roadmap.csv, statistics.csv, ...)
+    as each document is added, so a batch never holds more than the
+    document at hand.
+    """
+
+    def __init__(self, output_dir, format="csv", **options):
+        check_format(format)
+        os.makedirs(output_dir, exist_ok=True)
+        self.paths = {
+            table: os.path.join(output_dir, f"{table}.{format}") for table in TABLES
+        }
+        self._files = {}
+        self._writers = {}
+        self._closed = False
+
+        try:
+            for table, path in self.paths.items():
+                self._files[table] = open(path, "wb", buffering=BUFFER_SIZE)
+                self._writers[table] = open_writer(self._files[table], table, format, **options)
+        except BaseException:
+            self.close()
+            raise
+
+    def add(self, document, analysis_results, report):
+        """
+        Write the rows of one analyzed document.
+        """
+        self._writers["findings"].write(iter_finding_rows(analysis_results, document))
+        self._writers["roadmap"].write(iter_roadmap_rows(analysis_results, document))
+        self._writers["statistics"].write([statistics_row(report, document)])
+
+    def rows(self):
+        """
+        Rows written so far, per table.
+        """
+        return {table: writer.rows for table, writer in self._writers.items()}
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for writer in self._writers.values():
+            writer.close()
+        for file in self._files.values():
+            file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,8 +1,17 @@
+from reporting.columnar import ColumnarReport, COVERAGE_LEVELS
+
+
 def generate_compliance_report(analysis_results):
     """
     Aggregate gap analysis results into a final compliance report.
+
+    For a ColumnarReport, statistics come from the coverage codes and
+    findings and roadmap are row subsets of it rather than dict lists.
     """
 
+    if isinstance(analysis_results, ColumnarReport):
+        return _columnar_compliance_report(analysis_results)
+
     report = {
         "summary": {},
         "statistics": {},
@@ -28,23 +37,75 @@ def generate_compliance_report(analysis_results):
         "key_risks": missing
     }
 
-    for result in analysis_results:
-        report["findings"].append({
+    report["findings"] = list(iter_findings(analysis_results))
+    report["roadmap"] = list(iter_roadmap(analysis_results))
+
+    return report
+
+
+def iter_findings(analysis_results):
+    """
+    Lazily yield the findings of a compliance report, one per clause.
+    """
+    records = (
+        analysis_results.iter_records()
+        if isinstance(analysis_results, ColumnarReport) else analysis_results
+    )
+
+    for result in records:
+        finding = {
             "clause_id": result["clause_id"],
             "coverage": result["coverage"],
             "severity": result["severity"],
             "matched_text": result.get("matched_text", []),
             "suggestion": result["suggestion"]
-        })
+        }
+        if "evidence_coverage" in result:
+            finding["evidence_coverage"] = result["evidence_coverage"]
+        yield finding
+
+
+def iter_roadmap(analysis_results):
+    """
+    Lazily yield the roadmap items of a compliance report, one per
+    clause that is not covered.
+    """
+    if isinstance(analysis_results, ColumnarReport):
+        analysis_results = analysis_results.take(
+            analysis_results.coverage != COVERAGE_LEVELS.index("Covered")
+        ).iter_records()
 
+    for result in analysis_results:
         if result["coverage"] != "Covered":
-            report["roadmap"].append({
+            yield {
                 "clause_id": result["clause_id"],
                 "priority": result["priority"],
                 "action": result["suggestion"]
-            })
+            }
 
-    return report
+
+def _columnar_compliance_report(analysis_results):
+    counts = analysis_results.coverage_counts()
+    total = len(analysis_results)
+    covered, partial, missing = counts["Covered"], counts["Partial"], counts["Missing"]
+
+    return {
+        "summary": {
+            "overall_posture": determine_posture(covered, partial, missing),
+            "key_risks": missing
+        },
+        "statistics": {
+            "total_clauses": total,
+            "covered": covered,
+            "partial": partial,
+            "missing": missing,
+            "coverage_percentage": round((covered / total) * 100, 2) if total else 0
+        },
+        "findings": analysis_results,
+        "roadmap": analysis_results.take(
+            analysis_results.coverage != COVERAGE_LEVELS.index("Covered")
+        )
+    }
 
 
 def determine_posture(covered, partial, missing):
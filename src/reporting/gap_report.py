@@ -1,27 +1,90 @@
-from nlp.matching import find_best_segment_match, classify_coverage
+from nlp.evidence import evidence_to_match, find_top_segments, stream_top_matches
+from nlp.matching import (
+    find_best_segment_match, stream_best_matches, classify_coverage
+)
+from reporting.columnar import ColumnarReport
 
 
-def generate_gap_report(clauses, policy_segments):
+def generate_gap_report(clauses, policy_segments, score_matrix=None,
+                        automaton=None, matches=None, columnar=False,
+                        evidence=None, evidence_k=0):
     """
     Generate structured gap analysis report.
+
+    score_matrix is an optional clause x segment similarity matrix
+    (see nlp.scoring.build_score_matrix). Without it, clauses are
+    scored by keyword overlap and policy_segments may be a lazy
+    iterator of segments. automaton is an optional precompiled keyword
+    automaton for the clauses. matches, one find_best_segment_match
+    result per clause, reuses matching that has already been done.
+
+    With columnar=True the report is returned as a ColumnarReport that
+    references the clause and segment lists instead of copying text.
+
+    evidence_k > 0 adds the k best segments of each clause and their
+    combined keyword coverage to the report (see nlp.evidence).
+    evidence, one evidence record per clause, reuses retrieval that has
+    already been done.
     """
 
     report = []
 
-    for clause in clauses:
-        match = find_best_segment_match(clause, policy_segments)
-        coverage = classify_coverage(match["best_score"])
-
-        report.append({
-            "clause_id": clause["clause_id"],
-            "title": clause["title"],
-            "nist_function": clause["nist_function"],
-            "nist_category": clause["nist_category"],
-            "severity": clause["severity"],
-            "coverage": coverage,
-            "match_score": round(match["best_score"], 2),
-            "matched_segment_id": match["best_segment_id"],
-            "matched_segment_text": match["best_segment_text"]
-        })
+    if evidence is None and evidence_k:
+        if score_matrix is not None:
+            evidence = [
+                find_top_segments(clause, policy_segments, evidence_k, scores=scores)
+                for clause, scores in zip(clauses, score_matrix)
+            ]
+        else:
+            evidence = stream_top_matches(clauses, policy_segments, evidence_k, automaton)
+
+    if matches is not None:
+        matches = list(matches)
+    elif score_matrix is not None:
+        matches = [
+            find_best_segment_match(clause, policy_segments, scores=scores)
+            for clause, scores in zip(clauses, score_matrix)
+        ]
+    elif evidence is not None:
+        matches = [evidence_to_match(record) for record in evidence]
+    else:
+        # Scan every segment once for the keywords of all clauses
+        matches = stream_best_matches(clauses, policy_segments, automaton)
+
+    if columnar:
+        return ColumnarReport.from_matches(
+            clauses, policy_segments, matches, evidence=evidence
+        )
+
+    for position, (clause, match) in enumerate(zip(clauses, matches)):
+        report.append(build_gap_entry(
+            clause, match, evidence[position] if evidence is not None else None
+        ))
 
     return report
+
+
+def build_gap_entry(clause, match, evidence=None):
+    """
+    Build one gap report entry from a clause and its best match, plus
+    its multi-segment evidence when given.
+    """
+
+    entry = {
+        "clause_id": clause["clause_id"],
+        "title": clause["title"],
+        "nist_function": clause["nist_function"],
+        "nist_category": clause["nist_category"],
+        "severity": clause["severity"],
+        "coverage": classify_coverage(match["best_score"]),
+        "match_score": round(match["best_score"], 2),
+        "matched_segment_id": match["best_segment_id"],
+        "matched_segment_text": match["best_segment_text"]
+    }
+
+    if evidence is not None:
+        entry["matched_text"] = [segment["segment_text"] for segment in evidence["segments"]]
+        entry["evidence"] = evidence["segments"]
+        entry["evidence_coverage"] = round(evidence["combined_score"], 2)
+
+    return entry
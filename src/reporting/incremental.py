@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+
+from instrumentation.metrics import increment
+from nlp.keyword_matcher import build_clause_automaton, scan_keywords
+from nlp.matching import MATCHER_VERSION, keyword_hit_score
+from reporting.gap_report import build_gap_entry
+
+STATE_VERSION = 2
+
+
+def segment_hash(segment):
+    """
+    Identity of a segment across policy versions: hash of its normalized text.
+    """
+    return hashlib.sha1(segment["normalized"].encode("utf-8")).hexdigest()
+
+
+def clause_fingerprint(clauses):
+    """
+    Hash of the clause ids and keywords a stored analysis was scored
+    with, and of the matcher version that scored it.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"matcher-{MATCHER_VERSION}\0".encode("utf-8"))
+    for clause in clauses:
+        digest.update(json.dumps(
+            [clause["clause_id"], clause["normalized_keywords"]]
+        ).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def empty_analysis_state(clauses):
+    """
+    State of a document with no segments; re-analysing against it
+    scores every segment, i.e. a full analysis.
+    """
+    return {
+        "version": STATE_VERSION,
+        "clause_fingerprint": clause_fingerprint(clauses),
+        "segment_hashes": [],
+        "clauses": {
+            clause["clause_id"]: {
+                "candidates": {},
+                "coverage": None,
+                "match_score": None,
+                "matched_segment_hash": None
+            }
+            for clause in clauses
+        }
+    }
+
+
+def incremental_gap_report(clauses, policy_segments, previous_state=None,
+                           automaton=None):
+    """
+    Re-analyse a new version of a policy against a stored analysis.
+
+    Segments are diffed by normalized-text hash. Only added or changed
+    segments are scanned for keywords, and only clauses with keyword
+    hits in them, or whose candidate segments were removed, are
+    rescored. Every clause keeps its scored candidate segments in the
+    state, so its best match can be re-selected without a rescan.
+
+    Returns (gap_report, delta, new_state). delta lists the clauses whose
+    coverage, score or matched segment text changed; segments that only
+    moved are not reported.
+    """
+    if (
+        previous_state is None
+        or previous_state.get("version") != STATE_VERSION
+        or previous_state["clause_fingerprint"] != clause_fingerprint(clauses)
+    ):
+        previous_state = empty_analysis_state(clauses)
+
+    if automaton is None:
+        automaton = build_clause_automaton(clauses)
+
+    hashes = [segment_hash(segment) for segment in policy_segments]
+
+    # First occurrence wins ties, as in find_best_segment_match
+    first_position = {}
+    for position, digest in enumerate(hashes):
+        first_position.setdefault(digest, position)
+
+    old_hashes = set(previous_state["segment_hashes"])
+    added = [digest for digest in first_position if digest not in old_hashes]
+    removed = old_hashes.difference(first_position)
+    increment("incremental_segments_added", len(added))
+    increment("incremental_segments_removed", len(removed))
+
+    keyword_clauses = {}
+    for clause in clauses:
+        for kw in set(clause["normalized_keywords"]):
+            keyword_clauses.setdefault(kw, []).append(clause["clause_id"])
+
+    clause_states = {
+        clause_id: {**entry, "candidates": dict(entry["candidates"])}
+        for clause_id, entry in previous_state["clauses"].items()
+    }
+    clause_map = {clause["clause_id"]: clause for clause in clauses}
+
+    if removed:
+        for entry in clause_states.values():
+            for digest in removed.intersection(entry["candidates"]):
+                del entry["candidates"][digest]
+
+    for digest in added:
+        segment = policy_segments[first_position[digest]]
+        hits = scan_keywords(automaton, segment["tokens"])
+        for clause_id in {cid for kw in hits for cid in keyword_clauses[kw]}:
+            score = keyword_hit_score(
+                clause_map[clause_id]["normalized_keywords"], hits
+            )
+            if score > 0:
+                clause_states[clause_id]["candidates"][digest] = score
+
+    report = []
+    delta = []
+
+    for clause in clauses:
+        entry = clause_states[clause["clause_id"]]
+        best = max(
+            entry["candidates"].items(),
+            key=lambda item: (item[1], -first_position[item[0]]),
+            default=None
+        )
+        best_hash = best[0] if best else None
+        best_segment = policy_segments[first_position[best_hash]] if best else None
+
+        gap = build_gap_entry(clause, {
+            "best_score": best[1] if best else 0.0,
+            "best_segment_id": best_segment["id"] if best_segment else None,
+            "best_segment_text": best_segment["text"] if best_segment else None
+        })
+        report.append(gap)
+
+        if (
+            gap["coverage"] != entry["coverage"]
+            or gap["match_score"] != entry["match_score"]
+            or best_hash != entry["matched_segment_hash"]
+        ):
+            delta.append({
+                "clause_id": clause["clause_id"],
+                "previous_coverage": entry["coverage"],
+                "coverage": gap["coverage"],
+                "previous_score": entry["match_score"],
+                "match_score": gap["match_score"],
+                "matched_segment_id": gap["matched_segment_id"]
+            })
+
+        entry["coverage"] = gap["coverage"]
+        entry["match_score"] = gap["match_score"]
+        entry["matched_segment_hash"] = best_hash
+
+    new_state = {
+        "version": STATE_VERSION,
+        "clause_fingerprint": previous_state["clause_fingerprint"],
+        "segment_hashes": hashes,
+        "clauses": clause_states
+    }
+
+    return report, delta, new_state
+
+
+def save_analysis_state(state, filepath):
+    """
+    Store an analysis state as JSON.
+    """
+    directory = os.path.dirname(os.path.abspath(filepath))
+    os.makedirs(directory, exist_ok=True)
+
+    with open(filepath, "w", encoding="utf-8") as file:
+        json.dump(state, file)
+
+
+def load_analysis_state(filepath):
+    """
+    Load a stored analysis state, or None if there is none yet.
+    """
+    if not os.path.exists(filepath):
+        return None
+
+    with open(filepath, "r", encoding="utf-8") as file:
+        return json.load(file)
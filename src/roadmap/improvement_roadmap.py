@@ -1,3 +1,8 @@
+import numpy as np
+
+from reporting.columnar import ColumnarReport, COVERAGE_LEVELS, PRIORITY_LEVELS
+
+
 def determine_priority(severity, coverage):
     if coverage == "Covered":
         return "No Action"
@@ -14,11 +19,33 @@ def determine_priority(severity, coverage):
     return "Long-Term"
 
 
+def priority_table(severity_levels):
+    """
+    Priority code for every (severity code, coverage code) pair,
+    derived from determine_priority.
+    """
+    return np.array([
+        [
+            PRIORITY_LEVELS.index(determine_priority(severity, coverage))
+            for coverage in COVERAGE_LEVELS
+        ]
+        for severity in severity_levels
+    ], dtype=np.int8)
+
+
 def generate_improvement_roadmap(gap_report):
     """
     Generate a prioritized improvement roadmap from gap report.
+
+    A ColumnarReport is annotated in place with a priority column,
+    looked up for all rows at once, and returned.
     """
 
+    if isinstance(gap_report, ColumnarReport):
+        table = priority_table(gap_report.severity_levels)
+        gap_report.priority = table[gap_report.severity, gap_report.coverage]
+        return gap_report
+
     roadmap = []
 
     for item in gap_report:
@@ -0,0 +1,499 @@
+"""
+Local HTTP gap analysis service.
+
+    python src/service.py --clauses data/nist_csf/policy_clauses.json --port 8765
+
+Endpoints (JSON in and out):
+
+    POST /analyze          {"text": "..."} or {"path": "policy.pdf"}
+                           analyzes one document and returns the result;
+                           add "frameworks": ["NIST", ...] to analyze it
+                           against catalogs from the data directory.
+                           Paths are only accepted when the service was
+                           started with --document-root, and must lie
+                           under it
+    POST /batch-analyze    {"documents": [{"text": ...}, {"path": ...}]}
+                           queues documents and returns their ids (202);
+                           one invalid document rejects the whole batch
+    GET  /results/<id>     result of a queued document (202 while pending)
+    GET  /health           service and queue status
+    GET  /metrics          stage timings and counters, Prometheus format
+
+The clause library (and every catalog in the data directory) is
+compiled once at startup and mapped by every worker process. Requests
+are queued on a bounded queue (503 when full) and grouped into small
+batches per worker task.
+"""
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+
+from instrumentation.metrics import METRICS
+from nlp.clause_library import load_clause_library
+from nlp.frameworks import DEFAULT_DATA_DIR, FrameworkRegistry
+from pipeline import AnalysisPipeline, analyze_frameworks
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+# Clause library and framework registry of a service worker process, set by _init_worker
+_worker_library = None
+_worker_registry = None
+
+
+def _init_worker(clauses_path, data_dir):
+    global _worker_library, _worker_registry
+    # Maps the artifacts compiled at service startup; no rebuild happens here
+    _worker_library = load_clause_library(clauses_path)
+    _worker_registry = FrameworkRegistry(data_dir)
+
+
+def _analyze_document(document):
+    options = {
+        "source": document.get("path"),
+        "text": document.get("text"),
+        "pdf_workers": 1
+    }
+
+    if document.get("frameworks") is None:
+        final = AnalysisPipeline(_worker_library, **options).run("final_report")
+        return {"gap_report": final.analysis_results, "final_report": final.report}
+
+    # Several frameworks share one ingestion and segmentation pass
+    libraries = {
+        _worker_registry.catalogs[framework]["name"]: _worker_registry.get(framework)
+        for framework in dict.fromkeys(
+            _worker_registry.resolve(name) for name in document["frameworks"]
+        )
+    }
+    return {
+        "frameworks": {
+            name: {"gap_report": final.analysis_results, "final_report": final.report}
+            for name, final in analyze_frameworks(libraries, **options).items()
+        }
+    }
+
+
+def _analyze_batch(documents):
+    """
+    Worker task: analyze a batch of {"text"} / {"path"} documents.
+    Returns one (ok, result or error) pair per document and the
+    worker's metrics for the batch.
+    """
+    METRICS.reset()
+    results = []
+
+    for document in documents:
+        try:
+            results.append((True, _analyze_document(document)))
+        except Exception as error:
+            results.append((False, f"{type(error).__name__}: {error}"))
+
+    return results, METRICS.snapshot()
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class AnalysisService:
+    """
+    asyncio front end over a process pool of warm analysis workers.
+
+    Each accepted document is put on a bounded queue. `workers` batcher
+    tasks take up to batch_size queued documents at a time, waiting at
+    most batch_window seconds to fill a batch, and run each batch as one
+    worker task. Finished results are kept for GET /results/<id>, up to
+    max_results of them.
+
+    {"path"} documents are read from under document_root; without one,
+    only {"text"} documents are accepted.
+    """
+
+    def __init__(self, clauses_path, data_dir=DEFAULT_DATA_DIR, workers=None,
+                 max_queue=64, batch_size=8, batch_window=0.01, max_results=1024,
+                 document_root=None):
+        self.clauses_path = clauses_path
+        self.data_dir = data_dir
+        self.document_root = document_root and os.path.realpath(document_root)
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_results = max_results
+
+        self.results = OrderedDict()
+        self._ids = itertools.count(1)
+        self._queue = None
+        self._executor = None
+        self._batchers = []
+        self._server = None
+        self.started_at = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        # Compile (or validate) the clause artifacts once before workers map them
+        library = load_clause_library(self.clauses_path)
+        self.clause_count = len(library)
+        self.registry = FrameworkRegistry(self.data_dir)
+        for framework in self.registry.catalogs:
+            self.registry.get(framework)
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.clauses_path, self.data_dir)
+        )
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._batchers = [
+            asyncio.create_task(self._run_batches()) for _ in range(self.workers)
+        ]
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        self.started_at = time.time()
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for batcher in self._batchers:
+            batcher.cancel()
+        await asyncio.gather(*self._batchers, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    @property
+    def address(self):
+        return self._server.sockets[0].getsockname()[:2]
+
+    # ---------------- Queue and batching ----------------
+
+    def validate(self, document):
+        """
+        Check a {"text"} / {"path"} document and return it as queued,
+        with its path resolved under document_root. Raises HTTPError(400)
+        for malformed documents or unknown frameworks and HTTPError(403)
+        for paths outside the root.
+        """
+        if not isinstance(document, dict) or not (
+            isinstance(document.get("text"), str) or isinstance(document.get("path"), str)
+        ):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Each document needs a 'text' or 'path' string")
+        if not isinstance(document.get("text"), str):
+            document = {**document, "path": self._resolve_path(document["path"])}
+
+        frameworks = document.get("frameworks")
+        if frameworks is not None:
+            if not isinstance(frameworks, list) or not frameworks:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "'frameworks' must be a non-empty list")
+            try:
+                for framework in frameworks:
+                    self.registry.resolve(str(framework))
+            except KeyError as error:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, error.args[0])
+
+        return document
+
+    def enqueue(self, document):
+        """
+        Validate a document and queue it for analysis; returns its
+        result id. Raises HTTPError as validate does, and
+        HTTPError(503) when the queue is full.
+        """
+        return self._put(self.validate(document))
+
+    def _put(self, document):
+        result_id = str(next(self._ids))
+        future = asyncio.get_running_loop().create_future()
+
+        try:
+            self._queue.put_nowait((result_id, document, future))
+        except asyncio.QueueFull:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Analysis queue is full, retry later")
+
+        self._store(result_id, {"id": result_id, "status": PENDING, "future": future})
+        return result_id
+
+    def _resolve_path(self, path):
+        """
+        Absolute path of a {"path"} document under document_root.
+        Raises HTTPError(400) when path documents are disabled and
+        HTTPError(403) for paths outside the root.
+        """
+        if self.document_root is None:
+            raise HTTPError(
+                HTTPStatus.BAD_REQUEST,
+                "Path documents are disabled; send 'text' or start the service with --document-root"
+            )
+
+        # realpath resolves symlinks, so links cannot lead out of the root
+        resolved = os.path.realpath(os.path.join(self.document_root, path))
+        if os.path.commonpath([resolved, self.document_root]) != self.document_root:
+            raise HTTPError(HTTPStatus.FORBIDDEN, "Path is outside the document root")
+        return resolved
+
+    def _store(self, result_id, entry):
+        self.results[result_id] = entry
+        self.results.move_to_end(result_id)
+        while len(self.results) > self.max_results:
+            # Evict the oldest finished result; pending ones are never dropped
+            oldest = next(
+                (key for key, value in self.results.items() if value["status"] != PENDING),
+                None
+            )
+            if oldest is None:
+                break
+            del self.results[oldest]
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.batch_window
+
+        while len(batch) < self.batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self._next_batch()
+            try:
+                outcomes, metrics = await loop.run_in_executor(
+                    self._executor, _analyze_batch, [document for _, document, _ in batch]
+                )
+            except Exception as error:
+                outcomes = [(False, f"{type(error).__name__}: {error}")] * len(batch)
+            else:
+                METRICS.merge(metrics)
+
+            for (result_id, _, future), (ok, value) in zip(batch, outcomes):
+                entry = {"id": result_id, "status": DONE if ok else FAILED}
+                entry.update(value if ok else {"error": value})
+                if result_id in self.results:
+                    self._store(result_id, entry)
+                if not future.done():
+                    future.set_result(entry)
+
+    # ---------------- HTTP ----------------
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HTTPError as error:
+                    await _write_response(writer, error.status, {"error": error.message}, close=True)
+                    break
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                close = headers.get("connection", "").lower() == "close"
+
+                try:
+                    status, payload = await self.route(method, path, body)
+                except HTTPError as error:
+                    status, payload = error.status, {"error": error.message}
+                except Exception as error:
+                    # A bug in one request must not drop the connection unanswered
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {
+                        "error": f"{type(error).__name__}: {error}"
+                    }
+
+                await _write_response(writer, status, payload, close=close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        path = path.split("?", 1)[0].rstrip("/") or "/"
+
+        if path == "/analyze" and method == "POST":
+            result_id = self.enqueue(_parse_json(body))
+            entry = await self.results[result_id]["future"]
+            return _result_status(entry), entry
+
+        if path == "/batch-analyze" and method == "POST":
+            documents = _parse_json(body).get("documents")
+            if not isinstance(documents, list) or not documents:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "'documents' must be a non-empty list")
+            if len(documents) > self.max_queue - self._queue.qsize():
+                raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Analysis queue is full, retry later")
+            # A batch is accepted or rejected as a whole: nothing is
+            # queued until every document has passed validation
+            documents = [self.validate(document) for document in documents]
+            ids = [self._put(document) for document in documents]
+            return HTTPStatus.ACCEPTED, {"ids": ids}
+
+        if path.startswith("/results/") and method == "GET":
+            entry = self.results.get(path[len("/results/"):])
+            if entry is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "Unknown result id")
+            if entry["status"] == PENDING:
+                return HTTPStatus.ACCEPTED, {"id": entry["id"], "status": PENDING}
+            return _result_status(entry), entry
+
+        if path == "/health" and method == "GET":
+            return HTTPStatus.OK, {
+                "status": "ok",
+                "clauses": self.clause_count,
+                "frameworks": self.registry.names(),
+                "workers": self.workers,
+                "queued": self._queue.qsize(),
+                "max_queue": self.max_queue,
+                "uptime": round(time.time() - self.started_at, 3)
+            }
+
+        if path == "/metrics" and method == "GET":
+            return HTTPStatus.OK, METRICS.to_prometheus()
+
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {method} {path}")
+
+
+def _result_status(entry):
+    return HTTPStatus.OK if entry["status"] == DONE else HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def _parse_json(body):
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body is not valid JSON")
+    if not isinstance(payload, dict):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+    return payload
+
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+
+    try:
+        method, target, _ = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Content-Length is not an integer")
+    if length < 0:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Content-Length is negative")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+
+    return method.upper(), target, headers, body
+
+
+async def _write_response(writer, status, payload, close=False):
+    if isinstance(payload, str):
+        body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+    else:
+        body = json.dumps(
+            {key: value for key, value in payload.items() if key != "future"}
+        ).encode("utf-8")
+        content_type = "application/json"
+
+    head = [
+        f"HTTP/1.1 {status.value} {status.phrase}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'close' if close else 'keep-alive'}"
+    ]
+    if status == HTTPStatus.SERVICE_UNAVAILABLE:
+        head.append("Retry-After: 1")
+
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Local policy gap analysis service")
+    parser.add_argument(
+        "--clauses",
+        default=os.path.join("data", "nist_csf", "policy_clauses.json"),
+        help="Benchmark policy clauses JSON used when a request names no frameworks"
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=DEFAULT_DATA_DIR,
+        help="Directory holding one <framework>/policy_clauses.json per framework"
+    )
+    parser.add_argument(
+        "--document-root",
+        default=None,
+        help="Directory {\"path\"} documents are read from; without it only {\"text\"} is accepted"
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Interface to bind (localhost by default)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="Analysis worker processes (defaults to the number of CPUs)")
+    parser.add_argument("--max-queue", type=int, default=64, help="Queued documents before requests are rejected with 503")
+    parser.add_argument("--batch-size", type=int, default=8, help="Most documents sent to a worker at once")
+    parser.add_argument("--batch-window", type=float, default=0.01, help="Seconds to wait for a batch to fill")
+    return parser.parse_args()
+
+
+async def serve(args):
+    service = AnalysisService(
+        args.clauses,
+        data_dir=args.data_dir,
+        workers=args.workers,
+        max_queue=args.max_queue,
+        batch_size=args.batch_size,
+        batch_window=args.batch_window,
+        document_root=args.document_root
+    )
+    server = await service.start(args.host, args.port)
+    host, port = service.address
+    print(f"Serving gap analysis on http://{host}:{port} ({service.workers} workers)")
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main():
+    try:
+        asyncio.run(serve(parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
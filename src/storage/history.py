@@ -0,0 +1,282 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_HISTORY_PATH = os.path.join(".cache", "history.sqlite3")
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    format TEXT,
+    size INTEGER NOT NULL,
+    source_path TEXT,
+    text_path TEXT,
+    uploaded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_uploaded ON documents (uploaded_at DESC, id DESC);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    document_id INTEGER NOT NULL REFERENCES documents (id) ON DELETE CASCADE,
+    framework TEXT NOT NULL,
+    catalog_hash TEXT NOT NULL,
+    analysis_version TEXT NOT NULL,
+    analyzed_at REAL NOT NULL,
+    covered INTEGER NOT NULL,
+    partial INTEGER NOT NULL,
+    missing INTEGER NOT NULL,
+    report TEXT NOT NULL,
+    UNIQUE (document_id, framework)
+);
+
+CREATE TABLE IF NOT EXISTS clause_results (
+    analysis_id INTEGER NOT NULL REFERENCES analyses (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    clause_id TEXT NOT NULL,
+    coverage TEXT NOT NULL,
+    match_score REAL,
+    severity TEXT,
+    nist_function TEXT,
+    entry TEXT NOT NULL,
+    PRIMARY KEY (analysis_id, position)
+);
+CREATE INDEX IF NOT EXISTS clause_results_clause ON clause_results (clause_id, coverage);
+CREATE INDEX IF NOT EXISTS clause_results_coverage ON clause_results (coverage, severity);
+"""
+
+DOCUMENT_COLUMNS = (
+    "content_hash", "name", "format", "size", "source_path", "text_path", "uploaded_at"
+)
+
+
+class HistoryStore:
+    """
+    Document and analysis history in a local SQLite database.
+
+    Documents are kept as metadata only: content hash, name, format and
+    size, plus paths to the stored upload and its cached extracted text.
+    Every (document, framework) analysis keeps its report and one row per
+    clause result, indexed by clause and coverage. It also records the
+    hash of the clause catalog and the analysis version it was made
+    with, and is only found again under both: a changed catalog or
+    engine makes it stale until it is re-analyzed.
+
+    The database runs in WAL mode, so dashboard sessions, background jobs
+    and other processes on the same host read while one of them writes.
+    SQLite connections cannot be shared between threads; each thread
+    gets its own.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connection() as connection:
+            if connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                # Older analyses do not say which catalog and engine made
+                # them, so they cannot be reused; documents are kept
+                connection.executescript(
+                    "DROP TABLE IF EXISTS clause_results; DROP TABLE IF EXISTS analyses;"
+                )
+            connection.executescript(SCHEMA)
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode = WAL")
+            # WAL keeps committed transactions safe on power loss without
+            # a sync per commit
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute("PRAGMA foreign_keys = ON")
+            self._local.connection = connection
+        return connection
+
+    def add_document(self, content_hash, name, size, format=None,
+                     source_path=None, text_path=None):
+        """
+        Record an uploaded document. A re-upload of the same content
+        updates its name and paths and moves it to the top of the history.
+        """
+        with self._connection() as connection:
+            connection.execute(
+                """
+                INSERT INTO documents
+                    (content_hash, name, format, size, source_path, text_path, uploaded_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (content_hash) DO UPDATE SET
+                    name = excluded.name,
+                    format = excluded.format,
+                    source_path = excluded.source_path,
+                    text_path = excluded.text_path,
+                    uploaded_at = excluded.uploaded_at
+                """,
+                (content_hash, name, format, size, source_path, text_path, time.time())
+            )
+
+    def get_document(self, content_hash):
+        """
+        Metadata of a document, or None if it is unknown.
+        """
+        row = self._connection().execute(
+            f"SELECT {', '.join(DOCUMENT_COLUMNS)} FROM documents WHERE content_hash = ?",
+            (content_hash,)
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    def count_documents(self):
+        return self._connection().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def list_documents(self, limit=10, offset=0):
+        """
+        One page of documents, most recent upload first, with the
+        frameworks each has been analyzed against.
+        """
+        rows = self._connection().execute(
+            f"""
+            SELECT {', '.join('d.' + column for column in DOCUMENT_COLUMNS)},
+                   GROUP_CONCAT(a.framework, '\x1f') AS frameworks
+            FROM (
+                SELECT * FROM documents
+                ORDER BY uploaded_at DESC, id DESC
+                LIMIT ? OFFSET ?
+            ) AS d
+            LEFT JOIN analyses AS a ON a.document_id = d.id
+            GROUP BY d.id
+            ORDER BY d.uploaded_at DESC, d.id DESC
+            """,
+            (limit, offset)
+        ).fetchall()
+
+        documents = []
+        for row in rows:
+            document = dict(row)
+            frameworks = document["frameworks"]
+            document["frameworks"] = sorted(frameworks.split("\x1f")) if frameworks else []
+            documents.append(document)
+        return documents
+
+    def save_analysis(self, content_hash, framework, analysis_results, report,
+                      catalog_hash, analysis_version):
+        """
+        Store the gap report entries and final report of an analysis made
+        with the clause catalog of catalog_hash (ClauseLibrary.source_hash)
+        and analysis_version (pipeline.ANALYSIS_VERSION), replacing any
+        earlier analysis of the document under the framework.
+        """
+        counts = {
+            coverage: sum(entry["coverage"] == coverage for entry in analysis_results)
+            for coverage in ("Covered", "Partial", "Missing")
+        }
+
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT id FROM documents WHERE content_hash = ?", (content_hash,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"Unknown document: {content_hash}")
+
+            connection.execute(
+                """
+                INSERT INTO analyses
+                    (document_id, framework, catalog_hash, analysis_version,
+                     analyzed_at, covered, partial, missing, report)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (document_id, framework) DO UPDATE SET
+                    catalog_hash = excluded.catalog_hash,
+                    analysis_version = excluded.analysis_version,
+                    analyzed_at = excluded.analyzed_at,
+                    covered = excluded.covered,
+                    partial = excluded.partial,
+                    missing = excluded.missing,
+                    report = excluded.report
+                """,
+                (
+                    row["id"], framework, catalog_hash, analysis_version, time.time(),
+                    counts["Covered"], counts["Partial"], counts["Missing"],
+                    json.dumps(report)
+                )
+            )
+            analysis_id = connection.execute(
+                "SELECT id FROM analyses WHERE document_id = ? AND framework = ?",
+                (row["id"], framework)
+            ).fetchone()[0]
+
+            connection.execute(
+                "DELETE FROM clause_results WHERE analysis_id = ?", (analysis_id,)
+            )
+            connection.executemany(
+                """
+                INSERT INTO clause_results
+                    (analysis_id, position, clause_id, coverage, match_score,
+                     severity, nist_function, entry)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    (
+                        analysis_id, position, entry["clause_id"], entry["coverage"],
+                        entry.get("match_score"), entry.get("severity"),
+                        entry.get("nist_function"), json.dumps(entry)
+                    )
+                    for position, entry in enumerate(analysis_results)
+                )
+            )
+
+    def _find_analysis(self, content_hash, framework, catalog_hash, analysis_version):
+        return self._connection().execute(
+            """
+            SELECT a.id, a.report FROM analyses AS a
+            JOIN documents AS d ON d.id = a.document_id
+            WHERE d.content_hash = ? AND a.framework = ?
+              AND a.catalog_hash = ? AND a.analysis_version = ?
+            """,
+            (content_hash, framework, catalog_hash, analysis_version)
+        ).fetchone()
+
+    def has_analysis(self, content_hash, framework, catalog_hash, analysis_version):
+        """
+        True if the document has an up-to-date analysis under the
+        framework: one made with this catalog hash and analysis version.
+        """
+        return self._find_analysis(
+            content_hash, framework, catalog_hash, analysis_version
+        ) is not None
+
+    def load_analysis(self, content_hash, framework, catalog_hash, analysis_version):
+        """
+        {"analysis_results": [...], "report": {...}} of a stored analysis,
+        or None if the document has no analysis under the framework made
+        with this catalog hash and analysis version.
+        """
+        row = self._find_analysis(content_hash, framework, catalog_hash, analysis_version)
+        if row is None:
+            return None
+
+        entries = self._connection().execute(
+            "SELECT entry FROM clause_results WHERE analysis_id = ? ORDER BY position",
+            (row["id"],)
+        )
+        return {
+            "analysis_results": [json.loads(entry) for (entry,) in entries],
+            "report": json.loads(row["report"])
+        }
+
+    def close(self):
+        """
+        Close this thread's connection.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
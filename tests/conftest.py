@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules under src/ import each other as top-level packages
+sys.path.insert(0, os.path.join(REPO_DIR, "src"))
+
+
+@pytest.fixture
+def nist_catalog():
+    return os.path.join(REPO_DIR, "data", "nist_csf", "policy_clauses.json")
+
+
+@pytest.fixture
+def nist_library(nist_catalog, tmp_path):
+    from nlp.clause_library import load_clause_library
+    return load_clause_library(nist_catalog, artifact_path=str(tmp_path / "nist.clib"))
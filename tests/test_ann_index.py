@@ -0,0 +1,47 @@
+import numpy as np
+
+from nlp.ann_index import SegmentIndex
+
+
+def _unit_vectors(n, dim, seed):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _exact(vectors, query, k):
+    scores = vectors @ query
+    return np.argsort(-scores, kind="stable")[:k].tolist()
+
+
+def test_full_probe_equals_exact_search():
+    vectors = _unit_vectors(500, 32, seed=1)
+    index = SegmentIndex.build(vectors, n_lists=16)
+
+    for query in _unit_vectors(20, 32, seed=2):
+        found = index.search(query, k=10, n_probe=index.n_lists)
+        assert [segment_id for segment_id, _ in found] == _exact(vectors, query, 10)
+
+
+def test_partial_probe_keeps_most_neighbours():
+    vectors = _unit_vectors(2000, 16, seed=3)
+    index = SegmentIndex.build(vectors, n_lists=32)
+
+    recalls = []
+    for query in _unit_vectors(30, 16, seed=4):
+        found = {segment_id for segment_id, _ in index.search(query, k=10, n_probe=8)}
+        recalls.append(len(found & set(_exact(vectors, query, 10))) / 10)
+
+    assert np.mean(recalls) >= 0.6
+
+
+def test_saved_index_searches_like_the_original(tmp_path):
+    vectors = _unit_vectors(300, 8, seed=5)
+    index = SegmentIndex.build(vectors, n_lists=8, model_id="test-model")
+    index.save(str(tmp_path))
+
+    loaded = SegmentIndex.load(str(tmp_path))
+    query = vectors[17]
+
+    assert loaded.model_id == "test-model"
+    assert loaded.search(query, k=5, n_probe=3) == index.search(query, k=5, n_probe=3)
+    assert loaded.search(query, k=1, n_probe=loaded.n_lists)[0][0] == 17
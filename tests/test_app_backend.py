@@ -0,0 +1,75 @@
+import shutil
+
+from ingestion.document_loader import iter_policy_blocks, policy_encoding
+from instrumentation.metrics import METRICS
+from nlp.preprocessing import DocumentVocabulary, SectionOutline, segment_blocks
+from pipeline import AnalysisPipeline, IngestionResult, SegmentationResult
+from test_pdf_loader import _write_pdf
+
+PAGES = [
+    "Access to systems is granted on a least privilege basis. Access is reviewed quarterly.",
+    "Security incidents are reported to the response team within one hour.",
+]
+
+
+# The backend calls app.py makes, without Streamlit: an upload is segmented
+# once and every framework's pipeline is seeded with that segmentation
+
+
+def _segment_upload(path, progress):
+    outline = SectionOutline()
+    vocabulary = DocumentVocabulary()
+    segments = segment_blocks(
+        iter_policy_blocks(path, progress=progress), outline, policy_encoding(path),
+        vocabulary
+    )
+    return SegmentationResult(
+        segments=segments, sections=outline.sections, vocabulary=vocabulary
+    )
+
+
+def _seeded_pipeline(library, path, segmentation, progress):
+    pipeline = AnalysisPipeline(library, source=path, progress=progress)
+    pipeline.seed(
+        "ingestion", IngestionResult(source=path, text=None, encoding=policy_encoding(path))
+    )
+    pipeline.seed("segmentation", segmentation)
+    return pipeline
+
+
+def test_seeded_upload_analysis_matches_a_full_run(nist_library, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / "upload.pdf")
+    _write_pdf(tmp_path / "upload.pdf", PAGES)
+    events = []
+
+    def progress(stage, **counts):
+        events.append((stage, counts))
+
+    segmentation = _segment_upload(path, lambda **counts: progress("segmentation", **counts))
+    final = _seeded_pipeline(nist_library, path, segmentation, progress).run("final_report")
+    expected = AnalysisPipeline(nist_library, source=path).run("final_report")
+
+    assert final.analysis_results == expected.analysis_results
+    assert final.report == expected.report
+    assert ("segmentation", {"pages": len(PAGES)}) in events
+    stages = [stage for stage, _ in events]
+    assert stages.index("matching") > stages.index("segmentation")
+
+
+def test_reuploaded_pdf_is_read_from_the_text_cache(nist_library, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = tmp_path / "policy.pdf"
+    _write_pdf(first, PAGES)
+    second = tmp_path / "renamed copy.pdf"
+    shutil.copy(first, second)
+
+    METRICS.reset()
+    segmentations = [_segment_upload(str(path), None) for path in (first, second)]
+
+    counters = METRICS.snapshot()["counters"]
+    assert counters["pdf_text_cache_misses"] == 1
+    assert counters["pdf_text_cache_hits"] == 1
+    assert [s["text"] for s in segmentations[0].segments] == [
+        s["text"] for s in segmentations[1].segments
+    ]
@@ -0,0 +1,40 @@
+import json
+import os
+
+import main
+
+POLICIES = {
+    "access.txt": (
+        "Access to systems is granted on a least privilege basis and reviewed quarterly.\n"
+    ),
+    "incidents.txt": (
+        "Security incidents are reported to the response team within one hour.\n"
+    ),
+}
+
+
+def test_failed_document_does_not_stop_the_batch(nist_catalog, tmp_path, capsys):
+    for name, text in POLICIES.items():
+        (tmp_path / name).write_text(text, encoding="utf-8")
+    manifest = tmp_path / "batch.txt"
+    manifest.write_text("access.txt\nmissing.txt\nincidents.txt\n", encoding="utf-8")
+    output_dir = tmp_path / "results"
+
+    summary = main.run_batch(str(manifest), str(output_dir), nist_catalog, workers=2)
+
+    status = {os.path.basename(entry["document"]): entry for entry in summary}
+    assert {name: entry["status"] for name, entry in status.items()} == {
+        "access.txt": "ok", "missing.txt": "failed", "incidents.txt": "ok"
+    }
+    assert status["missing.txt"]["error"].startswith("FileNotFoundError")
+
+    with open(output_dir / "batch_summary.json", encoding="utf-8") as file:
+        assert json.load(file) == summary
+
+    library = main.load_clause_library(nist_catalog)
+    for entry in (status["access.txt"], status["incidents.txt"]):
+        with open(output_dir / entry["result"], encoding="utf-8") as file:
+            written = json.load(file)
+        expected = main.analyze_policy(library, source=entry["document"])
+        assert written["final_report"]["statistics"] == expected["final_report"]["statistics"]
+        assert entry["statistics"] == expected["final_report"]["statistics"]
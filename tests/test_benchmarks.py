@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+
+import pytest
+
+from conftest import REPO_DIR
+
+sys.path.insert(0, os.path.join(REPO_DIR, "benchmarks"))
+
+from run_benchmarks import compare  # noqa: E402
+from synthetic import (  # noqa: E402
+    generate_clause_catalog, make_vocabulary, write_clause_catalog, write_policy,
+    zipf_weights
+)
+from nlp.clause_preprocessing import preprocess_clauses  # noqa: E402
+
+META = {"clauses": 50, "policy_mb": 0.1, "overlap": 0.3, "seed": 0}
+
+
+def _results(meta=META, **seconds):
+    return {
+        "meta": dict(meta, commit="abc"),
+        "timings": {name: {"seconds": value} for name, value in seconds.items()}
+    }
+
+
+def test_generators_are_deterministic_per_seed():
+    assert make_vocabulary(200, seed=3) == make_vocabulary(200, seed=3)
+    assert len(set(make_vocabulary(200))) == 200
+
+    weights = zipf_weights(100)
+    assert weights == sorted(weights, reverse=True)
+
+    assert generate_clause_catalog(30, seed=1) == generate_clause_catalog(30, seed=1)
+    assert generate_clause_catalog(30, seed=1) != generate_clause_catalog(30, seed=2)
+
+
+def test_clause_catalog_follows_the_clause_schema(tmp_path):
+    path = tmp_path / "clauses.json"
+    clauses = write_clause_catalog(str(path), 40, vocabulary_size=300)
+
+    with open(path, encoding="utf-8") as file:
+        assert json.load(file) == clauses
+    assert len({clause["clause_id"] for clause in clauses}) == 40
+    assert all(clause["keywords"] for clause in clauses)
+    assert len(preprocess_clauses(clauses)) == 40
+
+
+def test_policy_has_the_requested_size_and_overlap(tmp_path):
+    clauses = generate_clause_catalog(20, vocabulary_size=300)
+    keywords = {keyword for clause in clauses for keyword in clause["keywords"]}
+    path = tmp_path / "policy.txt"
+
+    written = write_policy(str(path), 20000, clauses, overlap=1.0, vocabulary_size=300)
+
+    assert written == path.stat().st_size
+    assert 20000 <= written < 20000 + 4096
+    sentences = path.read_text(encoding="utf-8").lower().replace("\n", " ").split(". ")
+    for sentence in filter(str.strip, sentences):
+        assert any(keyword in sentence for keyword in keywords)
+
+
+def test_compare_reports_stages_over_the_limit(capsys):
+    baseline = _results(segment_policy=1.0, end_to_end=2.0, removed=1.0)
+    results = _results(segment_policy=1.1, end_to_end=3.0, added=5.0)
+
+    regressions = compare(results, baseline, max_slowdown=1.2)
+
+    assert [regression["stage"] for regression in regressions] == ["end_to_end"]
+    assert regressions[0]["ratio"] == pytest.approx(1.5)
+
+
+def test_compare_refuses_a_baseline_of_other_data():
+    baseline = _results(dict(META, policy_mb=10.0), end_to_end=2.0)
+
+    with pytest.raises(ValueError, match="policy_mb=10.0"):
+        compare(_results(end_to_end=1.0), baseline, max_slowdown=1.2)
@@ -0,0 +1,70 @@
+import json
+import os
+
+import numpy as np
+
+from nlp.clause_library import compile_clause_library, load_clause_library
+from nlp.clause_preprocessing import clause_document
+from nlp.embeddings import HashedNgramBackend
+from nlp.keyword_matcher import ArrayAutomaton, build_clause_automaton, scan_keywords
+from nlp.preprocessing import normalize_text, segment_policy
+from instrumentation.metrics import METRICS
+
+POLICY = (
+    "The organization maintains an inventory of hardware and software assets. "
+    "Access to systems requires multi-factor authentication and least privilege. "
+    "Security incidents are reported to the incident response team. "
+    "Audit logs are reviewed for anomalies."
+)
+
+
+def test_artifact_automaton_matches_a_fresh_build(nist_library):
+    assert isinstance(nist_library.automaton, ArrayAutomaton)
+    fresh = build_clause_automaton(nist_library.clauses)
+
+    for segment in segment_policy(POLICY):
+        assert (
+            scan_keywords(nist_library.automaton, segment["tokens"])
+            == scan_keywords(fresh, segment["tokens"])
+        )
+
+
+def test_arrays_are_views_into_the_artifact(nist_library):
+    # Nothing owns a private copy: every array reads from the memory map
+    assert not nist_library.clause_vectors.flags.owndata
+    assert not nist_library.automaton._goto_symbols.flags.owndata
+
+
+def test_clause_vectors_equal_the_backend_embedding(nist_library):
+    backend = HashedNgramBackend()
+    expected = backend.embed(
+        [normalize_text(clause_document(clause)) for clause in nist_library.clauses]
+    )
+    assert nist_library.model_id == backend.model_id
+    assert np.allclose(nist_library.clause_vectors, expected)
+
+
+def test_artifact_is_reused_until_the_catalog_changes(nist_catalog, tmp_path):
+    catalog = tmp_path / "policy_clauses.json"
+    catalog.write_text(open(nist_catalog, encoding="utf-8").read(), encoding="utf-8")
+    artifact = str(tmp_path / "catalog.clib")
+
+    METRICS.reset()
+    first = load_clause_library(str(catalog), artifact_path=artifact)
+    load_clause_library(str(catalog), artifact_path=artifact)
+    assert METRICS.snapshot()["counters"]["clause_library_compiles"] == 1
+
+    clauses = json.loads(catalog.read_text(encoding="utf-8"))
+    clauses[0]["title"] = "Renamed clause"
+    catalog.write_text(json.dumps(clauses), encoding="utf-8")
+
+    second = load_clause_library(str(catalog), artifact_path=artifact)
+    assert METRICS.snapshot()["counters"]["clause_library_compiles"] == 2
+    assert second.source_hash != first.source_hash
+    assert second.clauses[0]["title"] == "Renamed clause"
+
+
+def test_compile_writes_atomically(nist_catalog, tmp_path):
+    artifact = compile_clause_library(nist_catalog, str(tmp_path / "out.clib"))
+    assert os.listdir(tmp_path) == ["out.clib"]
+    assert os.path.getsize(artifact) > 0
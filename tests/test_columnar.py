@@ -0,0 +1,26 @@
+import numpy as np
+
+from reporting.columnar import UNSET, code_dtype, encode_categorical
+
+
+def test_codes_round_trip_past_int8():
+    values = [f"function-{n % 300}" for n in range(600)]
+    codes, levels = encode_categorical(values)
+
+    assert len(levels) == 300
+    assert codes.dtype == np.int16
+    assert [levels[code] for code in codes] == values
+
+
+def test_small_categories_stay_int8():
+    codes, levels = encode_categorical(["High", "Low", "High"], ("Low",))
+
+    assert codes.dtype == np.int8
+    assert levels == ("Low", "High")
+    assert codes.tolist() == [1, 0, 1]
+
+
+def test_code_dtype_keeps_room_for_unset():
+    assert code_dtype(128) == np.int8
+    assert code_dtype(129) == np.int16
+    assert np.array([UNSET], dtype=code_dtype(70000))[0] == UNSET
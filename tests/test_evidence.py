@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+
+from nlp.evidence import (
+    evidence_to_match, find_top_segments, stream_top_matches, top_k_indices
+)
+from nlp.matching import find_best_segment_match
+from nlp.preprocessing import segment_policy
+
+POLICY = (
+    "User access control is enforced for every system. "
+    "Access control lists are reviewed. "
+    "User access control is enforced for every service. "
+    "Incident response roles are defined. "
+    "The cafeteria opens at noon. "
+    "Access reviews happen yearly. "
+    "Incident response communication is tested. "
+)
+
+
+def _naive_top_k(scores, k):
+    positive = [i for i, score in enumerate(scores) if score > 0]
+    return sorted(positive, key=lambda i: (-scores[i], i))[:k]
+
+
+def test_top_k_breaks_ties_by_position():
+    scores = [0.5, 1.0, 0.5, 1.0, 0.5, 0.0]
+
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 0]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 0, 2, 4]
+    assert top_k_indices([0.0, 0.0], 2).tolist() == []
+    assert top_k_indices(scores, 0).tolist() == []
+
+
+def test_top_k_matches_a_full_sort():
+    generator = random.Random(3)
+    for _ in range(200):
+        # Few distinct values, so most selections cut through a tie
+        scores = np.array([generator.choice([0.0, 0.25, 0.5, 1.0]) for _ in range(20)])
+        k = generator.randint(1, 8)
+        assert top_k_indices(scores, k).tolist() == _naive_top_k(scores.tolist(), k)
+
+
+def test_streamed_evidence_matches_per_clause_ranking(nist_library):
+    segments = segment_policy(POLICY)
+    streamed = stream_top_matches(nist_library.clauses, iter(segments), 2, nist_library.automaton)
+
+    for clause, evidence in zip(nist_library.clauses, streamed):
+        assert evidence == find_top_segments(clause, segments, 2)
+        assert evidence_to_match(evidence) == find_best_segment_match(clause, segments)
+
+    access = streamed[[c["clause_id"] for c in nist_library.clauses].index("PR-AC-01")]
+    # Segments 0 and 2 tie; the earlier one ranks first
+    assert [entry["segment_id"] for entry in access["segments"]] == [0, 2]
+
+
+def test_evidence_from_a_score_row_follows_top_k(nist_library):
+    segments = segment_policy(POLICY)
+    clause = nist_library.clauses[0]
+    scores = np.array([0.2, 0.9, 0.2, 0.0, 0.9, 0.1, 0.0])
+
+    evidence = find_top_segments(clause, segments, 3, scores=scores)
+
+    assert [entry["segment_id"] for entry in evidence["segments"]] == [1, 4, 0]
+    assert [entry["score"] for entry in evidence["segments"]] == [0.9, 0.9, 0.2]
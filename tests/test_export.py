@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+
+import pytest
+
+from pipeline import AnalysisPipeline
+from reporting.export import ExportWriter, ReportExporter, TABLES, export_report
+
+POLICY = (
+    "User access to systems is granted based on business requirements.\n\n"
+    "An incident response plan is established to handle cybersecurity incidents.\n"
+)
+
+
+def _analysis(library, columnar=False):
+    final = AnalysisPipeline(library, text=POLICY, columnar=columnar).run("final_report")
+    return final.analysis_results, final.report
+
+
+def test_csv_and_jsonl_exports_agree(nist_library):
+    results, _ = _analysis(nist_library)
+
+    csv_file, jsonl_file = io.BytesIO(), io.BytesIO()
+    assert export_report(csv_file, results, "csv", document="policy.txt") == len(results)
+    assert export_report(jsonl_file, results, "jsonl", document="policy.txt") == len(results)
+
+    csv_rows = list(csv.DictReader(io.StringIO(csv_file.getvalue().decode("utf-8"))))
+    jsonl_rows = [json.loads(line) for line in jsonl_file.getvalue().decode("utf-8").splitlines()]
+
+    assert list(csv_rows[0]) == [name for name, _ in TABLES["findings"]]
+    assert [row["clause_id"] for row in csv_rows] == [row["clause_id"] for row in jsonl_rows]
+    assert [row["coverage"] for row in jsonl_rows] == [entry["coverage"] for entry in results]
+    assert all(row["document"] == "policy.txt" for row in jsonl_rows)
+
+
+def test_columnar_results_export_like_entries(nist_library):
+    entries, _ = _analysis(nist_library)
+    columnar, _ = _analysis(nist_library, columnar=True)
+
+    exported = []
+    for results in (entries, columnar):
+        sink = io.BytesIO()
+        export_report(sink, results, "jsonl")
+        exported.append(sink.getvalue())
+
+    assert exported[0] == exported[1]
+
+
+def test_report_exporter_writes_every_table(nist_library, tmp_path):
+    results, report = _analysis(nist_library)
+
+    with ReportExporter(str(tmp_path), "jsonl") as exporter:
+        exporter.add("a.txt", results, report)
+        exporter.add("b.txt", results, report)
+        rows = exporter.rows()
+
+    assert rows["findings"] == 2 * len(results)
+    assert rows["statistics"] == 2
+    for table, path in exporter.paths.items():
+        with open(path, encoding="utf-8") as file:
+            assert sum(1 for _ in file) == rows[table]
+
+
+def test_parquet_export_round_trip(nist_library):
+    pq = pytest.importorskip("pyarrow.parquet")
+    results, _ = _analysis(nist_library)
+
+    sink = io.BytesIO()
+    export_report(sink, results, "parquet", document="policy.txt", row_group_size=2)
+    sink.seek(0)
+    table = pq.read_table(sink)
+
+    assert table.column_names == [name for name, _ in TABLES["findings"]]
+    assert table.column("clause_id").to_pylist() == [entry["clause_id"] for entry in results]
+
+
+def test_unknown_format_is_rejected_before_writing(tmp_path):
+    with pytest.raises(ValueError):
+        ReportExporter(str(tmp_path / "out"), "xlsx")
+    assert not (tmp_path / "out").exists()
+
+
+def test_writers_must_implement_write():
+    class Incomplete(ExportWriter):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete(io.BytesIO(), "findings")
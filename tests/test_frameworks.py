@@ -0,0 +1,81 @@
+import json
+import mmap
+import shutil
+import threading
+
+import pytest
+
+from instrumentation.metrics import METRICS
+from nlp.frameworks import FrameworkRegistry
+from nlp.preprocessing import segment_policy
+from pipeline import AnalysisPipeline, analyze_frameworks
+
+POLICY = (
+    "Access to systems is granted on a least privilege basis and reviewed quarterly.\n\n"
+    "Security incidents are reported to the response team within one hour.\n"
+)
+
+
+@pytest.fixture
+def data_dir(nist_catalog, tmp_path):
+    root = tmp_path / "frameworks"
+    (root / "nist_csf").mkdir(parents=True)
+    shutil.copy(nist_catalog, root / "nist_csf" / "policy_clauses.json")
+
+    with open(nist_catalog, encoding="utf-8") as file:
+        clauses = json.load(file)
+    (root / "iso_27001").mkdir()
+    (root / "iso_27001" / "policy_clauses.json").write_text(
+        json.dumps(clauses[:3]), encoding="utf-8"
+    )
+    (root / "iso_27001" / "framework.json").write_text(
+        json.dumps({"name": "ISO 27001"}), encoding="utf-8"
+    )
+    (root / "notes").mkdir()
+    return str(root)
+
+
+def test_catalogs_are_discovered_and_resolved(data_dir):
+    registry = FrameworkRegistry(data_dir)
+
+    assert list(registry.catalogs) == ["iso_27001", "nist_csf"]
+    assert registry.names() == ["ISO 27001", "NIST"]
+    assert registry.resolve("nist") == registry.resolve("nist_csf") == "nist_csf"
+    assert registry.resolve("iso 27001") == "iso_27001"
+    with pytest.raises(KeyError, match="Available frameworks: ISO 27001, NIST"):
+        registry.resolve("CIS")
+
+
+def test_catalogs_load_once_on_first_use(data_dir):
+    registry = FrameworkRegistry(data_dir)
+    assert registry.loaded() == []
+
+    libraries = []
+    threads = [
+        threading.Thread(target=lambda: libraries.append(registry.get("NIST")))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert registry.loaded() == ["nist_csf"]
+    assert all(library is libraries[0] for library in libraries)
+    assert len(registry.get("iso_27001")) == 3
+    # Automaton arrays are views into the mapped artifact
+    assert isinstance(libraries[0]._buffer, mmap.mmap)
+
+
+def test_frameworks_share_one_segmentation(data_dir):
+    registry = FrameworkRegistry(data_dir)
+    libraries = {name: registry.get(name) for name in registry.names()}
+
+    METRICS.reset()
+    results = analyze_frameworks(libraries, text=POLICY)
+
+    assert METRICS.snapshot()["counters"]["segments"] == len(segment_policy(POLICY))
+    for name, library in libraries.items():
+        expected = AnalysisPipeline(library, text=POLICY).run("final_report")
+        assert results[name].report == expected.report
+    assert results["ISO 27001"].report["statistics"]["total_clauses"] == 3
@@ -0,0 +1,65 @@
+import pytest
+
+from remediation.generation import (
+    GenerationBackend, GenerationCache, TemplateBackend, build_prompt_prefix, build_request,
+    generate_remediations, memo_key
+)
+
+ITEM = {
+    "clause_id": "PR-AC-01",
+    "title": "Access Control Policy",
+    "nist_category": "PR.AC",
+    "severity": "High",
+    "coverage": "Partial",
+    "matched_segment_text": "User access is reviewed periodically"
+}
+
+
+class CountingBackend(TemplateBackend):
+    def __init__(self):
+        self.prefixes = []
+
+    def generate(self, prefix, requests):
+        self.prefixes.append(prefix)
+        return [f"{len(self.prefixes)}: {request['clause_id']}" for request in requests]
+
+
+def test_memo_key_includes_the_prompt_prefix():
+    request = build_request(ITEM)
+    nist = build_prompt_prefix({"framework": "NIST", "policy": "a.txt"})
+    cis = build_prompt_prefix({"framework": "CIS", "policy": "a.txt"})
+
+    assert memo_key(request, nist) == memo_key(request, nist)
+    assert memo_key(request, nist) != memo_key(request, cis)
+
+
+def test_memo_key_covers_every_prompt_field():
+    prefix = build_prompt_prefix({"framework": "NIST", "policy": "a.txt"})
+    key = memo_key(build_request(ITEM), prefix)
+
+    for field, value in [("title", "Account Management"), ("nist_category", "PR.AA"),
+                         ("severity", "Low"), ("matched_segment_text", "Access is logged")]:
+        assert memo_key(build_request({**ITEM, field: value}), prefix) != key
+
+
+def test_cached_texts_are_reused_per_prefix(tmp_path):
+    cache = GenerationCache(str(tmp_path))
+    backend = CountingBackend()
+    nist = {"framework": "NIST", "policy": "a.txt"}
+
+    first = generate_remediations([ITEM], backend, cache, nist)
+    again = generate_remediations([ITEM], backend, cache, nist)
+    other = generate_remediations([ITEM], backend, cache, {"framework": "CIS", "policy": "a.txt"})
+
+    assert first == again == ["1: PR-AC-01"]
+    assert other == ["2: PR-AC-01"]
+    assert len(backend.prefixes) == 2
+    assert "Framework: CIS" in backend.prefixes[1]
+
+
+def test_backends_must_implement_generate():
+    class Incomplete(GenerationBackend):
+        model_id = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,106 @@
+import json
+import shutil
+import sqlite3
+
+from nlp.clause_library import load_clause_library
+from pipeline import ANALYSIS_VERSION, analysis_version
+from storage.history import HistoryStore
+
+ENTRIES = [
+    {"clause_id": "PR-AC-01", "coverage": "Partial", "match_score": 0.25,
+     "severity": "High", "nist_function": "Protect"},
+    {"clause_id": "RC-RP-01", "coverage": "Missing", "match_score": 0.0,
+     "severity": "Medium", "nist_function": "Recover"},
+]
+REPORT = {"statistics": {"total_clauses": 2, "covered": 0, "partial": 1, "missing": 1}}
+
+
+def _store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    store.add_document("abc", "policy.txt", 120, "text", source_path="policy.txt")
+    return store
+
+
+def test_analysis_round_trip(tmp_path, nist_library):
+    store = _store(tmp_path)
+    key = (nist_library.source_hash, ANALYSIS_VERSION)
+
+    assert not store.has_analysis("abc", "NIST", *key)
+    store.save_analysis("abc", "NIST", ENTRIES, REPORT, *key)
+
+    assert store.has_analysis("abc", "NIST", *key)
+    assert store.load_analysis("abc", "NIST", *key) == {
+        "analysis_results": ENTRIES, "report": REPORT
+    }
+    assert store.list_documents()[0]["frameworks"] == ["NIST"]
+
+
+def test_catalog_change_invalidates_history(tmp_path, nist_catalog, nist_library):
+    store = _store(tmp_path)
+    store.save_analysis("abc", "NIST", ENTRIES, REPORT, nist_library.source_hash, ANALYSIS_VERSION)
+
+    catalog = tmp_path / "policy_clauses.json"
+    shutil.copy(nist_catalog, catalog)
+    clauses = json.loads(catalog.read_text(encoding="utf-8"))
+    clauses[0]["keywords"].append("configuration baseline")
+    catalog.write_text(json.dumps(clauses), encoding="utf-8")
+    changed = load_clause_library(str(catalog), artifact_path=str(tmp_path / "changed.clib"))
+
+    assert changed.source_hash != nist_library.source_hash
+    assert not store.has_analysis("abc", "NIST", changed.source_hash, ANALYSIS_VERSION)
+    assert store.load_analysis("abc", "NIST", changed.source_hash, ANALYSIS_VERSION) is None
+
+    # Re-analysing replaces the stale result rather than adding a second one
+    store.save_analysis("abc", "NIST", ENTRIES[:1], REPORT, changed.source_hash, ANALYSIS_VERSION)
+    assert not store.has_analysis("abc", "NIST", nist_library.source_hash, ANALYSIS_VERSION)
+    assert store.load_analysis(
+        "abc", "NIST", changed.source_hash, ANALYSIS_VERSION
+    )["analysis_results"] == ENTRIES[:1]
+
+
+def test_engine_version_invalidates_history(tmp_path, nist_library):
+    store = _store(tmp_path)
+    store.save_analysis("abc", "NIST", ENTRIES, REPORT, nist_library.source_hash, ANALYSIS_VERSION)
+
+    assert not store.has_analysis("abc", "NIST", nist_library.source_hash, ANALYSIS_VERSION + "+model")
+
+
+def test_matching_options_invalidate_history(tmp_path, nist_library):
+    store = _store(tmp_path)
+    store.save_analysis("abc", "NIST", ENTRIES, REPORT, nist_library.source_hash, analysis_version())
+
+    assert store.has_analysis("abc", "NIST", nist_library.source_hash, analysis_version())
+    for options in [{"method": "bm25"}, {"evidence_k": 3}, {"hierarchical": True},
+                    {"method": "tfidf", "scoring_options": {"ngram": 2}}]:
+        assert not store.has_analysis(
+            "abc", "NIST", nist_library.source_hash, analysis_version(**options)
+        )
+
+
+def test_unversioned_analyses_are_dropped_on_upgrade(tmp_path):
+    path = tmp_path / "history.sqlite3"
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        """
+        CREATE TABLE documents (
+            id INTEGER PRIMARY KEY, content_hash TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL, format TEXT, size INTEGER NOT NULL,
+            source_path TEXT, text_path TEXT, uploaded_at REAL NOT NULL
+        );
+        CREATE TABLE analyses (
+            id INTEGER PRIMARY KEY, document_id INTEGER NOT NULL,
+            framework TEXT NOT NULL, analyzed_at REAL NOT NULL,
+            covered INTEGER NOT NULL, partial INTEGER NOT NULL,
+            missing INTEGER NOT NULL, report TEXT NOT NULL,
+            UNIQUE (document_id, framework)
+        );
+        INSERT INTO documents VALUES (1, 'abc', 'policy.txt', 'text', 120, NULL, NULL, 0);
+        INSERT INTO analyses VALUES (1, 1, 'NIST', 0, 0, 1, 1, '{}');
+        PRAGMA user_version = 1;
+        """
+    )
+    connection.close()
+
+    store = HistoryStore(str(path))
+    assert store.get_document("abc")["name"] == "policy.txt"
+    assert store.list_documents()[0]["frameworks"] == []
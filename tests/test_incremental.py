@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+from instrumentation.metrics import METRICS
+import main
+from remediation.generation import GenerationCache, TemplateBackend
+from reporting import incremental
+from reporting.incremental import (
+    clause_fingerprint, incremental_gap_report, load_analysis_state
+)
+
+POLICY = (
+    "Access Control\n\n"
+    "Access to systems is granted on a least privilege basis and reviewed quarterly.\n\n"
+    "Incident Response\n\n"
+    "Security incidents are reported to the response team within one hour.\n"
+)
+ADDED = "Security monitoring and logging of network events is performed continuously.\n"
+
+
+def _coverage(gap_report):
+    return {
+        entry["clause_id"]: (entry["coverage"], entry["match_score"])
+        for entry in gap_report
+    }
+
+
+def test_incremental_run_matches_full_run(nist_catalog, tmp_path, capsys):
+    policy_path = tmp_path / "policy.txt"
+    state_path = tmp_path / "state.json"
+    output_dir = tmp_path / "results"
+
+    policy_path.write_text(POLICY, encoding="utf-8")
+    main.run_incremental(str(policy_path), str(state_path), nist_catalog, str(output_dir))
+
+    policy_path.write_text(POLICY + "\n" + ADDED, encoding="utf-8")
+    result, delta = main.run_incremental(
+        str(policy_path), str(state_path), nist_catalog, str(output_dir)
+    )
+
+    library = main.load_clause_library(nist_catalog)
+    full = main.analyze_policy(library, source=str(policy_path))
+
+    assert delta
+    assert _coverage(result["gap_report"]) == _coverage(full["gap_report"])
+    assert result["final_report"]["statistics"] == full["final_report"]["statistics"]
+
+    with open(output_dir / "policy.json", encoding="utf-8") as file:
+        written = json.load(file)
+    assert written["document"] == str(policy_path)
+    assert _coverage(written["gap_report"]) == _coverage(full["gap_report"])
+
+
+class MarkingBackend(TemplateBackend):
+    model_id = "marking-1"
+
+    def generate(self, prefix, requests):
+        return [f"generated: {request['clause_id']}" for request in requests]
+
+
+def test_incremental_run_uses_the_pipeline_options(nist_catalog, tmp_path, capsys):
+    policy_path = tmp_path / "policy.txt"
+    policy_path.write_text(POLICY, encoding="utf-8")
+    cache_dir = tmp_path / "generated"
+
+    result, _ = main.run_incremental(
+        str(policy_path), str(tmp_path / "state.json"), nist_catalog,
+        str(tmp_path / "results"), generator=MarkingBackend(),
+        generation_cache=GenerationCache(str(cache_dir))
+    )
+
+    suggestions = {
+        entry["clause_id"]: entry["suggestion"]
+        for entry in result["gap_report"] if entry["coverage"] != "Covered"
+    }
+    assert suggestions
+    assert all(text == f"generated: {clause_id}" for clause_id, text in suggestions.items())
+    assert any(cache_dir.rglob("*.txt"))
+
+
+@pytest.mark.parametrize("options", [
+    {"method": "bm25"}, {"evidence_k": 3}, {"hierarchical": True}
+])
+def test_incremental_run_rejects_other_matching_options(nist_catalog, tmp_path, options):
+    policy_path = tmp_path / "policy.txt"
+    policy_path.write_text(POLICY, encoding="utf-8")
+
+    with pytest.raises(ValueError, match="keyword matching only"):
+        main.run_incremental(
+            str(policy_path), str(tmp_path / "state.json"), nist_catalog,
+            str(tmp_path / "results"), **options
+        )
+    assert not (tmp_path / "state.json").exists()
+
+
+def test_matcher_version_invalidates_stored_state(nist_library, monkeypatch):
+    clauses = nist_library.clauses
+    segments = main.segment_blocks(iter([POLICY]))
+    _, _, state = incremental_gap_report(clauses, segments)
+
+    monkeypatch.setattr(incremental, "MATCHER_VERSION", incremental.MATCHER_VERSION + 1)
+    assert clause_fingerprint(clauses) != state["clause_fingerprint"]
+
+    # A stale fingerprint rescores every segment instead of reusing state
+    METRICS.reset()
+    _, _, new_state = incremental_gap_report(clauses, segments, state)
+    added = METRICS.snapshot()["counters"]["incremental_segments_added"]
+    assert added == len(set(new_state["segment_hashes"]))
+    assert new_state["clause_fingerprint"] == clause_fingerprint(clauses)
+
+
+def test_state_round_trip(nist_library, tmp_path):
+    segments = main.segment_blocks(iter([POLICY]))
+    _, _, state = incremental_gap_report(nist_library.clauses, segments)
+
+    path = tmp_path / "state.json"
+    incremental.save_analysis_state(state, str(path))
+    assert load_analysis_state(str(path)) == state
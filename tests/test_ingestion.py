@@ -0,0 +1,108 @@
+import codecs
+import zipfile
+
+import pytest
+
+from ingestion.document_loader import iter_policy_blocks, policy_encoding
+from ingestion.registry import sniff_format
+from ingestion.text_loader import detect_encoding
+from nlp.preprocessing import SectionOutline, segment_blocks
+from pipeline import AnalysisPipeline
+
+POLICY = (
+    "Access Control\r\n\r\n"
+    "Access to systems is granted on a least privilege basis\r\n"
+    "and reviewed every quarter. Passwords are rotated after any incident.\r\n\r\n"
+    "Café staff are trained on data handling – yearly.\r\n"
+)
+
+DOCUMENT_XML = (
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    "<w:body>"
+    '<w:p><w:pPr><w:pStyle w:val="Heading1"/></w:pPr><w:r><w:t>Incident Response</w:t></w:r></w:p>'
+    "<w:p><w:r><w:t>Security incidents are reported to the response team.</w:t></w:r></w:p>"
+    "</w:body></w:document>"
+)
+
+
+def _write_docx(path):
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("[Content_Types].xml", "<Types/>")
+        archive.writestr("word/document.xml", DOCUMENT_XML)
+
+
+@pytest.mark.parametrize("data, expected", [
+    (codecs.BOM_UTF8 + b"policy", "utf-8-sig"),
+    (codecs.BOM_UTF16_LE + "policy".encode("utf-16-le"), "utf-16"),
+    (codecs.BOM_UTF32_LE + "policy".encode("utf-32-le"), "utf-32"),
+    ("policy".encode("utf-16-le"), "utf-16-le"),
+    ("policy".encode("utf-16-be"), "utf-16-be"),
+    ("café".encode("utf-8"), "utf-8"),
+    ("café –".encode("cp1252"), "cp1252"),
+])
+def test_detect_encoding(data, expected):
+    assert detect_encoding(data) == expected
+
+
+def test_formats_are_sniffed_from_content(tmp_path):
+    pdf = tmp_path / "policy.txt"
+    pdf.write_bytes(b"%PDF-1.7\n")
+    docx = tmp_path / "policy.bin"
+    _write_docx(docx)
+    text = tmp_path / "policy.pdf"
+    text.write_text(POLICY, encoding="utf-8")
+    binary = tmp_path / "image.png"
+    binary.write_bytes(b"\x89PNG\x00\x01\x02\x03\x00\x00\xff\x00")
+
+    assert sniff_format(str(pdf)) == "pdf"
+    assert sniff_format(str(docx)) == "docx"
+    assert sniff_format(str(text)) == "text"
+    with pytest.raises(ValueError):
+        sniff_format(str(binary))
+
+
+# (codec the file is written with, codec that decodes a byte range of it)
+ENCODINGS = [
+    ("utf-8", "utf-8"),
+    ("utf-8-sig", "utf-8"),
+    ("cp1252", "cp1252"),
+    ("utf-16", "utf-16-le"),
+    ("utf-16-le", "utf-16-le"),
+    ("utf-16-be", "utf-16-be"),
+]
+
+
+@pytest.mark.parametrize("encoding, slice_encoding", ENCODINGS)
+@pytest.mark.parametrize("low_memory", [False, True])
+def test_segment_offsets_point_into_the_file(nist_library, tmp_path, encoding,
+                                             slice_encoding, low_memory):
+    path = tmp_path / "policy.txt"
+    path.write_bytes(POLICY.encode(encoding))
+    data = path.read_bytes()
+
+    pipeline = AnalysisPipeline(
+        nist_library, source=str(path), memory_budget=1 if low_memory else None
+    )
+    segments = pipeline.run("segmentation").segments
+    texts = [segment["text"] for segment in segment_blocks([POLICY.replace("\r\n", "\n")])]
+
+    assert len(segments) == len(texts) == 3
+    for segment, text in zip(segments, texts):
+        source = data[segment["byte_start"]:segment["byte_end"]].decode(slice_encoding)
+        assert source.replace("\r\n", "\n") == text
+        if not low_memory:
+            assert segment["text"] == text
+
+
+def test_docx_headings_become_sections(tmp_path):
+    path = tmp_path / "policy.docx"
+    _write_docx(path)
+
+    outline = SectionOutline()
+    segments = segment_blocks(iter_policy_blocks(str(path)), outline, policy_encoding(str(path)))
+
+    assert policy_encoding(str(path)) == "utf-8"
+    assert [segment["text"] for segment in segments] == [
+        "Security incidents are reported to the response team."
+    ]
+    assert outline.sections[segments[0]["section"]]["title"] == "Incident Response"
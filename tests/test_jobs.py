@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from jobs import DONE, FAILED, JobRegistry
+
+
+@pytest.fixture
+def registry():
+    registry = JobRegistry(max_workers=2, max_finished=2)
+    yield registry
+    registry.shutdown()
+
+
+def _wait(job, timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        if job.finished:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job.id} did not finish")
+
+
+def test_jobs_with_the_same_key_run_once(registry):
+    release = threading.Event()
+    calls = []
+
+    def analyze(name, progress):
+        calls.append(name)
+        progress("matching", clauses=3)
+        release.wait(5)
+        return name.upper()
+
+    first = registry.submit("policy", analyze, "policy", key=("abc", "NIST"))
+    again = registry.submit("policy", analyze, "policy", key=("abc", "NIST"))
+    other = registry.submit("policy", analyze, "policy", key=("abc", "CIS"))
+    release.set()
+
+    assert again is first
+    assert other is not first
+    assert _wait(first).status == DONE and first.result == "POLICY"
+    _wait(other)
+    assert len(calls) == 2
+
+    # Finished jobs double as a cache for their key
+    assert registry.submit("policy", analyze, "policy", key=("abc", "NIST")) is first
+    assert registry.find(("abc", "NIST")) is first
+    assert first.snapshot()["counts"] == {"clauses": 3}
+
+
+def test_failed_job_is_resubmitted(registry):
+    attempts = []
+
+    def flaky(progress):
+        attempts.append(True)
+        if len(attempts) == 1:
+            raise RuntimeError("model not loaded")
+        return "ok"
+
+    failed = _wait(registry.submit("policy", flaky, key="abc"))
+    assert failed.status == FAILED
+    assert failed.error == "RuntimeError: model not loaded"
+
+    retried = _wait(registry.submit("policy", flaky, key="abc"))
+    assert retried is not failed
+    assert retried.status == DONE and retried.result == "ok"
+
+
+def test_progress_resets_counts_on_a_new_stage(registry):
+    def staged(progress):
+        progress("segmentation", pages=2)
+        progress("segmentation", segments=10)
+        progress("matching", clauses=4)
+
+    job = _wait(registry.submit("policy", staged))
+    snapshot = job.snapshot()
+    assert (snapshot["stage"], snapshot["counts"]) == ("matching", {"clauses": 4})
+
+
+def test_only_recent_finished_jobs_are_kept(registry):
+    jobs = [_wait(registry.submit(f"policy {n}", lambda progress: n, key=n)) for n in range(4)]
+    # Finished jobs are evicted when the next job is submitted
+    registry.submit("last", lambda progress: None)
+
+    assert registry.get(jobs[0].id) is None
+    assert registry.find(0) is None
+    assert registry.get(jobs[3].id) is jobs[3]
@@ -0,0 +1,51 @@
+import random
+
+from nlp.keyword_matcher import build_keyword_automaton, scan_keywords
+from nlp.matching import (
+    find_best_segment_match, keyword_overlap_score, stream_best_matches
+)
+from nlp.preprocessing import segment_policy, tokenize
+
+KEYWORDS = ["access", "access control", "control", "user access", "a b a", "b a b", "b"]
+
+
+def _naive_hits(keywords, tokens):
+    words = tokenize(" ".join(tokens))[0].split()
+    hits = set()
+    for keyword in keywords:
+        pattern = keyword.split()
+        if any(
+            words[i:i + len(pattern)] == pattern
+            for i in range(len(words) - len(pattern) + 1)
+        ):
+            hits.add(keyword)
+    return hits
+
+
+def test_scan_finds_every_overlapping_keyword():
+    automaton = build_keyword_automaton(KEYWORDS)
+    alphabet = ["a", "b", "access", "control", "user", "policy"]
+    generator = random.Random(7)
+
+    for _ in range(300):
+        words = [generator.choice(alphabet) for _ in range(generator.randint(0, 12))]
+        tokens = tokenize(" ".join(words))[1]
+        assert scan_keywords(automaton, tokens) == _naive_hits(KEYWORDS, words)
+
+
+def test_keywords_match_whole_tokens_only():
+    assert keyword_overlap_score(["access"], "Accessibility reviews happen yearly.") == 0.0
+    assert keyword_overlap_score(["access", "mfa"], "Remote access requires MFA.") == 1.0
+
+
+def test_single_pass_matching_equals_per_clause_matching(nist_library):
+    segments = segment_policy(
+        "User access to systems is granted based on business requirements. "
+        "An incident response plan is established to handle cybersecurity incidents. "
+        "Backup and recovery procedures are documented to ensure continuity."
+    )
+    streamed = stream_best_matches(nist_library.clauses, segments)
+
+    assert streamed == [
+        find_best_segment_match(clause, segments) for clause in nist_library.clauses
+    ]
@@ -0,0 +1,92 @@
+import pytest
+
+import pipeline as pipeline_module
+from instrumentation.memory import MemoryTracker, parse_size
+from pipeline import AnalysisPipeline
+
+POLICY = "".join(
+    f"Section {number}\n\n"
+    f"Access to system {number} is granted on a least privilege basis and reviewed quarterly. "
+    f"Incidents on system {number} are reported to the response team within one hour. "
+    f"Backups of system {number} are tested so recovery procedures stay documented.\n\n"
+    for number in range(40)
+)
+
+
+def _findings(final):
+    return [
+        (entry["clause_id"], entry["coverage"], entry["match_score"],
+         entry["matched_segment_id"], entry["matched_segment_text"])
+        for entry in final.analysis_results
+    ]
+
+
+@pytest.mark.parametrize("options", [{}, {"evidence_k": 2}, {"method": "bm25"}])
+def test_low_memory_mode_matches_the_normal_path(nist_library, tmp_path, options):
+    path = tmp_path / "policy.txt"
+    path.write_text(POLICY, encoding="utf-8")
+
+    normal = AnalysisPipeline(nist_library, source=str(path), **options)
+    low = AnalysisPipeline(nist_library, source=str(path), memory_budget=1, **options)
+    assert low.low_memory and not normal.low_memory
+
+    normal_final, low_final = normal.run("final_report"), low.run("final_report")
+    assert _findings(low_final) == _findings(normal_final)
+    assert low_final.report == normal_final.report
+
+    # Only the segments a clause matched get their text back
+    matched = {entry["matched_segment_id"] for entry in low_final.analysis_results}
+    for segment in low.run("segmentation").segments:
+        assert ("text" in segment) == (segment["id"] in matched)
+
+
+def test_memory_error_under_a_budget_retries_in_low_memory_mode(
+        nist_library, tmp_path, monkeypatch):
+    path = tmp_path / "policy.txt"
+    path.write_text(POLICY, encoding="utf-8")
+    expected = AnalysisPipeline(nist_library, source=str(path)).run("final_report")
+
+    def exhausted(*args, **kwargs):
+        raise MemoryError
+
+    monkeypatch.setattr(pipeline_module, "segment_blocks", exhausted)
+
+    budgeted = AnalysisPipeline(nist_library, source=str(path), memory_budget=1 << 40)
+    assert not budgeted.low_memory
+    assert _findings(budgeted.run("final_report")) == _findings(expected)
+    assert budgeted.low_memory
+
+    with pytest.raises(MemoryError):
+        AnalysisPipeline(nist_library, source=str(path)).run("final_report")
+
+
+def test_tracker_records_stage_peaks():
+    tracker = MemoryTracker(top_sites=1)
+    tracker.start()
+    try:
+        with tracker.stage("outer"):
+            with tracker.stage("inner"):
+                block = bytearray(4 * 1024 * 1024)
+            del block
+    finally:
+        tracker.stop()
+
+    stages = tracker.snapshot()
+    assert stages["inner"]["peak_bytes"] >= 4 * 1024 * 1024
+    assert stages["outer"]["peak_bytes"] >= stages["inner"]["peak_bytes"]
+    assert stages["outer"]["retained_bytes"] < 1024 * 1024
+    assert stages["inner"]["top_sites"]
+
+
+def test_disabled_tracker_records_nothing():
+    tracker = MemoryTracker()
+    with tracker.stage("ignored"):
+        pass
+    assert tracker.snapshot() == {}
+
+
+@pytest.mark.parametrize("value, size", [
+    ("512M", 512 * 1024 ** 2), ("2gb", 2 * 1024 ** 3), ("1.5K", 1536), ("1048576", 1048576)
+])
+def test_parse_size(value, size):
+    assert parse_size(value) == size
@@ -0,0 +1,88 @@
+import json
+import time
+
+from instrumentation.metrics import METRICS, Metrics, increment, stage_timer, timed_blocks
+from pipeline import AnalysisPipeline
+from test_pdf_loader import PAGES, _write_pdf
+
+
+def test_timed_blocks_leave_out_the_consumer():
+    METRICS.reset()
+
+    def produce():
+        for block in ("a", "b", "c"):
+            time.sleep(0.01)
+            yield block
+
+    for _ in timed_blocks("producing", produce()):
+        time.sleep(0.03)
+
+    stage = METRICS.snapshot()["stages"]["producing"]
+    assert stage["calls"] == 1
+    assert 0.03 <= stage["seconds"] < 0.09
+
+
+def test_abandoned_timed_stream_closes_its_source():
+    closed = []
+
+    def produce():
+        try:
+            yield "a"
+            yield "b"
+        finally:
+            closed.append(True)
+
+    blocks = timed_blocks("abandoned", produce())
+    next(blocks)
+    blocks.close()
+
+    assert closed == [True]
+
+
+def test_pdf_extraction_is_timed_apart_from_segmentation(nist_library, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pdf_path = tmp_path / "policy.pdf"
+    _write_pdf(pdf_path, PAGES)
+    METRICS.reset()
+
+    AnalysisPipeline(nist_library, source=str(pdf_path)).run("final_report")
+
+    snapshot = METRICS.snapshot()
+    for stage in ("ingestion", "pdf_extraction", "segmentation", "matching", "final_report"):
+        assert snapshot["stages"][stage]["calls"] == 1
+    assert snapshot["counters"]["pages"] == len(PAGES)
+
+    path = tmp_path / "metrics.json"
+    METRICS.write_json(str(path))
+    with open(path, encoding="utf-8") as file:
+        assert json.load(file) == snapshot
+
+
+def test_prometheus_export_and_merge():
+    worker = Metrics()
+    worker.add_time("segmentation", 1.5)
+    worker.increment("segments", 3)
+
+    metrics = Metrics()
+    metrics.add_time("segmentation", 0.5)
+    metrics.increment("segments", 2)
+    metrics.increment("cache-hits")
+    metrics.merge(worker.snapshot())
+
+    lines = metrics.to_prometheus(prefix="test").splitlines()
+    assert 'test_stage_seconds_total{stage="segmentation"} 2.000000' in lines
+    assert 'test_stage_calls_total{stage="segmentation"} 2' in lines
+    assert "test_segments_total 5" in lines
+    assert "test_cache_hits_total 1" in lines
+
+
+def test_stage_timer_and_increment_use_the_process_metrics():
+    METRICS.reset()
+    with stage_timer("outer"):
+        with stage_timer("inner"):
+            increment("events", 2)
+
+    snapshot = METRICS.snapshot()
+    assert set(snapshot["stages"]) == {"outer", "inner"}
+    assert snapshot["stages"]["outer"]["seconds"] >= snapshot["stages"]["inner"]["seconds"]
+    assert snapshot["counters"] == {"events": 2}
@@ -0,0 +1,87 @@
+import os
+
+from instrumentation.metrics import METRICS
+from ingestion import pdf_loader
+from ingestion.pdf_loader import iter_pdf_pages
+
+PAGES = [
+    "Access to systems is reviewed quarterly.",
+    "Incidents are reported within one hour.",
+]
+
+
+def _write_pdf(path, pages):
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, xref
+    )
+    path.write_bytes(bytes(data))
+
+
+def test_extracted_text_is_served_from_the_cache(tmp_path, monkeypatch):
+    pdf_path = tmp_path / "policy.pdf"
+    _write_pdf(pdf_path, PAGES)
+    cache_dir = str(tmp_path / "cache")
+    METRICS.reset()
+
+    first = list(iter_pdf_pages(str(pdf_path), workers=1, cache_dir=cache_dir))
+    assert [text.strip() for text in first] == PAGES
+
+    def fail(*args):
+        raise AssertionError("cache hit must not run PyPDF2")
+
+    monkeypatch.setattr(pdf_loader, "_extract_pages", fail)
+    assert list(iter_pdf_pages(str(pdf_path), workers=1, cache_dir=cache_dir)) == first
+
+    counters = METRICS.snapshot()["counters"]
+    assert counters["pdf_text_cache_misses"] == 1
+    assert counters["pdf_text_cache_hits"] == 1
+    assert [name for name in os.listdir(cache_dir) if name.endswith(".tmp")] == []
+
+
+def test_abandoned_extraction_leaves_no_cache_entry(tmp_path):
+    pdf_path = tmp_path / "policy.pdf"
+    _write_pdf(pdf_path, PAGES)
+    cache_dir = tmp_path / "cache"
+
+    pages = iter_pdf_pages(str(pdf_path), workers=1, cache_dir=str(cache_dir))
+    next(pages)
+    pages.close()
+
+    assert os.listdir(cache_dir) == []
+
+
+def test_text_cache_evicts_least_recently_used_entries(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    for age, name in enumerate(["old", "recent", "newest"]):
+        path = cache_dir / f"{name}.jsonl"
+        path.write_text("x" * 100, encoding="utf-8")
+        os.utime(path, (1000 + age, 1000 + age))
+
+    pdf_loader.evict_text_cache(str(cache_dir), max_bytes=250)
+
+    assert sorted(os.listdir(cache_dir)) == ["newest.jsonl", "recent.jsonl"]
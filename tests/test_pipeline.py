@@ -0,0 +1,79 @@
+from collections import Counter
+
+import pytest
+
+from nlp.preprocessing import segment_policy
+from pipeline import AnalysisPipeline, GapReportResult, SegmentationResult
+
+POLICY = (
+    "Access to systems is granted on a least privilege basis and reviewed quarterly.\n\n"
+    "Security incidents are reported to the response team within one hour.\n"
+)
+
+
+def _counting_pipeline(library, monkeypatch, **options):
+    pipeline = AnalysisPipeline(library, text=POLICY, **options)
+    calls = Counter()
+
+    for stage in AnalysisPipeline.STAGES:
+        method = getattr(pipeline, f"_run_{stage}")
+
+        def counted(stage=stage, method=method):
+            calls[stage] += 1
+            return method()
+
+        monkeypatch.setattr(pipeline, f"_run_{stage}", counted)
+
+    return pipeline, calls
+
+
+def test_every_stage_runs_once(nist_library, monkeypatch):
+    pipeline, calls = _counting_pipeline(nist_library, monkeypatch)
+
+    final = pipeline.run("final_report")
+    assert pipeline.run("final_report") is final
+    pipeline.run("matching")
+    pipeline.run("roadmap")
+
+    assert calls == Counter({stage: 1 for stage in AnalysisPipeline.STAGES})
+
+
+def test_rerun_recomputes_only_downstream_stages(nist_library, monkeypatch):
+    pipeline, calls = _counting_pipeline(nist_library, monkeypatch)
+    matching = pipeline.run("matching")
+    first = pipeline.run("final_report")
+
+    second = pipeline.rerun("gap_report")
+    assert pipeline.run("matching") is matching
+    assert pipeline.run("final_report") is not first
+    assert pipeline.run("final_report").report == first.report
+
+    assert calls["matching"] == 1
+    assert calls["gap_report"] == 2
+    assert calls["final_report"] == 2
+    assert second is pipeline.run("gap_report")
+
+
+def test_seeded_stages_replace_their_computation(nist_library, monkeypatch):
+    pipeline, calls = _counting_pipeline(nist_library, monkeypatch)
+    pipeline.run("final_report")
+
+    segments = segment_policy(POLICY)[1:]
+    pipeline.seed("segmentation", SegmentationResult(segments=segments))
+    matches = pipeline.run("matching").matches
+
+    assert calls["segmentation"] == 1
+    assert calls["matching"] == 2
+    assert {match["best_segment_id"] for match in matches} <= {
+        segment["id"] for segment in segments
+    } | {None}
+
+    entries = [dict(entry, coverage="Missing") for entry in pipeline.run("gap_report").entries]
+    pipeline.seed("gap_report", GapReportResult(entries=entries))
+    statistics = pipeline.run("final_report").report["statistics"]
+    assert statistics["missing"] == statistics["total_clauses"]
+
+
+def test_unknown_stage_is_rejected(nist_library):
+    with pytest.raises(ValueError, match="Unknown pipeline stage"):
+        AnalysisPipeline(nist_library, text=POLICY).run("scoring")
@@ -0,0 +1,87 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from nlp.clause_preprocessing import clause_document
+from nlp.embeddings import EmbeddingBackend
+from nlp.preprocessing import segment_policy
+from nlp.scoring import BM25_B, BM25_K1, build_score_matrix
+
+POLICY = (
+    "User access to systems is granted based on business requirements. "
+    "Access control reviews happen every quarter for user access rights. "
+    "An incident response plan is established to handle cybersecurity incidents. "
+    "Backup and recovery procedures are documented to ensure business continuity. "
+    "The cafeteria opens at noon on weekdays for every member of staff."
+)
+
+
+def _documents(clauses):
+    segments = segment_policy(POLICY)
+    queries = [Counter(clause_document(clause).split()) for clause in clauses]
+    docs = [Counter(segment["normalized"].split()) for segment in segments]
+    return segments, queries, docs
+
+
+def _tfidf_loop(queries, docs):
+    n = len(docs)
+    df = Counter(term for doc in docs for term in doc)
+    idf = lambda term: math.log((1 + n) / (1 + df[term])) + 1.0
+
+    def vector(counts):
+        weights = {term: count * idf(term) for term, count in counts.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        return {term: w / norm for term, w in weights.items()}
+
+    doc_vectors = [vector(doc) for doc in docs]
+    return np.array([
+        [sum(w * d.get(term, 0.0) for term, w in vector(query).items()) for d in doc_vectors]
+        for query in queries
+    ])
+
+
+def _bm25_loop(queries, docs, k1=BM25_K1, b=BM25_B):
+    n = len(docs)
+    df = Counter(term for doc in docs for term in doc)
+    idf = {term: math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5)) for term in df}
+    avg_length = sum(sum(doc.values()) for doc in docs) / n
+
+    rows = []
+    for query in queries:
+        bound = sum(idf.get(term, math.log(1 + (n + 0.5) / 0.5)) for term in query) * (k1 + 1)
+        row = []
+        for doc in docs:
+            norm = k1 * (1 - b + b * sum(doc.values()) / avg_length)
+            score = sum(
+                idf[term] * doc[term] * (k1 + 1) / (doc[term] + norm)
+                for term in query if term in doc
+            )
+            row.append(score / (bound or 1.0))
+        rows.append(row)
+    return np.array(rows)
+
+
+@pytest.mark.parametrize("method, reference", [("tfidf", _tfidf_loop), ("bm25", _bm25_loop)])
+def test_score_matrix_equals_pairwise_loop(nist_library, method, reference):
+    segments, queries, docs = _documents(nist_library.clauses)
+    matrix = build_score_matrix(nist_library.clauses, segments, method)
+
+    assert matrix.shape == (len(nist_library.clauses), len(segments))
+    np.testing.assert_allclose(matrix, reference(queries, docs), atol=1e-9)
+    assert matrix.min() >= 0.0 and matrix.max() <= 1.0 + 1e-9
+
+
+def test_unknown_method_is_rejected(nist_library):
+    with pytest.raises(ValueError):
+        build_score_matrix(nist_library.clauses, segment_policy(POLICY), "lsi")
+
+
+def test_embedding_backends_must_implement_embed():
+    class Incomplete(EmbeddingBackend):
+        model_id = "incomplete"
+        dim = 8
+
+    with pytest.raises(TypeError):
+        Incomplete()
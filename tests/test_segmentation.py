@@ -0,0 +1,100 @@
+from instrumentation.metrics import METRICS
+from nlp.matching import stream_best_matches
+from nlp.preprocessing import (
+    MAX_PIECE_LENGTH, SectionOutline, iter_segments, segment_policy
+)
+from nlp.sections import SectionIndex, hierarchical_keyword_matches
+
+POLICY = (
+    "# Access Control Policy Overview\n\n"
+    "Users must be authenticated before access control grants them access.\n\n"
+    "## Incident Response\n"
+    "Incidents are reported to the response team within one hour.\n\n"
+    "2. Facilities And Catering\n\n"
+    "The cafeteria serves lunch between noon and two every weekday.\n"
+)
+
+
+def test_headings_split_segments_without_markers():
+    outline = SectionOutline()
+    segments = segment_policy(POLICY, outline)
+    texts = [segment["text"] for segment in segments]
+
+    assert texts == [
+        "Access Control Policy Overview",
+        "Users must be authenticated before access control grants them access",
+        "Incidents are reported to the response team within one hour",
+        "The cafeteria serves lunch between noon and two every weekday",
+    ]
+    titles = [outline.sections[segment["section"]]["title"] for segment in segments]
+    assert titles == [
+        "Access Control Policy Overview",
+        "Access Control Policy Overview",
+        "Incident Response",
+        "2. Facilities And Catering",
+    ]
+
+
+def test_segment_offsets_point_at_their_text():
+    encoded = POLICY.encode("utf-8")
+    for segment in segment_policy(POLICY):
+        assert encoded[segment["byte_start"]:segment["byte_end"]].decode("utf-8") == segment["text"]
+
+
+def test_streamed_blocks_segment_like_the_joined_text():
+    blocks = [POLICY[i:i + 7] for i in range(0, len(POLICY), 7)]
+    streamed = list(iter_segments(blocks, outline=SectionOutline()))
+    joined = segment_policy(POLICY, SectionOutline())
+
+    assert [(s["id"], s["text"], s["section"]) for s in streamed] == [
+        (s["id"], s["text"], s["section"]) for s in joined
+    ]
+
+
+def test_unpunctuated_stream_is_cut_into_bounded_segments():
+    words = " ".join("word%d" % number for number in range(20000))
+    lines = [words[offset:offset + 700] for offset in range(0, len(words), 700)]
+    text = "\n".join(lines)
+    blocks = (text[offset:offset + 97] for offset in range(0, len(text), 97))
+
+    streamed = list(iter_segments(blocks))
+    assert len(streamed) > 1
+    assert max(len(segment["text"]) for segment in streamed) <= MAX_PIECE_LENGTH
+    assert [(s["id"], s["text"], s["byte_start"]) for s in streamed] == [
+        (s["id"], s["text"], s["byte_start"]) for s in segment_policy(text)
+    ]
+
+    encoded = text.encode("utf-8")
+    for segment in streamed:
+        assert encoded[segment["byte_start"]:segment["byte_end"]].decode("utf-8") == segment["text"]
+    assert " ".join(segment["text"] for segment in streamed).split() == text.split()
+
+
+def test_text_without_any_separator_is_cut_at_the_limit():
+    text = "x" * (3 * MAX_PIECE_LENGTH)
+    segments = list(iter_segments(iter(text)))
+    assert [len(segment["text"]) for segment in segments] == [MAX_PIECE_LENGTH] * 3
+
+
+def test_outline_indexes_section_words_while_segmenting():
+    outline = SectionOutline(index_words=True)
+    segments = segment_policy(POLICY, outline)
+
+    assert outline.word_sections == SectionIndex(segments).word_sections
+    assert outline.word_sections["access"] == [1]
+    assert outline.word_sections["cafeteria"] == [3]
+    assert SectionOutline().word_sections is None
+
+
+def test_hierarchical_matching_prunes_off_topic_sections(nist_library):
+    outline = SectionOutline(index_words=True)
+    segments = segment_policy(POLICY, outline)
+
+    METRICS.reset()
+    matches, _ = hierarchical_keyword_matches(
+        nist_library.clauses, segments, nist_library.automaton,
+        word_sections=outline.word_sections
+    )
+
+    assert METRICS.snapshot()["counters"]["pruned_segments"] == 2
+    assert matches == stream_best_matches(nist_library.clauses, segments, nist_library.automaton)
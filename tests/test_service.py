@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+import pytest
+
+from service import AnalysisService, HTTPError
+
+POLICY = "Access to systems is granted on a least privilege basis and reviewed quarterly.\n"
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def _with_service(nist_catalog, tmp_path, exchange, **options):
+    service = AnalysisService(
+        nist_catalog, data_dir=str(tmp_path / "frameworks"), workers=1, **options
+    )
+    await service.start(port=0)
+    try:
+        return await exchange(service)
+    finally:
+        await service.close()
+
+
+async def _request(service, raw):
+    reader, writer = await asyncio.open_connection(*service.address)
+    writer.write(raw)
+    await writer.drain()
+    status_line = await reader.readline()
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers["content-length"]))
+    writer.close()
+    return int(status_line.split()[1]), json.loads(body)
+
+
+def _post(path, payload, length=None):
+    body = json.dumps(payload).encode("utf-8")
+    length = len(body) if length is None else length
+    return (
+        f"POST {path} HTTP/1.1\r\nContent-Length: {length}\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode("latin-1") + body
+
+
+def test_bad_content_length_is_400(nist_catalog, tmp_path):
+    async def exchange(service):
+        return await _request(service, _post("/analyze", {"text": POLICY}, length="ten"))
+
+    status, payload = _run(_with_service(nist_catalog, tmp_path, exchange))
+    assert status == 400
+    assert "Content-Length" in payload["error"]
+
+
+def test_text_document_is_analyzed(nist_catalog, tmp_path):
+    async def exchange(service):
+        return await _request(service, _post("/analyze", {"text": POLICY}))
+
+    status, payload = _run(_with_service(nist_catalog, tmp_path, exchange))
+    assert status == 200
+    assert payload["status"] == "done"
+    assert payload["final_report"]["statistics"]["total_clauses"] > 0
+
+
+def test_path_documents_need_a_document_root(nist_catalog, tmp_path):
+    async def exchange(service):
+        return await _request(service, _post("/analyze", {"path": "/etc/passwd"}))
+
+    status, _ = _run(_with_service(nist_catalog, tmp_path, exchange))
+    assert status == 400
+
+
+def test_paths_are_confined_to_the_document_root(nist_catalog, tmp_path):
+    root = tmp_path / "documents"
+    root.mkdir()
+    (root / "policy.txt").write_text(POLICY, encoding="utf-8")
+    (root / "escape.txt").symlink_to(tmp_path / "outside.txt")
+
+    async def exchange(service):
+        inside = await _request(service, _post("/analyze", {"path": "policy.txt"}))
+        with pytest.raises(HTTPError) as traversal:
+            service.enqueue({"path": "../outside.txt"})
+        with pytest.raises(HTTPError) as link:
+            service.enqueue({"path": "escape.txt"})
+        return inside, traversal.value.status, link.value.status
+
+    (status, payload), traversal, link = _run(
+        _with_service(nist_catalog, tmp_path, exchange, document_root=str(root))
+    )
+    assert status == 200 and payload["status"] == "done"
+    assert traversal == 403
+    assert link == 403
+
+
+def test_invalid_batch_queues_nothing(nist_catalog, tmp_path):
+    async def exchange(service):
+        response = await _request(service, _post("/batch-analyze", {"documents": [
+            {"text": POLICY}, {"text": POLICY, "frameworks": ["Unknown"]}
+        ]}))
+        return response, service._queue.qsize(), len(service.results)
+
+    (status, payload), queued, results = _run(_with_service(nist_catalog, tmp_path, exchange))
+    assert status == 400
+    assert "Unknown framework" in payload["error"]
+    assert queued == 0 and results == 0
+
+
+def test_batch_documents_are_analyzed(nist_catalog, tmp_path):
+    async def exchange(service):
+        status, payload = await _request(service, _post("/batch-analyze", {"documents": [
+            {"text": POLICY}, {"text": POLICY.upper()}
+        ]}))
+        entries = []
+        for result_id in payload["ids"]:
+            while True:
+                code, entry = await _request(
+                    service, f"GET /results/{result_id} HTTP/1.1\r\n\r\n".encode("latin-1")
+                )
+                if code != 202:
+                    break
+                await asyncio.sleep(0.01)
+            entries.append(entry)
+        return status, entries
+
+    status, entries = _run(_with_service(nist_catalog, tmp_path, exchange))
+    assert status == 202
+    assert [entry["status"] for entry in entries] == ["done", "done"]
+
+
+def test_unexpected_errors_are_500(nist_catalog, tmp_path, monkeypatch):
+    async def exchange(service):
+        async def broken(method, path, body):
+            raise RuntimeError("route failed")
+
+        monkeypatch.setattr(service, "route", broken)
+        return await _request(service, _post("/analyze", {"text": POLICY}))
+
+    status, payload = _run(_with_service(nist_catalog, tmp_path, exchange))
+    assert status == 500
+    assert payload["error"] == "RuntimeError: route failed"
@@ -0,0 +1,83 @@
+import os
+import threading
+
+import numpy as np
+
+from nlp.vector_cache import VectorCache, vector_key
+
+
+def test_put_then_get_round_trips(tmp_path):
+    cache = VectorCache(str(tmp_path))
+    cache.put("model", "access control", np.arange(4, dtype=np.float32))
+
+    assert np.array_equal(cache.get("model", "access control"), np.arange(4))
+    assert cache.get("other-model", "access control") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_evicted_entry_is_a_miss(tmp_path, monkeypatch):
+    cache = VectorCache(str(tmp_path))
+    cache.put("model", "text", np.ones(3))
+    path = cache._path(vector_key("model", "text"))
+
+    # Simulate eviction by another process between the read and utime
+    def utime(target, *args, **kwargs):
+        os.remove(target)
+        raise FileNotFoundError(target)
+
+    monkeypatch.setattr(os, "utime", utime)
+    assert cache.get("model", "text") is None
+    assert not os.path.exists(path)
+
+
+def test_concurrent_writers_do_not_collide(tmp_path):
+    cache = VectorCache(str(tmp_path))
+    errors = []
+
+    def write(value):
+        try:
+            for _ in range(50):
+                cache.put("model", "same text", np.full(64, value, dtype=np.float32))
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    vector = cache.get("model", "same text")
+    assert len(set(vector.tolist())) == 1
+    assert not [name for _, _, names in os.walk(tmp_path) for name in names if name.endswith(".tmp")]
+
+
+def test_evict_keeps_the_cache_within_budget(tmp_path):
+    cache = VectorCache(str(tmp_path), max_bytes=2048)
+    for n in range(20):
+        cache.put("model", f"text {n}", np.zeros(64, dtype=np.float32))
+
+    assert cache.size() <= 2048
+    assert cache.get("model", "text 19") is not None
+
+
+def test_pipeline_reuses_embeddings_across_runs(nist_library, tmp_path):
+    from nlp.vector_cache import shared_vector_cache
+    from pipeline import AnalysisPipeline
+
+    text = "Access to systems requires multi-factor authentication. Backups are encrypted."
+    cache_dir = str(tmp_path / "vectors")
+
+    def run():
+        return AnalysisPipeline(
+            nist_library, text=text, method="embedding", vector_cache_dir=cache_dir
+        ).run("matching").matches
+
+    first = run()
+    cache = shared_vector_cache(cache_dir)
+    misses = cache.misses
+    assert misses > 0
+
+    assert run() == first
+    assert cache.misses == misses
@@ -0,0 +1,63 @@
+import json
+import uuid
+
+from nlp.clause_library import load_clause_library
+from nlp.preprocessing import VOCABULARY, DocumentVocabulary, segment_policy, tokenize
+from pipeline import AnalysisPipeline, SegmentationResult
+
+
+def _unseen_word():
+    return "zq" + uuid.uuid4().hex[:12]
+
+
+def test_document_words_stay_out_of_the_shared_vocabulary(nist_library):
+    words = [_unseen_word() for _ in range(3)]
+    text = (
+        f"Access control covers {words[0]} and {words[1]} systems. "
+        f"Every {words[0]} system follows {words[2]} rules.\n"
+    )
+    size = len(VOCABULARY)
+
+    first, second = segment_policy(text)
+
+    assert len(VOCABULARY) == size
+    assert all(word not in VOCABULARY for word in words)
+    # Shared words keep their ids; a document word has one id in all its segments
+    assert tokenize("access control")[1].tolist() == [
+        VOCABULARY.get("access"), VOCABULARY.get("control")
+    ]
+    first_ids = dict(zip(first["normalized"].split(), first["tokens"].tolist()))
+    second_ids = dict(zip(second["normalized"].split(), second["tokens"].tolist()))
+    assert first_ids[words[0]] == second_ids[words[0]] < 0
+    assert len({first_ids[words[0]], first_ids[words[1]], second_ids[words[2]]}) == 3
+
+
+def _catalog(tmp_path, word):
+    catalog = tmp_path / "clauses.json"
+    catalog.write_text(json.dumps([{
+        "clause_id": "XX-01", "title": "Register", "description": "Keep a register.",
+        "keywords": [f"{word} register"], "severity": "High",
+        "nist_function": "Identify", "nist_category": "ID.AM"
+    }]), encoding="utf-8")
+    return load_clause_library(str(catalog), artifact_path=str(tmp_path / "clauses.clib"))
+
+
+def test_catalog_loaded_after_segmentation_still_matches(tmp_path):
+    word = _unseen_word()
+    text = f"The {word} register is reviewed by the security team every quarter.\n"
+    vocabulary = DocumentVocabulary()
+    segments = segment_policy(text, vocabulary=vocabulary)
+    stale = [dict(segment) for segment in segments]
+    assert segments[0]["tokens"].min() < 0
+
+    library = _catalog(tmp_path, word)
+
+    pipeline = AnalysisPipeline(library, text=text)
+    pipeline.seed("segmentation", SegmentationResult(segments=segments, vocabulary=vocabulary))
+    assert pipeline.run("matching").matches[0]["best_score"] == 1.0
+    assert VOCABULARY.get(word) in segments[0]["tokens"].tolist()
+    assert vocabulary.refresh(segments) == 0
+
+    # Without its vocabulary the segment keeps the document id of the word
+    pipeline.seed("segmentation", SegmentationResult(segments=stale))
+    assert pipeline.run("matching").matches[0]["best_score"] == 0.0